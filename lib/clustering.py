@@ -0,0 +1,264 @@
+"""
+Vauban - URL Template Clustering
+================================
+Collapse structurally redundant URLs into templates.
+
+/user/123/profile and /user/456/profile are the same endpoint to a scanner.
+Each URL is reduced to a template in which typed values (integers, UUIDs,
+hashes, dates, slugs) become placeholders, and query strings keep their
+keys with typed values. Path positions that fan out into many distinct
+literals under the same parent (blog post names, usernames) are collapsed
+to {str} as the tree grows. Each template keeps a count and a few exemplar
+URLs; only the exemplars need to be scanned.
+
+Cluster from the command line:
+    python3 -m lib.clustering all_targets.txt exemplars.txt --templates url_templates.json
+"""
+
+import re
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lib.utils import iter_file_lines, write_file_lines
+
+
+VALUE_TYPES = [
+    ('uuid', re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')),
+    ('date', re.compile(r'(?:19|20)\d\d-?(?:0[1-9]|1[0-2])-?(?:0[1-9]|[12]\d|3[01])')),
+    ('int', re.compile(r'-?\d+')),
+    ('hash', re.compile(r'[0-9a-fA-F]{16,}|(?=[A-Za-z_-]*\d)(?=[\d_-]*[A-Za-z])[A-Za-z0-9_-]{24,}')),
+    ('slug', re.compile(r'(?=[a-z0-9-]*[a-z])[a-z0-9]+(?:-[a-z0-9]+){2,}')),
+]
+
+STR = '{str}'
+
+
+def value_type(value: str) -> Optional[str]:
+    """Return the placeholder for a typed value ('{int}', '{uuid}', ...), or None for a literal."""
+    for name, pattern in VALUE_TYPES:
+        if pattern.fullmatch(value):
+            return f"{{{name}}}"
+    return None
+
+
+def segment_token(segment: str) -> str:
+    """Template token for one path segment; a file extension survives typing ('{hash}.js')."""
+    typed = value_type(segment)
+    if typed:
+        return typed
+    name, dot, ext = segment.rpartition('.')
+    if dot and name and ext.isalnum() and len(ext) <= 5:
+        typed = value_type(name)
+        if typed:
+            return f"{typed}.{ext}"
+    return segment
+
+
+def query_template(query: str) -> str:
+    """Sorted query keys with typed values ('id={int}&q={str}')."""
+    if not query:
+        return ''
+    params = []
+    for pair in query.split('&'):
+        if not pair:
+            continue
+        key, eq, value = pair.partition('=')
+        params.append(f"{key}={value_type(value) or STR}" if eq and value else key)
+    return '&'.join(sorted(set(params)))
+
+
+def split_url(url: str) -> Optional[Tuple[str, List[str], str]]:
+    """Split a URL into (origin, path tokens, query template), or None if it has no origin."""
+    scheme, sep, rest = url.partition('://')
+    if not sep:
+        return None
+    rest = rest.partition('#')[0]
+    rest, _, query = rest.partition('?')
+    host, slash, path = rest.partition('/')
+    if not host:
+        return None
+    tokens = [segment_token(s) for s in path.split('/')] if slash else []
+    return f"{scheme.lower()}://{host.lower()}", tokens, query_template(query)
+
+
+def url_template(url: str) -> Tuple[str, str]:
+    """
+    Return (host, template) for a single URL without structural inference.
+    
+    Cheap enough for per-URL use (e.g. target sampling).
+    """
+    parts = split_url(url.strip())
+    if not parts:
+        return '', url
+    origin, tokens, query = parts
+    template = '/' + '/'.join(tokens)
+    return origin.partition('://')[2], template + (f"?{query}" if query else '')
+
+
+class _Node:
+    """One path position in a host's template tree."""
+    
+    __slots__ = ('children', 'leaves', 'literals')
+    
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        # query template -> [count, exemplars]
+        self.leaves: Dict[str, list] = {}
+        self.literals = 0
+
+
+class URLClusterer:
+    """
+    Incremental template tree over URLs.
+    
+    Typed placeholders come from the value classifiers; in addition, once a
+    node has more than `max_branch` literal children they are merged into a
+    single {str} child, since that position is clearly a variable.
+    """
+    
+    def __init__(self, exemplars: int = 3, max_branch: int = 50):
+        self.exemplars = exemplars
+        self.max_branch = max_branch
+        self.roots: Dict[str, _Node] = {}
+        # Lines split_url cannot parse (bare hosts, relative paths), passed through unchanged
+        self.unparsed: Dict[str, None] = {}
+        self.total = 0
+    
+    @staticmethod
+    def _is_literal(token: str) -> bool:
+        return not token.startswith('{')
+    
+    def _merge(self, dst: _Node, src: _Node) -> None:
+        """Fold src's subtree into dst."""
+        for query, (count, exemplars) in src.leaves.items():
+            leaf = dst.leaves.get(query)
+            if leaf is None:
+                dst.leaves[query] = [count, exemplars]
+            else:
+                leaf[0] += count
+                leaf[1].extend(exemplars[:self.exemplars - len(leaf[1])])
+        for token, child in src.children.items():
+            target = dst.children.get(token)
+            if target is None:
+                dst.children[token] = child
+                if self._is_literal(token):
+                    dst.literals += 1
+            else:
+                self._merge(target, child)
+        if dst.literals > self.max_branch:
+            self._collapse(dst)
+    
+    def _collapse(self, node: _Node) -> None:
+        """Merge all literal children of a node into its {str} child."""
+        variable = node.children.get(STR) or _Node()
+        for token in [t for t in node.children if self._is_literal(t)]:
+            self._merge(variable, node.children.pop(token))
+        node.children[STR] = variable
+        node.literals = 0
+    
+    def add(self, url: str) -> None:
+        url = url.strip()
+        if not url:
+            return
+        self.total += 1
+        parts = split_url(url)
+        if not parts:
+            self.unparsed[url] = None
+            return
+        origin, tokens, query = parts
+        
+        node = self.roots.get(origin)
+        if node is None:
+            node = self.roots[origin] = _Node()
+        for token in tokens:
+            child = node.children.get(token)
+            if child is None:
+                if self._is_literal(token) and STR in node.children:
+                    # Position already proven variable
+                    child = node.children[STR]
+                else:
+                    child = node.children[token] = _Node()
+                    if self._is_literal(token):
+                        node.literals += 1
+                        if node.literals > self.max_branch:
+                            self._collapse(node)
+                            child = node.children[STR]
+            node = child
+        
+        leaf = node.leaves.get(query)
+        if leaf is None:
+            node.leaves[query] = [1, [url]]
+        else:
+            leaf[0] += 1
+            if len(leaf[1]) < self.exemplars:
+                leaf[1].append(url)
+    
+    def add_all(self, urls: Iterable[str]) -> 'URLClusterer':
+        for url in urls:
+            self.add(url)
+        return self
+    
+    def templates(self) -> Iterator[Dict]:
+        """Yield {'template', 'count', 'exemplars'} for every template, per host in order."""
+        def walk(node: _Node, prefix: str):
+            for query, (count, exemplars) in node.leaves.items():
+                yield {
+                    'template': prefix + (f"?{query}" if query else ''),
+                    'count': count,
+                    'exemplars': exemplars
+                }
+            for token in sorted(node.children):
+                yield from walk(node.children[token], f"{prefix}/{token}")
+        
+        for origin in sorted(self.roots):
+            yield from walk(self.roots[origin], origin)
+    
+    def exemplar_urls(self) -> Iterator[str]:
+        """Exemplars of every template, then the lines that could not be clustered."""
+        for template in self.templates():
+            yield from template['exemplars']
+        yield from self.unparsed
+
+
+def cluster_file(input_file: str, output_file: str, templates_file: Optional[str] = None,
+                 exemplars: int = 3, max_branch: int = 50) -> Tuple[int, int]:
+    """
+    Cluster a URL file, write the exemplars to output_file and optionally
+    the templates (sorted by count) as JSON. Returns (urls_in, urls_out).
+    """
+    clusterer = URLClusterer(exemplars, max_branch).add_all(iter_file_lines(input_file))
+    written = write_file_lines(output_file, clusterer.exemplar_urls())
+    
+    if templates_file:
+        templates = sorted(clusterer.templates(), key=lambda t: (-t['count'], t['template']))
+        with open(templates_file, 'w') as f:
+            json.dump({
+                'urls': clusterer.total,
+                'templates': len(templates),
+                'unparsed': len(clusterer.unparsed),
+                'exemplars': written,
+                'clusters': templates
+            }, f, indent=2)
+    
+    return clusterer.total, written
+
+
+def main():
+    """Cluster a URL file from the command line."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Structural URL template clustering")
+    parser.add_argument('input', help='URL file')
+    parser.add_argument('output', help='File to write exemplar URLs to')
+    parser.add_argument('--templates', help='Write templates with counts and exemplars (JSON) here')
+    parser.add_argument('--exemplars', type=int, default=3, help='Exemplars kept per template')
+    parser.add_argument('--max-branch', type=int, default=50,
+                        help='Distinct literals at one path position before it becomes {str}')
+    args = parser.parse_args()
+    
+    total, kept = cluster_file(args.input, args.output, args.templates, args.exemplars, args.max_branch)
+    print(f"[CLUSTER] {total} URLs -> {kept} exemplars")
+
+
+if __name__ == "__main__":
+    main()
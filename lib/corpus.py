@@ -0,0 +1,304 @@
+"""
+Vauban - URL Corpus Store
+=========================
+Indexed SQLite store for every URL a siege discovers.
+
+Hosts, paths, query keys and sources are interned into their own tables,
+and each URL carries flags (has_params, extension, is_js) so questions like
+"all URLs on host X with params" or "all .php paths" are indexed lookups
+instead of greps over flat files. Legacy text artifacts are exported from
+the store for the shell modules.
+
+Query from the command line:
+    python3 -m lib.corpus output/target/corpus.db --host api.example.com --params
+"""
+
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lib.utils import canonicalize_url, iter_batches, iter_file_lines, write_file_lines
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS paths (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS query_keys (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE NOT NULL,
+    scheme TEXT NOT NULL,
+    host_id INTEGER NOT NULL REFERENCES hosts(id),
+    port INTEGER,
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    query TEXT,
+    extension TEXT,
+    has_params INTEGER NOT NULL DEFAULT 0,
+    is_js INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS url_params (
+    url_id INTEGER NOT NULL REFERENCES urls(id),
+    key_id INTEGER NOT NULL REFERENCES query_keys(id),
+    PRIMARY KEY (url_id, key_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS url_sources (
+    url_id INTEGER NOT NULL REFERENCES urls(id),
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    PRIMARY KEY (url_id, source_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_urls_host ON urls(host_id);
+CREATE INDEX IF NOT EXISTS idx_urls_path ON urls(path_id);
+CREATE INDEX IF NOT EXISTS idx_urls_extension ON urls(extension);
+CREATE INDEX IF NOT EXISTS idx_urls_params ON urls(host_id) WHERE has_params = 1;
+CREATE INDEX IF NOT EXISTS idx_urls_js ON urls(host_id) WHERE is_js = 1;
+CREATE INDEX IF NOT EXISTS idx_params_key ON url_params(key_id);
+CREATE INDEX IF NOT EXISTS idx_sources_source ON url_sources(source_id);
+"""
+
+JS_EXTENSIONS = ('js', 'mjs')
+
+
+class URLCorpus:
+    """Embedded, indexed store of canonical URLs with provenance."""
+    
+    BATCH_SIZE = 10000
+    # Interning caches are dropped past this many entries to bound memory
+    CACHE_LIMIT = 500000
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.executescript(SCHEMA)
+        self._cache: Dict[str, Dict[str, int]] = {'hosts': {}, 'paths': {}, 'query_keys': {}, 'sources': {}}
+    
+    def __enter__(self) -> 'URLCorpus':
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        self.conn.close()
+    
+    def _intern(self, table: str, column: str, values: Iterable[str]) -> Dict[str, int]:
+        """Return ids for every requested value of a lookup table, inserting missing ones."""
+        cache = self._cache[table]
+        ids = {}
+        missing = []
+        for value in set(values):
+            if value in cache:
+                ids[value] = cache[value]
+            else:
+                missing.append(value)
+        if missing:
+            self.conn.executemany(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)",
+                                  ((v,) for v in missing))
+            found = {}
+            for chunk in iter_batches(missing, 500):
+                marks = ','.join('?' * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT {column}, id FROM {table} WHERE {column} IN ({marks})", chunk))
+            ids.update(found)
+            # The cache only speeds up later calls; this call's ids are complete either way
+            if len(cache) + len(found) > self.CACHE_LIMIT:
+                cache.clear()
+            cache.update(found)
+        return ids
+    
+    @staticmethod
+    def parse(url: str) -> Optional[Dict]:
+        """
+        Split a canonical URL into the indexed columns, or None if not an http(s) URL.
+        
+        Input comes from canonicalize_url (scheme://netloc/path?query, no
+        fragment), so plain string splitting is enough and much cheaper
+        than urlsplit.
+        """
+        scheme, sep, rest = url.partition('://')
+        if not sep or scheme not in ('http', 'https'):
+            return None
+        slash = rest.find('/')
+        netloc, target = (rest, '/') if slash == -1 else (rest[:slash], rest[slash:])
+        path, _, query = target.partition('?')
+        
+        hostport = netloc.rpartition('@')[2]
+        if hostport.startswith('['):
+            host, _, port = hostport[1:].partition(']')
+            port = port[1:]
+        else:
+            host, _, port = hostport.partition(':')
+        if not host or (port and not port.isdigit()):
+            return None
+        
+        last = path.rsplit('/', 1)[-1]
+        extension = last.rsplit('.', 1)[-1].lower() if '.' in last else None
+        if extension and (len(extension) > 10 or not extension.isalnum()):
+            extension = None
+        keys = sorted({pair.split('=', 1)[0] for pair in query.split('&') if pair}) if query else []
+        
+        return {
+            'url': url,
+            'scheme': scheme,
+            'host': host,
+            'port': int(port) if port else None,
+            'path': path or '/',
+            'query': query or None,
+            'extension': extension,
+            'keys': keys,
+            'has_params': int(bool(keys)),
+            'is_js': int(extension in JS_EXTENSIONS)
+        }
+    
+    def add_urls(self, urls: Iterable[str], source: str) -> Tuple[int, int]:
+        """
+        Bulk-insert URLs from one source. Returns (accepted, rejected).
+        
+        URLs are canonicalized first; lines that are not http(s) URLs are
+        rejected. Re-adding a known URL only records the extra source.
+        """
+        accepted = rejected = 0
+        source_id = self._intern('sources', 'name', [source])[source]
+        
+        for batch in iter_batches(urls, self.BATCH_SIZE):
+            rows = []
+            for url in batch:
+                row = self.parse(canonicalize_url(url))
+                if row:
+                    rows.append(row)
+                else:
+                    rejected += 1
+            if not rows:
+                continue
+            accepted += len(rows)
+            
+            with self.conn:
+                hosts = self._intern('hosts', 'name', [r['host'] for r in rows])
+                paths = self._intern('paths', 'path', [r['path'] for r in rows])
+                keys = self._intern('query_keys', 'key', [k for r in rows for k in r['keys']])
+                
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO urls (url, scheme, host_id, port, path_id, query, "
+                    "extension, has_params, is_js) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((r['url'], r['scheme'], hosts[r['host']], r['port'], paths[r['path']], r['query'],
+                      r['extension'], r['has_params'], r['is_js']) for r in rows)
+                )
+                
+                url_ids = {}
+                unique_urls = list({r['url'] for r in rows})
+                for chunk in iter_batches(unique_urls, 500):
+                    marks = ','.join('?' * len(chunk))
+                    url_ids.update(self.conn.execute(
+                        f"SELECT url, id FROM urls WHERE url IN ({marks})", chunk))
+                
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO url_sources (url_id, source_id) VALUES (?, ?)",
+                    ((url_ids[r['url']], source_id) for r in rows)
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO url_params (url_id, key_id) VALUES (?, ?)",
+                    ((url_ids[r['url']], keys[k]) for r in rows for k in r['keys'])
+                )
+        
+        return accepted, rejected
+    
+    def import_file(self, filepath: str, source: str) -> int:
+        """Load a text artifact into the store, return URLs accepted."""
+        accepted, _ = self.add_urls(iter_file_lines(filepath), source)
+        return accepted
+    
+    def _where(self, host: Optional[str] = None, extension: Optional[str] = None,
+               has_params: Optional[bool] = None, is_js: Optional[bool] = None,
+               param: Optional[str] = None, sources: Optional[List[str]] = None) -> Tuple[str, List]:
+        """Build the WHERE clause shared by query/count/export."""
+        clauses, args = [], []
+        
+        if host:
+            if host.startswith('*.'):
+                clauses.append("u.host_id IN (SELECT id FROM hosts WHERE name = ? OR name LIKE ?)")
+                args += [host[2:], f"%.{host[2:]}"]
+            else:
+                clauses.append("u.host_id = (SELECT id FROM hosts WHERE name = ?)")
+                args.append(host.lower())
+        if extension:
+            clauses.append("u.extension = ?")
+            args.append(extension.lower().lstrip('.'))
+        if has_params is not None:
+            clauses.append("u.has_params = ?")
+            args.append(int(has_params))
+        if is_js is not None:
+            clauses.append("u.is_js = ?")
+            args.append(int(is_js))
+        if param:
+            clauses.append("u.id IN (SELECT url_id FROM url_params WHERE key_id = "
+                           "(SELECT id FROM query_keys WHERE key = ?))")
+            args.append(param)
+        if sources:
+            marks = ','.join('?' * len(sources))
+            clauses.append(f"u.id IN (SELECT url_id FROM url_sources WHERE source_id IN "
+                           f"(SELECT id FROM sources WHERE name IN ({marks})))")
+            args += list(sources)
+        
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+    
+    def query(self, limit: Optional[int] = None, **filters) -> Iterator[str]:
+        """Yield matching URLs in sorted order. See _where for filters."""
+        where, args = self._where(**filters)
+        sql = f"SELECT u.url FROM urls u{where} ORDER BY u.url"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        for (url,) in self.conn.execute(sql, args):
+            yield url
+    
+    def count(self, **filters) -> int:
+        """Count matching URLs."""
+        where, args = self._where(**filters)
+        return self.conn.execute(f"SELECT COUNT(*) FROM urls u{where}", args).fetchone()[0]
+    
+    def hosts(self) -> Iterator[Tuple[str, int]]:
+        """Yield (host, url_count) pairs."""
+        yield from self.conn.execute(
+            "SELECT h.name, COUNT(u.id) FROM hosts h JOIN urls u ON u.host_id = h.id "
+            "GROUP BY h.id ORDER BY h.name")
+    
+    def export(self, filepath: str, **filters) -> int:
+        """Write matching URLs to a legacy text artifact, return count written."""
+        return write_file_lines(filepath, self.query(**filters))
+
+
+def main():
+    """Query a corpus database from the command line."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Query a Vauban URL corpus")
+    parser.add_argument('db', help='Path to corpus.db')
+    parser.add_argument('--host', help='Exact host, or *.example.com for subdomains')
+    parser.add_argument('--ext', help='File extension, e.g. php')
+    parser.add_argument('--params', action='store_true', help='Only URLs with query parameters')
+    parser.add_argument('--js', action='store_true', help='Only JavaScript files')
+    parser.add_argument('--param', help='Only URLs carrying this query key')
+    parser.add_argument('--source', action='append', help='Only URLs from this source (repeatable)')
+    parser.add_argument('--count', action='store_true', help='Print the count instead of URLs')
+    args = parser.parse_args()
+    
+    filters = {
+        'host': args.host,
+        'extension': args.ext,
+        'has_params': True if args.params else None,
+        'is_js': True if args.js else None,
+        'param': args.param,
+        'sources': args.source
+    }
+    
+    with URLCorpus(args.db) as corpus:
+        if args.count:
+            print(corpus.count(**filters))
+        else:
+            for url in corpus.query(**filters):
+                print(url)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Vauban - Technology Fingerprint Engine
+======================================
+Wappalyzer-style signature matching over captured HTTP responses.
+
+Rules name a technology, its category and the evidence that betrays it:
+header values, cookie names, body HTML, script sources and meta tags. The
+whole rule database is compiled once into per-field matchers (per header
+and meta name for those): every pattern is reduced to a literal it requires,
+so a response is lowercased once per field and only patterns whose literal
+occurs ever run a regex. Nothing is fetched: the engine
+runs over the records the probe stage already stored.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# category -> technology -> evidence. Patterns are case-insensitive regexes; an
+# empty pattern means "present". 'implies' adds technologies that always come along.
+DEFAULT_RULES = {
+    'frameworks': {
+        'express': {'headers': {'x-powered-by': r'express'}},
+        'django': {'cookies': {'csrftoken': '', 'sessionid': ''}, 'html': [r'csrfmiddlewaretoken'],
+                   'implies': ['python']},
+        'flask': {'headers': {'server': r'werkzeug'}, 'implies': ['python']},
+        'rails': {'headers': {'x-runtime': r'^[\d.]+$'}, 'cookies': {'_rails_session': ''},
+                  'meta': {'csrf-param': r'authenticity_token'}, 'implies': ['ruby']},
+        'laravel': {'cookies': {'laravel_session': '', 'xsrf-token': ''}, 'implies': ['php']},
+        'spring': {'headers': {'x-application-context': ''}, 'html': [r'Whitelabel Error Page'],
+                   'implies': ['java']},
+        'fastapi': {'html': [r'<title>FastAPI', r'/docs/oauth2-redirect'], 'implies': ['python']},
+        'aspnet': {'headers': {'x-aspnet-version': '', 'x-powered-by': r'asp\.net'},
+                   'cookies': {'asp.net_sessionid': ''}, 'html': [r'__VIEWSTATE']},
+        'nextjs': {'headers': {'x-powered-by': r'next\.js', 'x-nextjs-cache': ''},
+                   'html': [r'id="__next"', r'/_next/static/'], 'implies': ['react']},
+        'nuxt': {'html': [r'id="__nuxt"', r'window\.__NUXT__', r'/_nuxt/'], 'implies': ['vue']},
+        'react': {'html': [r'data-reactroot', r'data-reactid'], 'scripts': [r'react(?:-dom)?(?:\.production)?(?:\.min)?\.js']},
+        'vue': {'html': [r'data-v-[0-9a-f]{8}'], 'scripts': [r'vue(?:\.runtime)?(?:\.min)?\.js']},
+        'angular': {'html': [r'ng-version="', r'ng-app'], 'scripts': [r'angular(?:\.min)?\.js']},
+        'jquery': {'scripts': [r'jquery[.-]?(?:\d[\d.]*)?(?:\.min)?\.js']},
+        'php': {'headers': {'x-powered-by': r'php'}, 'cookies': {'phpsessid': ''}},
+        'java': {'cookies': {'jsessionid': ''}},
+        'python': {},
+        'ruby': {},
+    },
+    'servers': {
+        'nginx': {'headers': {'server': r'nginx'}},
+        'apache': {'headers': {'server': r'apache'}},
+        'iis': {'headers': {'server': r'microsoft-iis'}, 'implies': ['aspnet']},
+        'openresty': {'headers': {'server': r'openresty'}, 'implies': ['nginx']},
+        'caddy': {'headers': {'server': r'caddy'}},
+        'tomcat': {'headers': {'server': r'tomcat|coyote'}, 'html': [r'Apache Tomcat/'], 'implies': ['java']},
+        'envoy': {'headers': {'server': r'envoy', 'x-envoy-upstream-service-time': ''}},
+        'cloudflare': {'headers': {'server': r'cloudflare', 'cf-ray': ''}},
+        'aws': {'headers': {'server': r'awselb|amazons3', 'x-amz-request-id': '', 'x-amz-cf-id': ''}},
+        'gunicorn': {'headers': {'server': r'gunicorn'}, 'implies': ['python']},
+        'kestrel': {'headers': {'server': r'kestrel'}, 'implies': ['aspnet']},
+    },
+    'cms': {
+        'wordpress': {'html': [r'/wp-content/', r'/wp-includes/'], 'meta': {'generator': r'wordpress'},
+                      'headers': {'link': r'rel="https://api\.w\.org/"'}, 'implies': ['php']},
+        'drupal': {'headers': {'x-drupal-cache': '', 'x-generator': r'drupal'},
+                   'meta': {'generator': r'drupal'}, 'html': [r'Drupal\.settings'], 'implies': ['php']},
+        'joomla': {'meta': {'generator': r'joomla'}, 'html': [r'/media/jui/'], 'implies': ['php']},
+        'ghost': {'meta': {'generator': r'ghost'}},
+        'shopify': {'headers': {'x-shopid': ''}, 'html': [r'cdn\.shopify\.com']},
+        'magento': {'cookies': {'frontend': '', 'mage-cache-storage': ''}, 'html': [r'Mage\.Cookies'],
+                    'implies': ['php']},
+    },
+    'api': {
+        'graphql': {'html': [r'graphiql', r'graphql-playground', r'apollo-server']},
+        'swagger': {'html': [r'swagger-ui', r'"swagger"\s*:', r'"openapi"\s*:']},
+    },
+    'waf': {
+        'cloudflare': {'headers': {'cf-ray': '', 'server': r'cloudflare'}, 'cookies': {'__cf_bm': '', '__cfduid': ''}},
+        'akamai': {'headers': {'server': r'akamaighost', 'x-akamai-transformed': '', 'akamai-grn': ''},
+                   'cookies': {'ak_bmsc': '', 'bm_sz': ''}},
+        'aws_waf': {'headers': {'x-amzn-waf-action': ''}, 'cookies': {'aws-waf-token': ''}},
+        'imperva': {'headers': {'x-iinfo': '', 'x-cdn': r'incapsula'}, 'cookies': {'incap_ses_': '', 'visid_incap_': ''}},
+        'sucuri': {'headers': {'server': r'sucuri', 'x-sucuri-id': ''}},
+        'f5_bigip': {'cookies': {'bigipserver': '', 'ts01': ''}, 'headers': {'server': r'big-?ip'}},
+        'modsecurity': {'headers': {'server': r'mod_security|modsecurity'}, 'html': [r'Mod_Security|This error was generated by Mod_Security']},
+        'fastly': {'headers': {'x-fastly-request-id': '', 'fastly-debug-digest': ''}},
+    }
+}
+
+SCRIPT_SRC = re.compile(r'<script[^>]+src\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+META_TAG = re.compile(r'<meta\s[^>]*>', re.IGNORECASE)
+META_NAME = re.compile(r'(?:name|property|http-equiv)\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+META_CONTENT = re.compile(r'content\s*=\s*["\']([^"\']*)', re.IGNORECASE)
+
+Label = Tuple[str, str]  # (category, technology)
+
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """Top-level '|' branches of a regex."""
+    branches, depth, start, i = [], 0, 0, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _required_literal(pattern: str) -> str:
+    """Longest lowercase literal every match of a single-branch regex must contain ('' if none)."""
+    best, run, depth, i = '', '', 0, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            char, step, literal = escaped, 2, not escaped.isalnum()
+        else:
+            step, literal = 1, char not in '.^$*+?{}[]()|'
+        if char in '([' and step == 1:
+            depth += 1
+        elif char in ')]' and step == 1:
+            depth -= 1
+        quantified = pattern[i + step:i + step + 1] in ('?', '*', '{')
+        if literal and depth == 0 and not quantified:
+            run += char.lower()
+            if len(run) > len(best):
+                best = run
+        else:
+            run = ''
+        i += step
+    return best
+
+
+class _Matcher:
+    """
+    Many patterns checked in one pass over a text.
+    
+    Each pattern is reduced to a literal it cannot match without; one
+    lowercase copy of the text is searched for those literals and only the
+    surviving patterns run their regex.
+    """
+    
+    def __init__(self, entries: List[Tuple[str, Label]]):
+        self.present: Set[Label] = set()
+        self.checks: List[Tuple[str, Optional[re.Pattern], Label]] = []
+        for pattern, label in entries:
+            if not pattern:
+                self.present.add(label)
+                continue
+            for branch in _split_alternatives(pattern):
+                literal = _required_literal(branch)
+                # A branch that is nothing but its literal needs no regex at all
+                regex = None if re.escape(literal) == branch.lower() else re.compile(branch, re.IGNORECASE)
+                self.checks.append((literal, regex, label))
+    
+    def scan(self, text: str, found: Set[Label]) -> None:
+        if self.present:
+            found.update(self.present)
+        if not self.checks or not text:
+            return
+        lowered = text.lower()
+        for literal, regex, label in self.checks:
+            if label in found or literal not in lowered:
+                continue
+            if regex is None or regex.search(text):
+                found.add(label)
+
+
+def _header_key(name: str) -> str:
+    """Header names as httpx stores them (lowercase, dashes as underscores)."""
+    return name.lower().replace('-', '_')
+
+
+class SignatureEngine:
+    """Rule database compiled into per-field multi-pattern matchers."""
+    
+    def __init__(self, rules: Optional[Dict] = None):
+        self.rules = rules or DEFAULT_RULES
+        headers: Dict[str, List] = {}
+        cookies: List[Tuple[str, Label]] = []
+        meta: Dict[str, List] = {}
+        html: List[Tuple[str, Label]] = []
+        scripts: List[Tuple[str, Label]] = []
+        self.implies: Dict[Label, List[Label]] = {}
+        self.categories: Dict[str, str] = {}
+        
+        for category, techs in self.rules.items():
+            for tech, rule in techs.items():
+                label = (category, tech)
+                self.categories.setdefault(tech, category)
+                for name, pattern in rule.get('headers', {}).items():
+                    headers.setdefault(_header_key(name), []).append((pattern, label))
+                for name, pattern in rule.get('cookies', {}).items():
+                    # Cookie names are matched as prefixes (incap_ses_1234_...)
+                    cookies.append((rf"(?:^|;\s*){re.escape(name.lower())}[^=;]*={pattern or ''}", label))
+                for name, pattern in rule.get('meta', {}).items():
+                    meta.setdefault(name.lower(), []).append((pattern, label))
+                html += [(pattern, label) for pattern in rule.get('html', [])]
+                scripts += [(pattern, label) for pattern in rule.get('scripts', [])]
+                if rule.get('implies'):
+                    self.implies[label] = rule['implies']
+        
+        # Header presence rules only fire when the header exists, so they stay out of 'present'
+        self.headers = {name: _Matcher(entries) for name, entries in headers.items()}
+        self.cookies = _Matcher(cookies)
+        self.meta = {name: _Matcher(entries) for name, entries in meta.items()}
+        self.html = _Matcher(html)
+        self.scripts = _Matcher(scripts)
+    
+    def _resolve_implied(self, found: Set[Label]) -> None:
+        pending = list(found)
+        while pending:
+            for tech in self.implies.get(pending.pop(), []):
+                label = (self.categories.get(tech, 'frameworks'), tech)
+                if label not in found:
+                    found.add(label)
+                    pending.append(label)
+    
+    def match(self, headers: Optional[Dict] = None, body: str = '') -> Dict[str, List[str]]:
+        """Technologies per category for one response."""
+        found: Set[Label] = set()
+        cookie_header = ''
+        for name, value in (headers or {}).items():
+            key = _header_key(name)
+            values = value if isinstance(value, list) else [value]
+            if key == 'set_cookie':
+                cookie_header = '; '.join(v.split(';', 1)[0] for v in values).lower()
+                continue
+            matcher = self.headers.get(key)
+            if matcher:
+                for v in values:
+                    matcher.scan(str(v), found)
+        if cookie_header:
+            self.cookies.scan(cookie_header, found)
+        
+        if body:
+            self.html.scan(body, found)
+            self.scripts.scan(' '.join(SCRIPT_SRC.findall(body)), found)
+            if self.meta:
+                for tag in META_TAG.findall(body):
+                    name = META_NAME.search(tag)
+                    content = META_CONTENT.search(tag)
+                    matcher = self.meta.get(name.group(1).lower()) if name else None
+                    if matcher and content:
+                        matcher.scan(content.group(1), found)
+        
+        self._resolve_implied(found)
+        detected: Dict[str, List[str]] = {category: [] for category in self.rules}
+        for category, tech in sorted(found):
+            detected.setdefault(category, []).append(tech)
+        return detected
+    
+    def match_all(self, records: Iterable[Dict]) -> Iterable[Tuple[Dict, Dict[str, List[str]]]]:
+        """(record, detected) for probe records carrying 'headers' and optionally 'body'."""
+        for record in records:
+            yield record, self.match(record.get('headers'), record.get('body', ''))
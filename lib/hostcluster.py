@@ -0,0 +1,268 @@
+"""
+Vauban - Host Clustering
+========================
+Group live hosts that are the same application behind different names.
+
+Wildcard vhosts, regional aliases and parked domains share a resolved IP
+set and serve the same page. Hosts are bucketed by IP set, normalized
+title, response header names and the script/stylesheet URLs the page
+loads, then split inside each bucket by the Hamming distance between
+64-bit simhashes of their bodies (computed over a whole bucket at once
+with numpy when it is installed). Bodies too thin to fingerprint (empty
+401s, bare SPA shells) are never clustered. One host per cluster is
+scanned, along with any paths only found on the other members; its
+findings are copied to the other members and marked as inferred.
+"""
+
+import os
+import re
+import json
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from lib.utils import iter_file_lines, write_file_lines
+
+
+WORD = re.compile(r'[a-z]+')
+DIGITS = re.compile(r'\d+')
+TAGS = re.compile(r'<[^>]*>')
+ASSETS = re.compile(r'<(?:script|link)\b[^>]*?\b(?:src|href)\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+
+# Distinct shingles a body needs before its simhash says anything about the app
+MIN_SHINGLES = 16
+
+# Headers whose presence says nothing about the application behind them
+VOLATILE_HEADERS = frozenset({
+    'date', 'expires', 'age', 'etag', 'last_modified', 'content_length', 'set_cookie', 'cf_ray',
+    'x_request_id', 'x_amz_request_id', 'x_amz_cf_id', 'x_amz_cf_pop', 'x_cache', 'via', 'report_to', 'nel'
+})
+
+
+def simhash(text: str, shingle: int = 3, min_shingles: int = MIN_SHINGLES) -> Optional[int]:
+    """
+    64-bit simhash over the distinct word shingles of text stripped of tags and digits.
+    
+    None when the text has fewer than min_shingles shingles.
+    """
+    words = WORD.findall(DIGITS.sub(' ', TAGS.sub(' ', text.lower())))
+    tokens = {' '.join(words[i:i + shingle]) for i in range(max(0, len(words) - shingle + 1))}
+    if len(tokens) < min_shingles:
+        return None
+    # Column-wise majority vote over the binary digests
+    rows = [format(int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), 'big'), '064b')
+            for t in tokens]
+    half = len(rows) / 2
+    return int(''.join('1' if column.count('1') > half else '0' for column in zip(*rows)), 2)
+
+
+def host_key(url: str) -> str:
+    """scheme://netloc of a URL, the unit hosts are clustered and scanned by."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def bucket_key(record: Dict) -> Tuple:
+    """Exact part of the fingerprint: IP set, normalized title, stable header names, loaded assets."""
+    title = ' '.join(DIGITS.sub('0', record.get('title') or '').lower().split())
+    headers = sorted(name.lower().replace('-', '_') for name in (record.get('headers') or {}))
+    header_set = hashlib.blake2b(' '.join(h for h in headers if h not in VOLATILE_HEADERS).encode(),
+                                 digest_size=8).hexdigest()
+    # SPA shells differ only in the bundles they load, which tag stripping removes from the simhash
+    assets = hashlib.blake2b(' '.join(sorted(set(ASSETS.findall(record.get('body') or '')))).encode(),
+                             digest_size=8).hexdigest()
+    return tuple(sorted(record.get('ips') or [])), title, header_set, assets, record.get('status', 0)
+
+
+def _hamming_groups(hashes: List[int], max_distance: int) -> List[int]:
+    """Leader index for every hash: each unassigned hash claims all hashes within max_distance."""
+    leaders = [-1] * len(hashes)
+    if numpy is not None and len(hashes) > 1:
+        values = numpy.array(hashes, dtype=numpy.uint64)
+        for i in range(len(hashes)):
+            if leaders[i] >= 0:
+                continue
+            diff = numpy.bitwise_xor(values, values[i])
+            distance = numpy.unpackbits(diff.view(numpy.uint8)).reshape(-1, 64).sum(axis=1)
+            for j in numpy.nonzero(distance <= max_distance)[0]:
+                if leaders[j] < 0:
+                    leaders[j] = i
+        return leaders
+    
+    for i, value in enumerate(hashes):
+        if leaders[i] >= 0:
+            continue
+        for j in range(i, len(hashes)):
+            if leaders[j] < 0 and bin(value ^ hashes[j]).count('1') <= max_distance:
+                leaders[j] = i
+    return leaders
+
+
+class HostClusterer:
+    """Cluster probe records; the first host of each cluster represents it."""
+    
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        self.buckets: Dict[Tuple, List[Tuple[str, int, Dict]]] = {}
+        self.singletons: List[Tuple[str, Dict]] = []
+    
+    def add(self, record: Dict) -> None:
+        url = record.get('url')
+        if not url:
+            return
+        fingerprint = simhash(record.get('body') or '')
+        if fingerprint is None:
+            self.singletons.append((host_key(url), record))
+            return
+        self.buckets.setdefault(bucket_key(record), []).append((host_key(url), fingerprint, record))
+    
+    def clusters(self) -> List[Dict]:
+        clusters = [{'representative': host, 'members': [], 'ips': record.get('ips', []),
+                     'title': record.get('title', ''), 'simhash': None} for host, record in self.singletons]
+        for hosts in self.buckets.values():
+            leaders = _hamming_groups([h for _, h, _ in hosts], self.max_distance)
+            groups: Dict[int, List[int]] = {}
+            for index, leader in enumerate(leaders):
+                groups.setdefault(leader, []).append(index)
+            for leader, members in groups.items():
+                record = hosts[leader][2]
+                clusters.append({
+                    'representative': hosts[leader][0],
+                    'members': [hosts[i][0] for i in members if i != leader],
+                    'ips': record.get('ips', []),
+                    'title': record.get('title', ''),
+                    'simhash': f"{hosts[leader][1]:016x}"
+                })
+        clusters.sort(key=lambda c: -len(c['members']))
+        return clusters
+
+
+def cluster_probe_results(probe_file: str, clusters_file: str, max_distance: int = 3) -> Tuple[int, int]:
+    """Cluster the hosts of a probe file. Returns (hosts, clusters)."""
+    clusterer = HostClusterer(max_distance)
+    hosts = 0
+    for line in iter_file_lines(probe_file):
+        try:
+            clusterer.add(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+        hosts += 1
+    clusters = clusterer.clusters()
+    with open(clusters_file, 'w') as f:
+        json.dump(clusters, f, indent=2)
+    return hosts, len(clusters)
+
+
+def load_members(clusters_file: str) -> Dict[str, str]:
+    """member host -> representative host, for clusters with more than one host."""
+    with open(clusters_file) as f:
+        clusters = json.load(f)
+    return {member: c['representative'] for c in clusters for member in c['members']}
+
+
+def _path_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.path or '/'}?{parts.query}" if parts.query else (parts.path or '/')
+
+
+def filter_representatives(urls_file: str, output_file: str, clusters_file: str) -> Tuple[int, int]:
+    """
+    Copy urls_file without member URLs the cluster already covers. Returns (kept, dropped).
+    
+    A member URL is dropped when its path and query are also present on the
+    representative or on an earlier member of the same cluster; paths only
+    a member is known to serve are kept on that member.
+    """
+    members = load_members(clusters_file)
+    covered = set()
+    for url in iter_file_lines(urls_file):
+        host = host_key(url)
+        if host not in members:
+            covered.add((host, _path_key(url)))
+    dropped = 0
+    
+    def kept():
+        nonlocal dropped
+        for url in iter_file_lines(urls_file):
+            representative = members.get(host_key(url))
+            if representative is not None:
+                key = (representative, _path_key(url))
+                if key in covered:
+                    dropped += 1
+                    continue
+                covered.add(key)
+            yield url
+    
+    return write_file_lines(output_file, kept()), dropped
+
+
+def _rehost(value: str, representative: str, member: str) -> str:
+    return member + value[len(representative):] if value.lower().startswith(representative) else value
+
+
+def _inferred_copies(finding: Dict, by_representative: Dict[str, List[str]], fields: Iterable[str]) -> List[Dict]:
+    """Copies of a finding for every member of its host's cluster."""
+    source = next((finding[f] for f in fields if isinstance(finding.get(f), str) and '://' in finding[f]), None)
+    if not source or finding.get('inferred'):
+        return []
+    representative = host_key(source)
+    copies = []
+    for member in by_representative.get(representative, []):
+        copy = dict(finding)
+        for field in fields:
+            if isinstance(copy.get(field), str):
+                copy[field] = _rehost(copy[field], representative, member)
+        copy['inferred'] = True
+        copy['inferred_from'] = source
+        copies.append(copy)
+    return copies
+
+
+def propagate_findings(scan_dir: str, clusters_file: str) -> int:
+    """
+    Add inferred copies of representative findings for the other cluster members.
+    
+    Confirmed counts (secrets_found, by_severity, findings) are left alone;
+    each result file records how many inferred entries it gained.
+    """
+    by_representative: Dict[str, List[str]] = {}
+    for member, representative in load_members(clusters_file).items():
+        by_representative.setdefault(representative, []).append(member)
+    if not by_representative:
+        return 0
+    
+    total = 0
+    for filename, key, fields in (('secrets_results.json', 'secrets', ('url',)),
+                                  ('custom_results.json', 'vulnerabilities', ('url',))):
+        path = os.path.join(scan_dir, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            results = json.load(f)
+        inferred = [c for finding in results.get(key, []) for c in _inferred_copies(finding, by_representative, fields)]
+        if inferred:
+            results[key].extend(inferred)
+            results['inferred'] = results.get('inferred', 0) + len(inferred)
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+            total += len(inferred)
+    
+    # nuclei writes JSON lines
+    nuclei_file = os.path.join(scan_dir, 'nuclei_results.json')
+    if os.path.exists(nuclei_file):
+        inferred = []
+        for line in iter_file_lines(nuclei_file):
+            try:
+                finding = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            inferred += _inferred_copies(finding, by_representative, ('matched-at', 'host', 'url'))
+        if inferred:
+            write_file_lines(nuclei_file, (json.dumps(f) for f in inferred), mode='a')
+            total += len(inferred)
+    return total
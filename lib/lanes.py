@@ -0,0 +1,255 @@
+"""
+Vauban - Lane Scheduler
+=======================
+Keep slow and WAF-fronted hosts from starving the rest of a scan.
+
+Work is queued per host and every host sits in one of three lanes:
+
+- fast: the default, most workers, several requests per host in flight
+- slow: hosts whose observed latency exceeds `slow_latency`, few workers,
+  one request per host, a per-host URL budget
+- protected: hosts behind a WAF (known from tech detection, or recognized
+  via TECH_SIGNATURES['waf'] in the headers of a blocked response), one
+  request per host, a delay before each request and the smallest budget
+
+A 429 without a recognizable WAF counts as a slow response.
+
+Each lane has its own thread pool, so however many hosts tarpit the scan,
+the fast lane keeps its workers. Hosts move between lanes as latency and
+WAF evidence come in; a slow host that recovers returns to the fast lane.
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from lib.utils import load_config
+from lib.fingerprint import DEFAULT_RULES, SignatureEngine
+
+
+DEFAULT_LANES = {
+    'fast': {'workers': 10, 'per_host': 4, 'budget': 0, 'delay': 0.0},
+    'slow': {'workers': 3, 'per_host': 1, 'budget': 100, 'delay': 0.0},
+    'protected': {'workers': 2, 'per_host': 1, 'budget': 30, 'delay': 1.0}
+}
+
+
+class LaneScheduler:
+    """Per-host queues drained through fast, slow and protected worker pools."""
+    
+    CONFIG_FILE = Path(__file__).parent.parent / 'config' / 'settings.yaml'
+    # URLs read ahead of the workers; more are pulled (up to the cap) while the fast lane has nothing to do
+    READ_AHEAD = 2000
+    MAX_READ_AHEAD = 20000
+    # Statuses a WAF blocks with; WAF headers on other responses are just a CDN in front
+    BLOCK_STATUS = {403, 406, 429, 503}
+    
+    def __init__(self, lanes: Optional[Dict] = None, slow_latency: float = 3.0,
+                 protected_hosts: Iterable[str] = ()):
+        self.lanes = {name: dict(settings, **((lanes or {}).get(name) or {}))
+                      for name, settings in DEFAULT_LANES.items()}
+        self.slow_latency = slow_latency
+        self.waf_engine = SignatureEngine({'waf': DEFAULT_RULES['waf']})
+        self.lock = threading.Lock()
+        
+        self.host_lane: Dict[str, str] = {host: 'protected' for host in protected_hosts}
+        self.latency: Dict[str, float] = {}
+        self.queues: Dict[str, deque] = {}
+        self.pending = 0
+        self.lane_hosts = {name: deque() for name in self.lanes}
+        self.queued = {name: set() for name in self.lanes}
+        self.busy: Dict[str, int] = {}
+        self.used: Dict[Tuple[str, str], int] = {}
+        self.stats = {name: {'done': 0, 'skipped': 0} for name in self.lanes}
+        self.stats['moves'] = 0
+    
+    @classmethod
+    def from_config(cls, tech_results: Optional[str] = None, config_file: Optional[str] = None) -> 'LaneScheduler':
+        """Lanes from scan.lanes in settings.yaml, seeded with the WAF hosts of tech_results.json."""
+        path = config_file or cls.CONFIG_FILE
+        config = load_config(path) if os.path.exists(path) else {}
+        lanes = dict((config or {}).get('scan', {}).get('lanes', {}))
+        slow_latency = lanes.pop('slow_latency', 3.0)
+        
+        protected = []
+        if tech_results and os.path.exists(tech_results):
+            try:
+                with open(tech_results) as f:
+                    waf_hosts = json.load(f).get('summary', {}).get('waf_detected', [])
+                protected = [urlsplit(entry['url']).netloc for entry in waf_hosts if isinstance(entry, dict)]
+            except (OSError, ValueError, KeyError):
+                pass
+        return cls(lanes, slow_latency, protected)
+    
+    def lane_of(self, host: str) -> str:
+        return self.host_lane.get(host, 'fast')
+    
+    def _move(self, host: str, lane: str) -> None:
+        """Reassign a host (lock held); its queue is picked up by the new lane."""
+        if self.lane_of(host) == lane:
+            return
+        self.host_lane[host] = lane
+        self.stats['moves'] += 1
+        if host not in self.queued[lane]:
+            self.queued[lane].add(host)
+            self.lane_hosts[lane].append(host)
+    
+    def observe(self, host: str, seconds: Optional[float] = None, waf: bool = False) -> None:
+        """Feed a latency sample or WAF evidence for a host."""
+        with self.lock:
+            if waf:
+                self._move(host, 'protected')
+                return
+            if seconds is None:
+                return
+            previous = self.latency.get(host)
+            latency = seconds if previous is None else 0.7 * previous + 0.3 * seconds
+            self.latency[host] = latency
+            lane = self.lane_of(host)
+            if lane == 'fast' and latency > self.slow_latency:
+                self._move(host, 'slow')
+            elif lane == 'slow' and latency < self.slow_latency / 2:
+                self._move(host, 'fast')
+    
+    def response_hook(self, response, *args, **kwargs):
+        """requests response hook: latency of every request and WAF signatures on blocked ones."""
+        host = urlsplit(response.url).netloc
+        if response.status_code in self.BLOCK_STATUS and self.waf_engine.match(dict(response.headers)).get('waf'):
+            self.observe(host, waf=True)
+        elif response.status_code == 429:
+            # Rate limited without a recognizable WAF: back off as if slow
+            self.observe(host, self.slow_latency * 2)
+        else:
+            self.observe(host, response.elapsed.total_seconds())
+        return response
+    
+    def attach(self, session):
+        """Let a session's responses steer the lanes."""
+        session.hooks['response'].append(self.response_hook)
+        return session
+    
+    def _next(self, lane: str) -> Optional[Tuple[str, str]]:
+        """(host, url) for a lane's next free slot, round-robin over its hosts (lock held)."""
+        hosts = self.lane_hosts[lane]
+        settings = self.lanes[lane]
+        for _ in range(len(hosts)):
+            host = hosts.popleft()
+            queue = self.queues.get(host)
+            if self.lane_of(host) != lane or not queue:
+                self.queued[lane].discard(host)
+                continue
+            hosts.append(host)
+            if self.busy.get(host, 0) >= settings['per_host']:
+                continue
+            budget = settings['budget']
+            if budget and self.used.get((host, lane), 0) >= budget:
+                self.stats[lane]['skipped'] += len(queue)
+                self.pending -= len(queue)
+                queue.clear()
+                continue
+            self.used[(host, lane)] = self.used.get((host, lane), 0) + 1
+            self.busy[host] = self.busy.get(host, 0) + 1
+            self.pending -= 1
+            return host, queue.popleft()
+        return None
+    
+    def _task(self, fn: Callable, url: str, host: str, delay: float):
+        if delay:
+            time.sleep(delay)
+        started = time.monotonic()
+        try:
+            return fn(url)
+        finally:
+            # Covers timeouts, which never reach the response hook
+            elapsed = time.monotonic() - started
+            if elapsed > self.slow_latency:
+                self.observe(host, elapsed)
+    
+    def _enqueue(self, url: str) -> None:
+        """Queue a URL on its host (lock held); dropped if the host's lane budget is spent."""
+        host = urlsplit(url).netloc
+        lane = self.lane_of(host)
+        budget = self.lanes[lane]['budget']
+        if budget and self.used.get((host, lane), 0) >= budget:
+            self.stats[lane]['skipped'] += 1
+            return
+        queue = self.queues.get(host)
+        if queue is None:
+            queue = self.queues[host] = deque()
+        if not queue and host not in self.queued[lane]:
+            self.queued[lane].add(host)
+            self.lane_hosts[lane].append(host)
+        queue.append(url)
+        self.pending += 1
+    
+    def map(self, fn: Callable, urls: Iterable[str]) -> Iterator[Tuple[str, object]]:
+        """
+        Run fn over urls through the lanes, yielding (url, result) as tasks finish.
+        
+        urls is consumed lazily, READ_AHEAD URLs ahead of the workers, so one
+        call covers a whole stream without loading it.
+        """
+        stream = iter(urls)
+        exhausted = False
+        executors = {name: ThreadPoolExecutor(max_workers=s['workers']) for name, s in self.lanes.items()}
+        inflight = {}
+        running = {name: 0 for name in self.lanes}
+        try:
+            while True:
+                with self.lock:
+                    limit = self.READ_AHEAD
+                    while True:
+                        while not exhausted and self.pending < limit:
+                            url = next(stream, None)
+                            if url is None:
+                                exhausted = True
+                            else:
+                                self._enqueue(url)
+                        
+                        for lane, settings in self.lanes.items():
+                            while running[lane] < settings['workers']:
+                                picked = self._next(lane)
+                                if picked is None:
+                                    break
+                                host, url = picked
+                                future = executors[lane].submit(self._task, fn, url, host, settings['delay'])
+                                inflight[future] = (url, host, lane)
+                                running[lane] += 1
+                        
+                        # Queued work all sits on slow or protected hosts: read further for the fast lane
+                        if (exhausted or limit >= self.MAX_READ_AHEAD
+                                or running['fast'] >= self.lanes['fast']['workers']):
+                            break
+                        limit = min(self.MAX_READ_AHEAD, self.pending + self.READ_AHEAD)
+                if not inflight:
+                    break
+                
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, host, lane = inflight.pop(future)
+                    running[lane] -= 1
+                    with self.lock:
+                        self.busy[host] -= 1
+                        self.stats[lane]['done'] += 1
+                    try:
+                        result = future.result()
+                    except Exception:
+                        result = None
+                    yield url, result
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def summary(self) -> str:
+        lanes = ', '.join(f"{name} {self.stats[name]['done']}" +
+                          (f" (+{self.stats[name]['skipped']} over budget)" if self.stats[name]['skipped'] else '')
+                          for name in self.lanes)
+        protected = sum(1 for lane in self.host_lane.values() if lane == 'protected')
+        slow = sum(1 for lane in self.host_lane.values() if lane == 'slow')
+        return f"lanes: {lanes}; {slow} slow and {protected} protected hosts, {self.stats['moves']} moves"
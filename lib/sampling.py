@@ -0,0 +1,137 @@
+"""
+Vauban - Target Sampling
+========================
+Coverage-aware selection of URLs under a request budget.
+
+Rather than taking whatever sorts first, URLs are grouped by host and path
+template (lib.clustering.url_template), one representative is kept per
+template (preferring URLs with query parameters), and the budget is spent
+round-robin across hosts. The resulting plan records what was selected and
+what was skipped.
+
+Sample from the command line (used by the shell modules):
+    python3 -m lib.sampling all_urls.txt sample.txt --budget 50 --plan plan.json
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lib.utils import iter_file_lines, write_file_lines
+from lib.clustering import url_template
+
+
+def _param_count(url: str) -> int:
+    query = url.partition('?')[2].partition('#')[0]
+    return sum(1 for pair in query.split('&') if pair)
+
+
+class TargetSampler:
+    """Pick a coverage-maximizing subset of URLs for a fixed budget."""
+    
+    def __init__(self, budget: int, template=url_template):
+        self.budget = budget
+        self.template = template
+        # host -> template -> [representative, params, urls_seen]
+        self.groups: Dict[str, Dict[str, list]] = {}
+        self.total = 0
+    
+    def add(self, url: str) -> None:
+        """Offer a URL; it replaces its template's representative if it carries more params."""
+        url = url.strip()
+        if not url:
+            return
+        self.total += 1
+        host, template = self.template(url)
+        templates = self.groups.setdefault(host, {})
+        params = _param_count(url)
+        entry = templates.get(template)
+        if entry is None:
+            templates[template] = [url, params, 1]
+            return
+        entry[2] += 1
+        if params > entry[1]:
+            entry[0], entry[1] = url, params
+    
+    def add_all(self, urls: Iterable[str]) -> 'TargetSampler':
+        for url in urls:
+            self.add(url)
+        return self
+    
+    def select(self) -> Tuple[List[str], Dict]:
+        """
+        Spend the budget round-robin across hosts. Returns (selected, plan).
+        
+        Within a host, templates with parameters come first, then the most
+        populous ones.
+        """
+        queues = {
+            host: sorted(templates.items(), key=lambda item: (-item[1][1], -item[1][2], item[0]))
+            for host, templates in self.groups.items()
+        }
+        hosts = sorted(queues, key=lambda h: (-len(queues[h]), h))
+        
+        selected: List[str] = []
+        position = dict.fromkeys(hosts, 0)
+        while len(selected) < self.budget:
+            progressed = False
+            for host in hosts:
+                if len(selected) >= self.budget:
+                    break
+                index = position[host]
+                if index < len(queues[host]):
+                    selected.append(queues[host][index][1][0])
+                    position[host] = index + 1
+                    progressed = True
+            if not progressed:
+                break
+        
+        skipped = []
+        per_host = {}
+        for host in hosts:
+            queue, taken = queues[host], position[host]
+            per_host[host] = {
+                'templates': len(queue),
+                'selected': taken,
+                'urls': sum(entry[2] for _, entry in queue)
+            }
+            for template, (url, _, count) in queue[taken:]:
+                skipped.append({'host': host, 'template': template, 'urls': count, 'exemplar': url})
+        
+        plan = {
+            'budget': self.budget,
+            'input_urls': self.total,
+            'templates': sum(len(q) for q in queues.values()),
+            'selected': len(selected),
+            'hosts': per_host,
+            'targets': selected,
+            'skipped_templates': skipped
+        }
+        return selected, plan
+
+
+def sample_targets(urls: Iterable[str], budget: int, plan_file: Optional[str] = None) -> List[str]:
+    """Select up to `budget` URLs for coverage, optionally writing the plan as JSON."""
+    selected, plan = TargetSampler(budget).add_all(urls).select()
+    if plan_file:
+        with open(plan_file, 'w') as f:
+            json.dump(plan, f, indent=2)
+    return selected
+
+
+def main():
+    """Sample a URL file from the command line."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Coverage-aware URL sampling")
+    parser.add_argument('input', help='URL file')
+    parser.add_argument('output', help='File to write the selected URLs to')
+    parser.add_argument('--budget', type=int, required=True, help='Number of URLs to select')
+    parser.add_argument('--plan', help='Write the selection plan (JSON) here')
+    args = parser.parse_args()
+    
+    selected = sample_targets(iter_file_lines(args.input), args.budget, args.plan)
+    write_file_lines(args.output, selected)
+
+
+if __name__ == "__main__":
+    main()
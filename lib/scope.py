@@ -0,0 +1,282 @@
+"""
+Vauban - Scope Engine
+=====================
+Compiled in/out-of-scope matching for hosts, IPs and URLs.
+
+A scope is a list of include and exclude rules:
+    example.com          the domain itself
+    *.example.com        the domain and every subdomain
+    10.0.0.0/8, 1.2.3.4  networks and addresses (IPv4 or IPv6)
+    re:^https://x\\.com/api/   a regex matched against the full URL
+
+Domains compile into a reversed-label trie (com -> example -> api) and
+networks into a binary radix tree per address family, so a check costs one
+walk per label or prefix bit regardless of how many rules there are.
+Exclusions always win. The compiled scope is shared with module
+subprocesses through the VAUBAN_SCOPE environment variable.
+"""
+
+import os
+import re
+import json
+import ipaddress
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from lib.utils import iter_file_lines
+
+
+SCOPE_ENV = 'VAUBAN_SCOPE'
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class OutOfScope(Exception):
+    """Raised when a request targets a URL outside the scope."""
+
+
+class DomainTrie:
+    """Reversed-label trie: 'api.example.com' is stored as com -> example -> api."""
+    
+    EXACT = '\x00exact'
+    WILDCARD = '\x00wild'
+    
+    def __init__(self):
+        self.root: Dict = {}
+    
+    def add(self, pattern: str) -> None:
+        pattern = pattern.lower().strip().rstrip('.')
+        wildcard = pattern.startswith('*.')
+        if wildcard:
+            pattern = pattern[2:]
+        node = self.root
+        for label in reversed(pattern.split('.')):
+            node = node.setdefault(label, {})
+        # '*.example.com' covers the apex as well as its subdomains
+        node[self.WILDCARD if wildcard else self.EXACT] = True
+    
+    def __contains__(self, host: str) -> bool:
+        node = self.root
+        labels = host.lower().rstrip('.').split('.')
+        for label in reversed(labels):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self.WILDCARD in node:
+                return True
+        return self.EXACT in node
+    
+    def __bool__(self) -> bool:
+        return bool(self.root)
+
+
+class IPRadixTree:
+    """Binary radix tree of networks; membership is a longest-path walk over address bits."""
+    
+    def __init__(self):
+        self.roots: Dict[int, Dict] = {4: {}, 6: {}}
+    
+    def add(self, network: IPNetwork) -> None:
+        node = self.roots[network.version]
+        bits, length = int(network.network_address), network.prefixlen
+        width = network.max_prefixlen
+        for i in range(length):
+            if node.get('end'):
+                return  # already covered by a shorter prefix
+            node = node.setdefault((bits >> (width - 1 - i)) & 1, {})
+        node.clear()
+        node['end'] = True
+    
+    def __contains__(self, address: IPAddress) -> bool:
+        node = self.roots[address.version]
+        bits, width = int(address), address.max_prefixlen
+        for i in range(width):
+            if node.get('end'):
+                return True
+            node = node.get((bits >> (width - 1 - i)) & 1)
+            if node is None:
+                return False
+        return bool(node.get('end'))
+    
+    def __bool__(self) -> bool:
+        return any(self.roots.values())
+
+
+class _RuleSet:
+    """One side (include or exclude) of a scope."""
+    
+    def __init__(self, rules: Iterable[str]):
+        self.domains = DomainTrie()
+        self.networks = IPRadixTree()
+        self.patterns: List[str] = []
+        for rule in rules:
+            rule = rule.strip()
+            if not rule or rule.startswith('#'):
+                continue
+            if rule.startswith('re:'):
+                self.patterns.append(rule[3:])
+                continue
+            try:
+                self.networks.add(ipaddress.ip_network(rule, strict=False))
+                continue
+            except ValueError:
+                pass
+            self.domains.add(_host_of(rule) or rule)
+        # All regexes run as one alternation
+        self.regex = re.compile('|'.join(f'(?:{p})' for p in self.patterns)) if self.patterns else None
+    
+    def matches(self, host: str, address: Optional[IPAddress], url: Optional[str]) -> bool:
+        if address is not None:
+            if address in self.networks:
+                return True
+        elif host and host in self.domains:
+            return True
+        return bool(self.regex and url and self.regex.search(url))
+    
+    def __bool__(self) -> bool:
+        return bool(self.domains or self.networks or self.regex)
+
+
+def _host_of(value: str) -> str:
+    """Host part of a URL, host:port or bare host/wildcard (first field of a line)."""
+    value = value.strip().split(None, 1)[0] if value.strip() else ''
+    if '://' in value:
+        try:
+            return (urlsplit(value).hostname or '').lower()
+        except ValueError:
+            return ''
+    host = value.split('/', 1)[0]
+    if host.startswith('['):
+        return host[1:].split(']', 1)[0].lower()
+    if host.count(':') == 1:
+        host = host.split(':', 1)[0]
+    return host.lower()
+
+
+class Scope:
+    """Compiled include/exclude scope."""
+    
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = ()):
+        self.include_rules = [r for r in include if r and r.strip()]
+        self.exclude_rules = [r for r in exclude if r and r.strip()]
+        self.include = _RuleSet(self.include_rules)
+        self.exclude = _RuleSet(self.exclude_rules)
+    
+    def allows(self, value: str) -> bool:
+        """Check a URL, host, host:port or IP address against the scope."""
+        host = _host_of(value)
+        address = None
+        if host[:1].isdigit() or ':' in host:
+            try:
+                address = ipaddress.ip_address(host)
+            except ValueError:
+                pass
+        if not host:
+            return True  # relative paths cannot leave the scope
+        url = value if '://' in value else None
+        
+        if self.exclude and self.exclude.matches(host, address, url):
+            return False
+        if not self.include:
+            return True
+        return self.include.matches(host, address, url)
+    
+    __contains__ = allows
+    
+    def filter(self, values: Iterable[str]) -> Iterator[str]:
+        """Yield only in-scope values."""
+        for value in values:
+            if self.allows(value):
+                yield value
+    
+    def filter_file(self, filepath: str) -> Tuple[int, int]:
+        """Rewrite an artifact keeping only in-scope lines. Returns (kept, dropped)."""
+        if not os.path.exists(filepath):
+            return 0, 0
+        
+        kept = dropped = 0
+        directory = os.path.dirname(os.path.abspath(filepath))
+        fd, staged = tempfile.mkstemp(prefix='.scope_', suffix='.txt', dir=directory)
+        with os.fdopen(fd, 'w') as out:
+            for line in iter_file_lines(filepath):
+                if self.allows(line):
+                    out.write(f"{line}\n")
+                    kept += 1
+                else:
+                    dropped += 1
+        os.replace(staged, filepath)
+        return kept, dropped
+    
+    def check(self, url: str) -> None:
+        """Raise OutOfScope unless the URL may be requested."""
+        if not self.allows(url):
+            raise OutOfScope(url)
+    
+    def guard(self, session):
+        """
+        Make a requests.Session refuse out-of-scope URLs, redirects included
+        (every hop goes through Session.send).
+        """
+        send = session.send
+        
+        def scoped_send(request, **kwargs):
+            self.check(request.url)
+            return send(request, **kwargs)
+        
+        session.send = scoped_send
+        return session
+    
+    @classmethod
+    def from_targets(cls, targets: Iterable[str], exclude: Iterable[str] = ()) -> 'Scope':
+        """Default scope: each input target, and its subdomains when it is a domain."""
+        include = []
+        for target in targets:
+            try:
+                include.append(str(ipaddress.ip_network(target.strip(), strict=False)))
+                continue
+            except ValueError:
+                pass
+            host = _host_of(target)
+            if not host:
+                continue
+            try:
+                include.append(str(ipaddress.ip_address(host)))
+            except ValueError:
+                include.append(host if host.startswith('*.') else f"*.{host}")
+        return cls(include, exclude)
+    
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({'include': self.include_rules, 'exclude': self.exclude_rules}, f, indent=2)
+    
+    @classmethod
+    def load(cls, path: str) -> 'Scope':
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data.get('include', []), data.get('exclude', []))
+
+
+_active: Optional[Scope] = None
+
+
+def active_scope() -> Optional[Scope]:
+    """The scope published by the orchestrator via VAUBAN_SCOPE, or None when unscoped."""
+    global _active
+    path = os.environ.get(SCOPE_ENV)
+    if _active is None and path and os.path.exists(path):
+        _active = Scope.load(path)
+    return _active
+
+
+def scoped(values: Iterable[str]) -> Iterable[str]:
+    """Filter values through the active scope, if any."""
+    scope = active_scope()
+    return scope.filter(values) if scope else values
+
+
+def guard_session(session):
+    """Apply the active scope to a requests.Session, if any."""
+    scope = active_scope()
+    return scope.guard(session) if scope else session
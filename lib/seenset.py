@@ -0,0 +1,223 @@
+"""
+Vauban - Persistent Seen-Set
+============================
+Memory-compact record of URLs already scanned for a target.
+
+Small scopes are tracked exactly (a set of 8-byte URL digests). Once the
+set outgrows `exact_limit` it migrates to a scalable Bloom filter whose
+overall false-positive rate stays below `error_rate` however many URLs are
+added. The set is saved per target so recurring sieges skip known URLs.
+"""
+
+import os
+import json
+import math
+import hashlib
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from lib.utils import canonicalize_url, iter_file_lines
+
+
+MAGIC = b'VAUBAN-SEEN 1\n'
+
+
+class BloomSlice:
+    """Fixed-capacity Bloom filter using double hashing."""
+    
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, math.ceil(math.log2(1 / error_rate)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+    
+    def __contains__(self, hashes: Tuple[int, int]) -> bool:
+        h1, h2 = hashes
+        bits, num_bits = self.bits, self.num_bits
+        for i in range(self.num_hashes):
+            pos = (h1 + i * h2) % num_bits
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+    
+    def add(self, hashes: Tuple[int, int]) -> None:
+        h1, h2 = hashes
+        bits, num_bits = self.bits, self.num_bits
+        for i in range(self.num_hashes):
+            pos = (h1 + i * h2) % num_bits
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+    
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class SeenSet:
+    """
+    Persistent seen-set of canonical URLs.
+    
+    Exact below `exact_limit` entries, scalable Bloom filter above it
+    (slices grow 4x in capacity and tighten their error rate by half, so
+    the compound false-positive rate stays under `error_rate`).
+    """
+    
+    GROWTH = 4
+    TIGHTENING = 0.5
+    
+    def __init__(self, path: Optional[str] = None, error_rate: float = 0.001,
+                 exact_limit: int = 200000):
+        self.path = path
+        self.error_rate = error_rate
+        self.exact_limit = exact_limit
+        self.exact: Optional[set] = set()
+        self.slices: List[BloomSlice] = []
+    
+    @staticmethod
+    def _digest(url: str) -> bytes:
+        """8-byte key of the canonical URL; exact mode stores these as-is."""
+        return hashlib.blake2b(canonicalize_url(url).encode('utf-8', 'replace'), digest_size=8).digest()
+    
+    @staticmethod
+    def _hashes(digest: bytes) -> Tuple[int, int]:
+        """Stretch a key into the two 64-bit hashes used for double hashing."""
+        wide = hashlib.blake2b(digest, digest_size=16).digest()
+        return int.from_bytes(wide[:8], 'little'), int.from_bytes(wide[8:], 'little') | 1
+    
+    def __len__(self) -> int:
+        if self.exact is not None:
+            return len(self.exact)
+        return sum(s.count for s in self.slices)
+    
+    def _contains_digest(self, digest: bytes) -> bool:
+        if self.exact is not None:
+            return digest in self.exact
+        hashes = self._hashes(digest)
+        return any(hashes in s for s in self.slices)
+    
+    def __contains__(self, url: str) -> bool:
+        return self._contains_digest(self._digest(url))
+    
+    def _new_slice(self) -> BloomSlice:
+        capacity = self.exact_limit * (self.GROWTH ** len(self.slices))
+        error = self.error_rate * (1 - self.TIGHTENING) * (self.TIGHTENING ** len(self.slices))
+        return BloomSlice(max(capacity, 1024), error)
+    
+    def _migrate(self) -> None:
+        """Move exact entries into the first Bloom slice."""
+        entries, self.exact = self.exact, None
+        self.slices = [self._new_slice()]
+        for digest in entries:
+            self.slices[0].add(self._hashes(digest))
+    
+    def add(self, url: str) -> bool:
+        """Record a URL. Returns True if it had not been seen before."""
+        digest = self._digest(url)
+        if self.exact is not None:
+            if digest in self.exact:
+                return False
+            self.exact.add(digest)
+            if len(self.exact) > self.exact_limit:
+                self._migrate()
+            return True
+        
+        hashes = self._hashes(digest)
+        if any(hashes in s for s in self.slices):
+            return False
+        if self.slices[-1].full:
+            self.slices.append(self._new_slice())
+        self.slices[-1].add(hashes)
+        return True
+    
+    def filter_new(self, urls: Iterable[str]) -> Iterator[str]:
+        """Yield only URLs not seen before, recording them as seen."""
+        for url in urls:
+            if self.add(url):
+                yield url
+    
+    def filter_file(self, filepath: str, record: bool = True) -> Tuple[int, int]:
+        """
+        Rewrite a URL file keeping only unseen URLs. Returns (kept, skipped).
+        
+        With record=False the set is only consulted, so URLs can be marked
+        later (once they have actually been scanned).
+        """
+        if not os.path.exists(filepath):
+            return 0, 0
+        
+        kept = skipped = 0
+        directory = os.path.dirname(os.path.abspath(filepath))
+        fd, staged = tempfile.mkstemp(prefix='.seen_', suffix='.txt', dir=directory)
+        with os.fdopen(fd, 'w') as out:
+            for url in iter_file_lines(filepath):
+                if self.add(url) if record else url not in self:
+                    out.write(f"{url}\n")
+                    kept += 1
+                else:
+                    skipped += 1
+        os.replace(staged, filepath)
+        return kept, skipped
+    
+    def save(self, path: Optional[str] = None) -> None:
+        """Atomically persist the set."""
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        
+        if self.exact is not None:
+            header = {'mode': 'exact', 'count': len(self.exact)}
+        else:
+            header = {
+                'mode': 'bloom',
+                'slices': [[s.capacity, s.error_rate, s.count] for s in self.slices]
+            }
+        header.update(error_rate=self.error_rate, exact_limit=self.exact_limit)
+        
+        fd, staged = tempfile.mkstemp(prefix='.seen_', dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(json.dumps(header).encode() + b'\n')
+            if self.exact is not None:
+                f.write(b''.join(sorted(self.exact)))
+            else:
+                for s in self.slices:
+                    f.write(s.bits)
+        os.replace(staged, path)
+    
+    @classmethod
+    def load(cls, path: str, error_rate: float = 0.001, exact_limit: int = 200000) -> 'SeenSet':
+        """Load a saved set, or start an empty one if none exists (or it is unreadable)."""
+        seen = cls(path, error_rate, exact_limit)
+        if not os.path.exists(path):
+            return seen
+        
+        try:
+            with open(path, 'rb') as f:
+                if f.readline() != MAGIC:
+                    raise ValueError("not a seen-set file")
+                header = json.loads(f.readline())
+                seen.error_rate = header.get('error_rate', error_rate)
+                seen.exact_limit = header.get('exact_limit', exact_limit)
+                
+                if header['mode'] == 'exact':
+                    data = f.read(8 * header['count'])
+                    if len(data) != 8 * header['count']:
+                        raise ValueError("truncated seen-set file")
+                    seen.exact = {data[i:i + 8] for i in range(0, len(data), 8)}
+                else:
+                    seen.exact = None
+                    for capacity, slice_error, count in header['slices']:
+                        bloom = BloomSlice(capacity, slice_error, count=count)
+                        bits = f.read(len(bloom.bits))
+                        if len(bits) != len(bloom.bits):
+                            raise ValueError("truncated seen-set file")
+                        bloom.bits = bytearray(bits)
+                        seen.slices.append(bloom)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[SEEN] Ignoring unreadable seen-set {path}: {e}")
+            return cls(path, error_rate, exact_limit)
+        
+        return seen
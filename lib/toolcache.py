@@ -0,0 +1,145 @@
+"""
+Vauban - External Tool Cache
+============================
+Content-addressed cache for the output of passive recon modules.
+
+An entry is keyed by the module script, the binaries it drives (path, size
+and mtime stand in for their version), its arguments and the target (input
+files are keyed by their set of lines, so the order a tool wrote them in does
+not matter). Each source type has its own TTL: a fresh entry is replayed
+without running anything, a stale entry is replayed at once and refreshed in
+the background; the refreshed entry serves the next run.
+"""
+
+import os
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from lib.utils import iter_file_lines
+
+
+# Binaries each cached source drives; a new build of any of them is a new key
+SOURCE_TOOLS = {
+    'subdomains': ['subfinder', 'assetfinder', 'amass', 'findomain'],
+    'passive': ['gau', 'waybackurls', 'uro']
+}
+
+
+def file_digest(filepath: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def lines_digest(filepath: str) -> str:
+    """SHA-256 of a file's distinct lines in sorted order, independent of line order."""
+    digest = hashlib.sha256()
+    for line in sorted(set(iter_file_lines(filepath))):
+        digest.update(line.encode('utf-8', 'replace') + b'\n')
+    return digest.hexdigest()
+
+
+def tool_version(tool: str) -> str:
+    """Cheap version stamp for a binary: resolved path, size and mtime ('-' if absent)."""
+    path = shutil.which(tool)
+    if not path:
+        return '-'
+    stat = os.stat(path)
+    return f"{os.path.realpath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+class ToolCache:
+    """On-disk store of module outputs, one gzip file and one manifest per key."""
+    
+    def __init__(self, cache_dir: str = './state/toolcache', ttls: Optional[Dict[str, int]] = None,
+                 default_ttl: int = 24 * 3600):
+        self.cache_dir = cache_dir
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self._versions: Dict[str, str] = {}
+    
+    def _version(self, tool: str) -> str:
+        if tool not in self._versions:
+            self._versions[tool] = tool_version(tool)
+        return self._versions[tool]
+    
+    def key(self, source: str, script: str, target: str, args: Iterable = (),
+            deps: Iterable[str] = ()) -> str:
+        """Content address of one module invocation."""
+        parts = [source, file_digest(script)]
+        parts += [f"{dep}={file_digest(dep)}" for dep in deps if os.path.exists(dep)]
+        parts += [f"{tool}={self._version(tool)}" for tool in SOURCE_TOOLS.get(source, [])]
+        parts.append(f"target={lines_digest(target)}" if os.path.isfile(target) else f"target={target}")
+        parts += [str(a) for a in args]
+        return hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32]
+    
+    def _paths(self, source: str, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, source, key)
+        return f"{base}.txt.gz", f"{base}.json"
+    
+    def lookup(self, source: str, key: str) -> Optional[Dict]:
+        """Manifest of an entry with a 'fresh' flag, or None on a miss."""
+        data_file, manifest_file = self._paths(source, key)
+        try:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(data_file):
+            return None
+        age = time.time() - manifest.get('created', 0)
+        manifest['fresh'] = age <= self.ttls.get(source, self.default_ttl)
+        manifest['age'] = age
+        return manifest
+    
+    def lines(self, source: str, key: str) -> List[str]:
+        data_file, _ = self._paths(source, key)
+        with gzip.open(data_file, 'rt') as f:
+            return [line for line in f.read().splitlines() if line]
+    
+    def store(self, source: str, key: str, lines: Iterable[str], meta: Optional[Dict] = None) -> int:
+        """Write an entry, staged then renamed so readers never see a partial one."""
+        data_file, manifest_file = self._paths(source, key)
+        directory = os.path.dirname(data_file)
+        os.makedirs(directory, exist_ok=True)
+        
+        count = 0
+        fd, staged = tempfile.mkstemp(prefix='.entry_', dir=directory)
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt') as f:
+            for line in lines:
+                f.write(f"{line}\n")
+                count += 1
+        os.replace(staged, data_file)
+        
+        manifest = dict(meta or {}, source=source, lines=count, created=time.time())
+        fd, staged = tempfile.mkstemp(prefix='.manifest_', dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(staged, manifest_file)
+        return count
+    
+    def store_file(self, source: str, key: str, filepath: str, meta: Optional[Dict] = None) -> int:
+        lines = iter_file_lines(filepath) if os.path.exists(filepath) else iter(())
+        return self.store(source, key, lines, meta)
+    
+    def merge_file(self, source: str, key: str, filepath: str, meta: Optional[Dict] = None) -> List[str]:
+        """Fold a fresh run's output into an entry. Returns the lines the entry did not have."""
+        known = self.lines(source, key) if self.lookup(source, key) else []
+        seen: Set[str] = set(known)
+        delta = []
+        if os.path.exists(filepath):
+            for line in iter_file_lines(filepath):
+                if line not in seen:
+                    seen.add(line)
+                    delta.append(line)
+        # Union, so a source that failed during the refresh does not erase what it found before
+        self.store(source, key, known + delta, meta)
+        return delta
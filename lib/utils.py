@@ -4,16 +4,47 @@ LostFuzzer v2.0 - Utility Functions
 Shared utilities for file operations, command execution, and data processing.
 """
 
+import io
 import os
+import re
+import gzip
+import heapq
+import tempfile
 import subprocess
 import shutil
 import json
 import yaml
+from itertools import chain, islice
 from pathlib import Path
-from typing import List, Dict, Optional, Set
+from typing import IO, List, Dict, Iterable, Iterator, Optional, Set, Tuple
 from datetime import datetime
+from urllib.parse import urlsplit
 import hashlib
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_PORTS = {'http': '80', 'https': '443', 'ws': '80', 'wss': '443', 'ftp': '21'}
+UNRESERVED_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+PERCENT_ESCAPE = re.compile(r'%([0-9A-Fa-f]{2})')
+
+# Default memory ceiling for merge/dedupe; also bounds one sorted run of the external merge
+EXTERNAL_MERGE_MEMORY = 512 * 1024 * 1024
+# Rough per-line overhead of a Python str held in a list
+LINE_OVERHEAD = 64
+# In-memory dedupe cost per byte of input (str objects plus the set/list holding them)
+IN_MEMORY_EXPANSION = 4
+# Maximum run files merged at once (bounded by open file descriptors)
+MERGE_FAN_IN = 128
+# Default number of lines handed to a worker pool at a time
+BATCH_SIZE = 500
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
 
 def load_config(config_path: str = "config/settings.yaml") -> Dict:
     """Load YAML configuration file."""
@@ -33,19 +64,86 @@ def load_json(filepath: str) -> Dict:
         return json.load(f)
 
 
+def _compression(filepath: str, mode: str) -> Optional[str]:
+    """Detect gzip/zstd by magic bytes when reading, by extension when writing."""
+    if 'r' in mode:
+        with open(filepath, 'rb') as f:
+            magic = f.read(4)
+        if magic.startswith(GZIP_MAGIC):
+            return 'gzip'
+        if magic == ZSTD_MAGIC:
+            return 'zstd'
+        return None
+    if filepath.endswith('.gz'):
+        return 'gzip'
+    if filepath.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def open_text(filepath: str, mode: str = 'r') -> IO[str]:
+    """
+    Open a text file, transparently (de)compressing gzip and zstd.
+    
+    Compressed input is detected from its magic bytes; output is compressed
+    when the name ends in .gz or .zst. zstd needs the optional `zstandard`
+    package.
+    """
+    compression = _compression(filepath, mode)
+    
+    if compression == 'gzip':
+        return gzip.open(filepath, mode + 't', errors='replace')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError(f"{filepath} is zstd-compressed; install 'zstandard' to read it")
+        raw = open(filepath, mode + 'b')
+        if 'r' in mode:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, errors='replace')
+    return open(filepath, mode, errors='replace')
+
+
 def read_file_lines(filepath: str) -> List[str]:
     """Read file and return non-empty lines."""
+    return list(iter_file_lines(filepath))
+
+
+def iter_file_lines(filepath: str) -> Iterator[str]:
+    """Lazily yield stripped, non-empty lines of a (possibly compressed) file."""
     if not os.path.exists(filepath):
-        return []
-    with open(filepath, 'r') as f:
-        return [line.strip() for line in f if line.strip()]
+        return
+    with open_text(filepath, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
 
+def iter_batches(items: Iterable, size: int = BATCH_SIZE) -> Iterator[List]:
+    """Group an iterable into lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
-def write_file_lines(filepath: str, lines: List[str], mode: str = 'w') -> None:
-    """Write lines to file."""
-    with open(filepath, mode) as f:
+
+def iter_file_batches(filepath: str, size: int = BATCH_SIZE) -> Iterator[List[str]]:
+    """Yield non-empty lines of a file in batches, for bounded worker pools."""
+    return iter_batches(iter_file_lines(filepath), size)
+
+
+def write_file_lines(filepath: str, lines: Iterable[str], mode: str = 'w') -> int:
+    """Write lines (any iterable, consumed lazily) to file, return count written."""
+    count = 0
+    with open_text(filepath, mode) as f:
         for line in lines:
             f.write(f"{line}\n")
+            count += 1
+    return count
 
 
 def append_to_file(filepath: str, content: str) -> None:
@@ -54,26 +152,246 @@ def append_to_file(filepath: str, content: str) -> None:
         f.write(f"{content}\n")
 
 
-def dedupe_lines(filepath: str) -> int:
-    """Remove duplicate lines from file, return count of unique lines."""
-    lines = read_file_lines(filepath)
-    unique = list(dict.fromkeys(lines))
+def _normalize_percent(value: str) -> str:
+    """Uppercase percent-escapes and decode the ones for unreserved characters."""
+    if '%' not in value:
+        return value
+    
+    def replace(match):
+        char = chr(int(match.group(1), 16))
+        return char if char in UNRESERVED_CHARS else f"%{match.group(1).upper()}"
+    
+    return PERCENT_ESCAPE.sub(replace, value)
+
+
+def _remove_dot_segments(path: str) -> str:
+    """Resolve '.' and '..' path segments (RFC 3986 section 5.2.4)."""
+    if '/.' not in path and not path.startswith('.'):
+        return path
+    
+    output: List[str] = []
+    segments = path.split('/')
+    for segment in segments:
+        if segment == '.':
+            continue
+        if segment == '..':
+            if len(output) > 1:
+                output.pop()
+            continue
+        output.append(segment)
+    
+    # A trailing '.' or '..' still denotes a directory
+    if segments[-1] in ('.', '..'):
+        output.append('')
+    
+    result = '/'.join(output)
+    if path.startswith('/') and not result.startswith('/'):
+        result = '/' + result
+    return result
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonicalize a URL for deduplication.
+    
+    Lowercases scheme and host, drops default ports, resolves dot segments,
+    normalizes percent-encoding, sorts query parameters by key (keeping the
+    order of repeated keys) and strips the fragment. Lines that are not
+    absolute URLs (bare domains, "GET /path" entries) are returned stripped
+    but otherwise untouched.
+    """
+    url = url.strip()
+    if '://' not in url:
+        return url
+    
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if not scheme or not parts.netloc:
+        return url
+    
+    userinfo, at, hostport = parts.netloc.rpartition('@')
+    if hostport.startswith('['):
+        host, _, port = hostport.partition(']')
+        host += ']'
+        port = port[1:]
+    else:
+        host, _, port = hostport.partition(':')
+    host = host.lower().rstrip('.')
+    if port == DEFAULT_PORTS.get(scheme):
+        port = ''
+    netloc = f"{userinfo}{at}{host}{':' + port if port else ''}"
+    
+    path = _normalize_percent(_remove_dot_segments(parts.path)) or '/'
+    
+    query = ''
+    if parts.query:
+        pairs = [_normalize_percent(pair) for pair in parts.query.split('&') if pair]
+        pairs.sort(key=lambda pair: pair.split('=', 1)[0])
+        query = '&'.join(pairs)
+    
+    return f"{scheme}://{netloc}{path}{'?' + query if query else ''}"
+
+
+def canonicalize_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Streaming canonicalization of non-empty lines."""
+    for line in lines:
+        line = canonicalize_url(line)
+        if line:
+            yield line
+
+
+def _write_run(lines: List[str], directory: str) -> str:
+    """Sort and dedupe one in-memory run and spill it to a temp file."""
+    fd, path = tempfile.mkstemp(prefix='run_', suffix='.txt', dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        previous = None
+        for line in sorted(lines):
+            if line != previous:
+                f.write(f"{line}\n")
+                previous = line
+    return path
+
+
+def _merge_runs(run_files: List[str], output_file: str) -> int:
+    """k-way merge sorted run files into output_file, dropping duplicates."""
+    handles = [open(path, 'r') for path in run_files]
+    count = 0
+    try:
+        with open(output_file, 'w') as out:
+            previous = None
+            for line in heapq.merge(*(map(str.rstrip, h) for h in handles)):
+                if line != previous:
+                    out.write(f"{line}\n")
+                    previous = line
+                    count += 1
+    finally:
+        for handle in handles:
+            handle.close()
+    return count
+
+
+def external_sort_unique(lines: Iterable[str], output_file: str,
+                         memory_limit: int = EXTERNAL_MERGE_MEMORY) -> int:
+    """
+    Sort and deduplicate an arbitrarily large stream of lines on disk.
+    
+    Lines are collected into sorted runs of at most `memory_limit` bytes
+    (estimated), spilled next to output_file, then k-way merged. Output is
+    sorted and deterministic. Returns the number of unique lines written.
+    """
+    directory = os.path.dirname(os.path.abspath(output_file))
+    with tempfile.TemporaryDirectory(prefix='.merge_', dir=directory) as tmp_dir:
+        run_files: List[str] = []
+        buffer: List[str] = []
+        size = 0
+        
+        for line in lines:
+            buffer.append(line)
+            size += len(line) + LINE_OVERHEAD
+            if size >= memory_limit:
+                run_files.append(_write_run(buffer, tmp_dir))
+                buffer, size = [], 0
+        
+        if not run_files:
+            unique = sorted(set(buffer))
+            write_file_lines(output_file, unique)
+            return len(unique)
+        if buffer:
+            run_files.append(_write_run(buffer, tmp_dir))
+        del buffer
+        
+        # Collapse runs until a single merge pass fits the fan-in
+        while len(run_files) > MERGE_FAN_IN:
+            merged = []
+            for i in range(0, len(run_files), MERGE_FAN_IN):
+                group = run_files[i:i + MERGE_FAN_IN]
+                fd, path = tempfile.mkstemp(prefix='run_', suffix='.txt', dir=tmp_dir)
+                os.close(fd)
+                _merge_runs(group, path)
+                for run in group:
+                    os.remove(run)
+                merged.append(path)
+            run_files = merged
+        
+        # Write via a temp file so output_file may also be an input
+        fd, staged = tempfile.mkstemp(prefix='out_', suffix='.txt', dir=tmp_dir)
+        os.close(fd)
+        count = _merge_runs(run_files, staged)
+        os.replace(staged, output_file)
+        return count
+
+
+def _dedupe_in_memory(lines: Iterable[str], memory_limit: int) -> Tuple[Dict[str, None], Optional[Iterator[str]]]:
+    """
+    Unique lines in first-seen order, plus the unread rest of `lines` once
+    they no longer fit in memory_limit (None if everything fit).
+    
+    The footprint is counted on the lines as read, so compressed inputs are
+    measured by their decompressed size.
+    """
+    lines = iter(lines)
+    unique: Dict[str, None] = {}
+    size = 0
+    for line in lines:
+        if line not in unique:
+            unique[line] = None
+            size += (len(line) + 1) * IN_MEMORY_EXPANSION
+            if size > memory_limit:
+                return unique, lines
+    return unique, None
+
+
+def _drain(unique: Dict[str, None]) -> Iterator[str]:
+    """Yield and release the keys of a dict, so its memory goes to the external sort as it fills."""
+    while unique:
+        yield unique.popitem()[0]
+
+
+def dedupe_lines(filepath: str, canonicalize: bool = True,
+                 memory_limit: int = EXTERNAL_MERGE_MEMORY) -> int:
+    """
+    Remove duplicate lines (optionally canonicalized URLs) from file, return count of unique lines.
+    
+    Files too large to dedupe within `memory_limit` are deduped on disk and
+    come out sorted; smaller files keep first-seen order.
+    """
+    lines = iter_file_lines(filepath)
+    if canonicalize:
+        lines = canonicalize_lines(lines)
+    
+    unique, rest = _dedupe_in_memory(lines, memory_limit)
+    if rest is not None:
+        return external_sort_unique(chain(_drain(unique), rest), filepath, memory_limit)
+    
     write_file_lines(filepath, unique)
     return len(unique)
 
 
-def merge_files(input_files: List[str], output_file: str, unique: bool = True) -> int:
-    """Merge multiple files into one, optionally removing duplicates."""
-    all_lines: Set[str] = set() if unique else []
+def merge_files(input_files: List[str], output_file: str, unique: bool = True,
+                canonicalize: bool = True, memory_limit: int = EXTERNAL_MERGE_MEMORY) -> int:
+    """
+    Merge multiple files into one, optionally canonicalizing URLs and removing duplicates.
     
-    for filepath in input_files:
-        lines = read_file_lines(filepath)
-        if unique:
-            all_lines.update(lines)
-        else:
-            all_lines.extend(lines)
+    Unique output is sorted. When the inputs together are too large to
+    dedupe within `memory_limit` bytes the dedupe runs as an external merge
+    bounded by that limit.
+    """
+    def stream() -> Iterator[str]:
+        for filepath in input_files:
+            lines = iter_file_lines(filepath)
+            yield from canonicalize_lines(lines) if canonicalize else lines
     
-    final_lines = list(all_lines) if unique else all_lines
+    if not unique:
+        return write_file_lines(output_file, stream())
+    
+    unique, rest = _dedupe_in_memory(stream(), memory_limit)
+    if rest is not None:
+        return external_sort_unique(chain(_drain(unique), rest), output_file, memory_limit)
+    
+    final_lines = sorted(unique)
     write_file_lines(output_file, final_lines)
     return len(final_lines)
 
@@ -178,7 +496,7 @@ def count_file_lines(filepath: str) -> int:
     """Count lines in file."""
     if not os.path.exists(filepath):
         return 0
-    with open(filepath, 'r') as f:
+    with open_text(filepath, 'r') as f:
         return sum(1 for _ in f)
 
 
@@ -3,20 +3,182 @@
 LostFuzzer v2.0 - OpenAPI/Swagger Detection Module
 ===================================================
 Detect and parse OpenAPI/Swagger documentation to extract all API endpoints.
+
+Specs are loaded with libyaml when PyYAML has it, and large JSON specs are
+parsed straight off the socket when ijson is installed. Local $refs are
+resolved once per spec, and every schema is stored once per target under
+its JSON pointer; endpoints reference request body schemas by pointer.
 """
 
+import os
 import sys
 import json
+import uuid
+import hashlib
+import threading
 import yaml
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 from typing import Dict, List, Optional, Set
-from urllib.parse import urljoin, urlparse
+from urllib.parse import unquote, urljoin, urlparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from lib.utils import iter_batches, iter_file_lines
+from lib.scope import guard_session, scoped
+
+
+# C loader when PyYAML was built against libyaml, several times faster on large specs
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# JSON specs announced larger than this are parsed incrementally (with ijson)
+STREAM_THRESHOLD = 1 << 20
+
+
+class PathStats:
+    """Hit rate of each spec path across runs, used to probe likely paths first."""
+    
+    def __init__(self, state_file: Optional[str] = None):
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.stats: Dict[str, List[int]] = {}
+        if state_file:
+            try:
+                with open(state_file) as f:
+                    self.stats = {path: list(counts) for path, counts in json.load(f).items()}
+            except (OSError, ValueError):
+                pass
+    
+    def record(self, path: str, hit: bool = False) -> None:
+        """Count a request (or, with hit=True, a spec found) for a path."""
+        with self.lock:
+            counts = self.stats.setdefault(path, [0, 0])
+            if hit:
+                counts[1] += 1
+            else:
+                counts[0] += 1
+    
+    def order(self, paths: List[str]) -> List[str]:
+        """Paths by smoothed hit rate, the configured order breaking ties."""
+        def rate(item):
+            index, path = item
+            tries, hits = self.stats.get(path, (0, 0))
+            return (-(hits + 1) / (tries + 2), index)
+        return [path for _, path in sorted(enumerate(paths), key=rate)]
+    
+    def save(self) -> None:
+        if not self.state_file:
+            return
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        staged = f"{self.state_file}.tmp"
+        with open(staged, 'w') as f:
+            json.dump(self.stats, f)
+        os.replace(staged, self.state_file)
+
+
+def _unescape(token: str) -> str:
+    return unquote(token).replace('~1', '/').replace('~0', '~')
+
+
+def _escape(token) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+class SchemaStore:
+    """
+    Schemas of one spec, each stored once under its JSON pointer.
+    
+    Local $refs are resolved once and memoized. Stored schemas keep their
+    nested $refs, which point at other entries of the same table; inline
+    schemas are stored under their location and deduplicated by content.
+    External refs are left unresolved.
+    """
+    
+    def __init__(self, spec: Dict):
+        self.spec = spec
+        self.schemas: Dict[str, Dict] = {}
+        self._resolved: Dict[str, object] = {}
+        self._inline: Dict[str, str] = {}
+    
+    def resolve(self, ref: str):
+        """Object a local $ref points to, or None."""
+        if ref in self._resolved:
+            return self._resolved[ref]
+        node = None
+        if ref.startswith('#'):
+            node = self.spec
+            for token in ref[1:].split('/')[1:]:
+                key = _unescape(token)
+                if isinstance(node, dict):
+                    node = node.get(key)
+                elif isinstance(node, list) and key.isdigit() and int(key) < len(node):
+                    node = node[int(key)]
+                else:
+                    node = None
+                if node is None:
+                    break
+        self._resolved[ref] = node
+        return node
+    
+    def deref(self, node):
+        """Follow a chain of $refs (path items, parameters, request bodies) to its target."""
+        seen = set()
+        while isinstance(node, dict) and isinstance(node.get('$ref'), str):
+            ref = node['$ref']
+            if ref in seen:
+                return None
+            seen.add(ref)
+            node = self.resolve(ref)
+        return node
+    
+    def intern(self, schema, pointer: str) -> Optional[str]:
+        """Store a schema found at pointer; returns the pointer endpoints should use."""
+        if not isinstance(schema, dict):
+            return None
+        ref = schema.get('$ref')
+        if isinstance(ref, str):
+            if not ref.startswith('#'):
+                return ref
+            target = self.resolve(ref)
+            if not isinstance(target, dict):
+                return None
+            pointer, schema = ref, target
+        else:
+            digest = hashlib.blake2b(json.dumps(schema, sort_keys=True, default=str).encode(),
+                                     digest_size=12).hexdigest()
+            if digest in self._inline:
+                return self._inline[digest]
+            self._inline[digest] = pointer
+        
+        if pointer not in self.schemas:
+            self.schemas[pointer] = schema
+            self._store_refs(schema)
+        return pointer
+    
+    def _store_refs(self, schema: Dict) -> None:
+        """Store every local schema a stored schema references, once."""
+        stack = [schema]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                ref = node.get('$ref')
+                if isinstance(ref, str) and ref.startswith('#') and ref not in self.schemas:
+                    target = self.resolve(ref)
+                    if isinstance(target, dict):
+                        self.schemas[ref] = target
+                        stack.append(target)
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+
 
 class OpenAPIDetector:
     """Detect and parse OpenAPI/Swagger specifications."""
@@ -67,9 +229,17 @@ class OpenAPIDetector:
         '/graphql/playground',
     ]
     
-    def __init__(self, output_dir: str = "."):
+    def __init__(self, output_dir: str = ".", state_file: Optional[str] = None, path_workers: int = 24):
         self.output_dir = output_dir
-        self.session = requests.Session()
+        self.path_stats = PathStats(state_file)
+        # One pool of path probes shared by every target (created on first use, shut down by run)
+        self.path_workers = path_workers
+        self.path_executor: Optional[ThreadPoolExecutor] = None
+        self.path_lock = threading.Lock()
+        self.session = guard_session(requests.Session())
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=path_workers, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json, application/yaml, text/yaml, */*'
@@ -77,73 +247,123 @@ class OpenAPIDetector:
         self.session.verify = False
         self.timeout = 10
     
+    def _catch_all(self, base_url: str) -> Optional[bytes]:
+        """
+        Digest of the page a host serves for a path that cannot exist.
+        
+        Returns b'' when the host answers unknown paths with an error (no
+        catch-all) and None when the host cannot be reached at all.
+        """
+        try:
+            response = self.session.get(f"{base_url}/vauban-{uuid.uuid4().hex[:12]}", timeout=self.timeout)
+        except Exception:
+            return None
+        if response.status_code != 200:
+            return b''
+        return hashlib.blake2b(response.content, digest_size=8).digest()
+    
+    def _parse_spec(self, body: bytes, content_type: str, path: str) -> Optional[Dict]:
+        """Parse a response body as a JSON or YAML spec; None if it is not one."""
+        head = body[:512].lstrip()
+        if not head or head.startswith(b'<'):
+            return None  # HTML (UI pages, SPA shells) is never a spec
+        
+        try:
+            if head.startswith((b'{', b'[')):
+                spec = json.loads(body)
+            elif 'yaml' in content_type or path.endswith(('.yaml', '.yml')) or 'json' not in content_type:
+                spec = yaml.load(body, Loader=YAML_LOADER)
+            else:
+                return None
+        except (ValueError, yaml.YAMLError):
+            return None
+        return spec if self._is_valid_openapi(spec) else None
+    
+    def _stream_spec(self, response) -> Optional[Dict]:
+        """Parse a large JSON spec off the socket without holding the raw body."""
+        response.raw.decode_content = True
+        try:
+            spec = next(ijson.items(response.raw, '', use_float=True), None)
+        except Exception:
+            return None
+        return spec if self._is_valid_openapi(spec) else None
+    
     def detect_openapi(self, base_url: str) -> Optional[Dict]:
-        """Detect and fetch OpenAPI specification for a target."""
+        """
+        Detect and fetch the OpenAPI specification of a target.
+        
+        Paths are probed concurrently, historically most productive first,
+        and the first valid spec cancels the rest. Bodies identical to the
+        host's catch-all page are not parsed.
+        """
         base_url = base_url.rstrip('/')
+        shell = self._catch_all(base_url)
+        if shell is None:
+            return None
+        found = threading.Event()
         
-        for path in self.OPENAPI_PATHS:
+        def probe(path: str) -> Optional[Dict]:
+            if found.is_set():
+                return None
             url = f"{base_url}{path}"
             try:
-                response = self.session.get(url, timeout=self.timeout, allow_redirects=True)
-                
-                if response.status_code == 200:
-                    content_type = response.headers.get('content-type', '')
-                    
-                    # Try to parse as JSON
-                    if 'json' in content_type or path.endswith('.json'):
-                        try:
-                            spec = response.json()
-                            if self._is_valid_openapi(spec):
-                                return {
-                                    'url': url,
-                                    'type': 'openapi',
-                                    'spec': spec,
-                                    'version': self._get_openapi_version(spec)
-                                }
-                        except json.JSONDecodeError:
-                            pass
-                    
-                    # Try to parse as YAML
-                    if 'yaml' in content_type or path.endswith(('.yaml', '.yml')):
-                        try:
-                            spec = yaml.safe_load(response.text)
-                            if self._is_valid_openapi(spec):
-                                return {
-                                    'url': url,
-                                    'type': 'openapi',
-                                    'spec': spec,
-                                    'version': self._get_openapi_version(spec)
-                                }
-                        except yaml.YAMLError:
-                            pass
-                    
-                    # Try both for unknown content type
-                    try:
-                        spec = response.json()
-                        if self._is_valid_openapi(spec):
-                            return {
-                                'url': url,
-                                'type': 'openapi',
-                                'spec': spec,
-                                'version': self._get_openapi_version(spec)
-                            }
-                    except:
-                        try:
-                            spec = yaml.safe_load(response.text)
-                            if self._is_valid_openapi(spec):
-                                return {
-                                    'url': url,
-                                    'type': 'openapi',
-                                    'spec': spec,
-                                    'version': self._get_openapi_version(spec)
-                                }
-                        except:
-                            pass
+                response = self.session.get(url, timeout=self.timeout, allow_redirects=True, stream=True)
             except Exception:
-                continue
+                return None
+            if found.is_set():
+                # Another path won while this one was in flight: not a miss, just slower
+                response.close()
+                return None
+            self.path_stats.record(path)
+            try:
+                if response.status_code != 200:
+                    return None
+                content_type = response.headers.get('content-type', '')
+                size = response.headers.get('content-length', '')
+                if (ijson is not None and size.isdigit() and int(size) > STREAM_THRESHOLD
+                        and ('json' in content_type or path.endswith('.json'))):
+                    spec = self._stream_spec(response)
+                else:
+                    body = response.content
+                    if shell and hashlib.blake2b(body, digest_size=8).digest() == shell:
+                        return None
+                    spec = self._parse_spec(body, content_type, path)
+            except Exception:
+                return None
+            finally:
+                response.close()
+            if spec is None:
+                return None
+            found.set()
+            return {
+                'url': url,
+                'path': path,
+                'type': 'openapi',
+                'spec': spec,
+                'version': self._get_openapi_version(spec)
+            }
         
+        executor = self._path_pool()
+        futures = [executor.submit(probe, path) for path in self.path_stats.order(self.OPENAPI_PATHS)]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if result:
+                    self.path_stats.record(result['path'], hit=True)
+                    return result
+        finally:
+            # In-flight requests finish on their own; queued paths are dropped
+            for future in futures:
+                future.cancel()
         return None
     
+    def _path_pool(self) -> ThreadPoolExecutor:
+        """The shared path probe pool, separate from the target pool so targets never wait on themselves."""
+        with self.path_lock:
+            if self.path_executor is None:
+                self.path_executor = ThreadPoolExecutor(max_workers=self.path_workers)
+            return self.path_executor
+    
     def detect_graphql(self, base_url: str) -> Optional[Dict]:
         """Detect GraphQL endpoint and check for introspection."""
         base_url = base_url.rstrip('/')
@@ -205,7 +425,7 @@ class OpenAPIDetector:
                         'introspection_enabled': False,
                         'schema': None
                     }
-                    
+            
             except Exception:
                 continue
         
@@ -234,10 +454,17 @@ class OpenAPIDetector:
             return f"openapi-{spec['openapi']}"
         return "unknown"
     
-    def extract_endpoints(self, spec: Dict, base_url: str = "") -> List[Dict]:
-        """Extract all endpoints from OpenAPI specification."""
+    def extract_endpoints(self, spec: Dict, base_url: str = "", store: Optional[SchemaStore] = None) -> List[Dict]:
+        """
+        Extract all endpoints from OpenAPI specification.
+        
+        Path items, parameters and request bodies given as $refs are followed;
+        request body schemas are interned in store and referenced by pointer.
+        """
+        store = store or SchemaStore(spec)
         endpoints = []
         paths = spec.get('paths', {})
+        consumes = spec.get('consumes') or ['application/json']
         
         # Get base path
         base_path = ""
@@ -249,14 +476,19 @@ class OpenAPIDetector:
                 base_path = server_url
         
         for path, methods in paths.items():
+            methods = store.deref(methods)
             if not isinstance(methods, dict):
                 continue
             
             full_path = f"{base_path}{path}".replace('//', '/')
+            shared_params = methods.get('parameters') or []
             
             for method, details in methods.items():
                 if method.lower() not in ['get', 'post', 'put', 'delete', 'patch', 'options', 'head']:
                     continue
+                if not isinstance(details, dict):
+                    continue
+                location = f"#/paths/{_escape(path)}/{method}"
                 
                 endpoint = {
                     'path': full_path,
@@ -270,22 +502,40 @@ class OpenAPIDetector:
                     'deprecated': details.get('deprecated', False)
                 }
                 
-                # Extract parameters
-                for param in details.get('parameters', []):
+                # Extract parameters (operation-level ones override path-level ones)
+                params = {}
+                for prefix, declared in ((f"#/paths/{_escape(path)}", shared_params),
+                                         (location, details.get('parameters') or [])):
+                    for index, param in enumerate(declared):
+                        pointer = f"{prefix}/parameters/{index}"
+                        if isinstance(param, dict) and isinstance(param.get('$ref'), str):
+                            pointer = param['$ref']
+                        param = store.deref(param)
+                        if isinstance(param, dict):
+                            params[(param.get('name'), param.get('in'))] = (param, pointer)
+                for param, pointer in params.values():
+                    schema = store.deref(param.get('schema')) or {}
                     endpoint['parameters'].append({
                         'name': param.get('name'),
                         'in': param.get('in'),
                         'required': param.get('required', False),
-                        'type': param.get('type') or param.get('schema', {}).get('type', 'string')
+                        'type': param.get('type') or schema.get('type', 'object' if param.get('in') == 'body' else 'string')
                     })
+                    # Swagger 2.0 request body
+                    if param.get('in') == 'body' and 'request_body' not in endpoint:
+                        endpoint['request_body'] = {
+                            'media_type': (details.get('consumes') or consumes)[0],
+                            'schema': store.intern(param.get('schema'), f"{pointer}/schema")
+                        }
                 
                 # Extract request body (OpenAPI 3.x)
-                if 'requestBody' in details:
-                    content = details['requestBody'].get('content', {})
-                    for media_type, schema_info in content.items():
+                request_body = store.deref(details.get('requestBody'))
+                if isinstance(request_body, dict):
+                    for media_type, schema_info in (request_body.get('content') or {}).items():
                         endpoint['request_body'] = {
                             'media_type': media_type,
-                            'schema': schema_info.get('schema', {})
+                            'schema': store.intern((schema_info or {}).get('schema'),
+                                                   f"{location}/requestBody/content/{_escape(media_type)}/schema")
                         }
                         break
                 
@@ -332,6 +582,7 @@ class OpenAPIDetector:
             'openapi': None,
             'graphql': None,
             'endpoints': [],
+            'schemas': {},
             'graphql_operations': []
         }
         
@@ -342,7 +593,9 @@ class OpenAPIDetector:
                 'url': openapi_result['url'],
                 'version': openapi_result['version']
             }
-            result['endpoints'] = self.extract_endpoints(openapi_result['spec'], base_url)
+            store = SchemaStore(openapi_result['spec'])
+            result['endpoints'] = self.extract_endpoints(openapi_result['spec'], base_url, store)
+            result['schemas'] = store.schemas
         
         # Detect GraphQL
         graphql_result = self.detect_graphql(base_url)
@@ -367,34 +620,37 @@ class OpenAPIDetector:
             'all_endpoints': []
         }
         
-        # Read targets
-        with open(targets_file, 'r') as f:
-            targets = [line.strip() for line in f if line.strip()]
-        
-        print(f"[OPENAPI] Scanning {len(targets)} targets for API documentation...")
+        print(f"[OPENAPI] Scanning targets from {targets_file} for API documentation...")
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(self.scan_target, target): target for target in targets}
-            
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    results['targets_scanned'] += 1
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for targets in iter_batches(scoped(iter_file_lines(targets_file))):
+                    futures = {executor.submit(self.scan_target, target): target for target in targets}
                     
-                    if result['openapi'] or result['graphql']:
-                        results['targets'].append(result)
-                        
-                        if result['openapi']:
-                            results['openapi_found'] += 1
-                        
-                        if result['graphql']:
-                            results['graphql_found'] += 1
-                        
-                        results['all_endpoints'].extend(result['endpoints'])
-                except Exception as e:
-                    pass
+                    for future in as_completed(futures):
+                        try:
+                            result = future.result()
+                            results['targets_scanned'] += 1
+                            
+                            if result['openapi'] or result['graphql']:
+                                results['targets'].append(result)
+                                
+                                if result['openapi']:
+                                    results['openapi_found'] += 1
+                                
+                                if result['graphql']:
+                                    results['graphql_found'] += 1
+                                
+                                results['all_endpoints'].extend(result['endpoints'])
+                        except Exception as e:
+                            pass
+        finally:
+            if self.path_executor is not None:
+                self.path_executor.shutdown(wait=False, cancel_futures=True)
+                self.path_executor = None
         
         results['total_endpoints'] = len(results['all_endpoints'])
+        self.path_stats.save()
         
         # Save results
         output_file = f"{self.output_dir}/openapi_results.json"
@@ -418,17 +674,18 @@ class OpenAPIDetector:
 def main():
     """Main entry point."""
     if len(sys.argv) < 2:
-        print("Usage: openapi.py <targets_file> [output_dir]")
+        print("Usage: openapi.py <targets_file> [output_dir] [path_stats_file]")
         sys.exit(1)
     
     targets_file = sys.argv[1]
     output_dir = sys.argv[2] if len(sys.argv) > 2 else "."
+    state_file = sys.argv[3] if len(sys.argv) > 3 else None
     
     # Disable SSL warnings
     import urllib3
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     
-    detector = OpenAPIDetector(output_dir)
+    detector = OpenAPIDetector(output_dir, state_file)
     results = detector.run(targets_file)
     
     print(f"\n[OPENAPI] Results saved to: {output_dir}/openapi_results.json")
@@ -22,7 +22,9 @@ INPUT="$1"
 OUTPUT_DIR="${2:-.}"
 OUTPUT="${OUTPUT_DIR}/params_discovered.txt"
 THREADS="${3:-5}"
+BUDGET="${4:-50}"
 TEMP_DIR=$(mktemp -d)
+ROOT_DIR="$(cd "$(dirname "$0")/../.." && pwd)"
 
 if [ ! -f "$INPUT" ]; then
     echo -e "${RED}[ERROR] Input file not found: ${INPUT}${RESET}"
@@ -100,6 +102,12 @@ project
 # Create common params wordlist
 echo "$COMMON_PARAMS" | grep -v "^$" | sort -u > "$TEMP_DIR/common_params.txt"
 
+# Coverage-aware sample: round-robin across hosts, one URL per path template,
+# parameterized URLs first. Any prefix of it is still spread across hosts.
+SAMPLE="$TEMP_DIR/sample_targets.lst"
+PYTHONPATH="$ROOT_DIR" python3 -m lib.sampling "$INPUT" "$SAMPLE" \
+    --budget "$BUDGET" --plan "${OUTPUT_DIR}/params_plan.json" 2>/dev/null || head -n "$BUDGET" "$INPUT" > "$SAMPLE"
+
 # Function to check if tool exists
 check_tool() {
     if ! command -v "$1" &> /dev/null; then
@@ -114,10 +122,7 @@ run_arjun() {
     if check_tool "arjun"; then
         echo -e "${GREEN}[+] Running arjun...${RESET}"
         
-        # Limit to first 50 URLs for speed
-        head -n 50 "$INPUT" > "$TEMP_DIR/arjun_input.txt"
-        
-        arjun -i "$TEMP_DIR/arjun_input.txt" \
+        arjun -i "$SAMPLE" \
             -t "$THREADS" \
             -o "$TEMP_DIR/arjun_results.json" \
             --stable \
@@ -139,7 +144,7 @@ run_x8() {
             x8 -u "$url" \
                 -w "$TEMP_DIR/common_params.txt" \
                 -o "$TEMP_DIR/x8_$(echo "$url" | md5sum | cut -d' ' -f1).txt" 2>/dev/null || true
-        done < <(head -n 30 "$INPUT")
+        done < <(head -n 30 "$SAMPLE")
     fi
 }
 
@@ -163,7 +168,7 @@ run_param_miner() {
                 -of json \
                 -s 2>/dev/null || true
                 
-        done < <(head -n 20 "$INPUT")
+        done < <(head -n 20 "$SAMPLE")
         
         # Parse ffuf results
         for json_file in "$TEMP_DIR"/ffuf_params_*.json; do
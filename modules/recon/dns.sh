@@ -14,14 +14,15 @@ RESET='\033[0m'
 
 # Check arguments
 if [ -z "$1" ]; then
-    echo -e "${RED}[ERROR] Usage: $0 <subdomains_file> <output_file>${RESET}"
+    echo -e "${RED}[ERROR] Usage: $0 <subdomains_file> <output_file> [threads] [resolvers] [engine]${RESET}"
     exit 1
 fi
 
 INPUT="$1"
 OUTPUT="${2:-resolved.txt}"
 THREADS="${3:-100}"
-RESOLVERS="8.8.8.8,1.1.1.1,8.8.4.4"
+RESOLVERS="${4:-8.8.8.8,1.1.1.1}"
+ENGINE="${5:-native}"
 
 if [ ! -f "$INPUT" ]; then
     echo -e "${RED}[ERROR] Input file not found: ${INPUT}${RESET}"
@@ -32,8 +33,17 @@ echo -e "${CYAN}[DNS] Resolving subdomains...${RESET}"
 TOTAL_INPUT=$(wc -l < "$INPUT" | tr -d ' ')
 echo -e "${CYAN}[DNS] Processing ${TOTAL_INPUT} subdomains${RESET}"
 
-# Check for dnsx
-if command -v dnsx &> /dev/null; then
+# Native resolver: health-checked pool, per-resolver rate limits, A/AAAA/CNAME records
+run_native() {
+    echo -e "${GREEN}[+] Using native resolver pool (${RESOLVERS})...${RESET}"
+    python3 "$(dirname "$0")/resolver.py" "$INPUT" "$OUTPUT" \
+        --resolvers "$RESOLVERS" \
+        --concurrency "$THREADS"
+}
+
+if [ "$ENGINE" = "native" ] && run_native; then
+    :
+elif command -v dnsx &> /dev/null; then
     echo -e "${GREEN}[+] Using dnsx for resolution...${RESET}"
     
     # Resolve and filter wildcards
@@ -49,7 +59,7 @@ elif command -v massdns &> /dev/null; then
     
     # Create resolvers file
     RESOLVERS_FILE=$(mktemp)
-    echo -e "8.8.8.8\n1.1.1.1\n8.8.4.4\n9.9.9.9" > "$RESOLVERS_FILE"
+    echo "$RESOLVERS" | tr ',' '\n' > "$RESOLVERS_FILE"
     
     massdns -r "$RESOLVERS_FILE" \
         -t A \
@@ -61,16 +71,12 @@ elif command -v massdns &> /dev/null; then
     
     rm -f "$RESOLVERS_FILE"
     
+elif [ "$ENGINE" != "native" ]; then
+    echo -e "${YELLOW}[WARN] dnsx/massdns not found, using native resolution...${RESET}"
+    run_native || true
 else
-    echo -e "${YELLOW}[WARN] dnsx/massdns not found, using basic resolution...${RESET}"
-    
-    # Fallback to basic dig resolution
-    > "$OUTPUT"
-    while read -r subdomain; do
-        if host "$subdomain" &>/dev/null; then
-            echo "$subdomain" >> "$OUTPUT"
-        fi
-    done < "$INPUT"
+    echo -e "${RED}[DNS] Native resolution failed and neither dnsx nor massdns is installed${RESET}"
+    touch "$OUTPUT"
 fi
 
 # Count results
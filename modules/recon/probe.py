@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Vauban - Host Probe
+===================
+Single httpx pass that finds live hosts and fingerprints them at once.
+
+Every host is contacted one time. Status, headers, title, server,
+technologies, TLS certificate, redirect chain, body hash and the start of
+the body are captured
+into a JSON-lines artifact that later stages (TechDetector, host
+clustering) read instead of probing again. The live host list is derived
+from the same records.
+"""
+
+import sys
+import json
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from lib.scope import active_scope
+
+
+HTTPX_FLAGS = [
+    '-silent', '-json', '-status-code', '-title', '-web-server', '-tech-detect', '-content-type',
+    '-content-length', '-ip', '-cname', '-tls-grab', '-hash', 'sha256', '-include-response-header',
+    '-follow-redirects', '-include-chain', '-include-response'
+]
+
+# Body prefix kept per host: enough for <head> signatures and response fingerprints
+MAX_BODY = 16 * 1024
+
+
+def normalize(record: Dict) -> Dict:
+    """Compact, version-tolerant view of one httpx JSON record."""
+    tls = record.get('tls') or record.get('tls-grab') or {}
+    hashes = record.get('hash') or {}
+    headers = record.get('header') or record.get('response_header') or {}
+    if isinstance(headers, str):
+        # Older httpx: raw header block
+        parsed = {}
+        for line in headers.splitlines()[1:]:
+            name, _, value = line.partition(':')
+            if value:
+                parsed[name.strip().lower().replace('-', '_')] = value.strip()
+        headers = parsed
+    
+    body = record.get('body')
+    if body is None:
+        body = (record.get('response') or '').partition('\r\n\r\n')[2]
+    
+    chain = []
+    for hop in record.get('chain') or []:
+        chain.append({
+            'url': hop.get('request_url') or hop.get('url', ''),
+            'status': hop.get('status_code', 0),
+            'location': hop.get('location', '')
+        })
+    
+    return {
+        'url': record.get('url', ''),
+        'input': record.get('input', ''),
+        'host': record.get('host', ''),
+        'final_url': record.get('final_url') or record.get('url', ''),
+        'status': record.get('status_code', 0),
+        'title': record.get('title', ''),
+        'server': record.get('webserver', ''),
+        'content_type': record.get('content_type', ''),
+        'content_length': record.get('content_length', 0),
+        'tech': record.get('tech', []),
+        'ips': record.get('a', []),
+        'cname': record.get('cname', []),
+        'headers': headers,
+        'body_hash': hashes.get('body_sha256', '') if isinstance(hashes, dict) else '',
+        'body': body[:MAX_BODY],
+        'chain': chain,
+        'tls': {
+            'version': tls.get('tls_version', ''),
+            'cipher': tls.get('cipher', ''),
+            'subject_cn': tls.get('subject_cn', ''),
+            'subject_an': tls.get('subject_an', []),
+            'issuer': tls.get('issuer_org') or tls.get('issuer_cn', ''),
+            'not_after': tls.get('not_after', '')
+        } if tls else {}
+    }
+
+
+class HostProber:
+    """Run httpx once over the hosts and persist structured results."""
+    
+    def __init__(self, threads: int = 50, rate_limit: Optional[int] = None, timeout: int = 10):
+        self.threads = threads
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+    
+    def command(self, input_file: str) -> list:
+        cmd = ['httpx', '-l', input_file, '-t', str(self.threads), '-timeout', str(self.timeout)] + HTTPX_FLAGS
+        if self.rate_limit:
+            cmd += ['-rate-limit', str(self.rate_limit)]
+        return cmd
+    
+    def run(self, input_file: str, live_file: str, probe_file: str) -> Dict:
+        """Probe input_file, writing live URLs to live_file and records to probe_file."""
+        scope = active_scope()
+        stats = {'live': 0, 'out_of_scope': 0}
+        print(f"[PROBE] Probing hosts from {input_file} ({self.threads} threads)...")
+        
+        try:
+            process = subprocess.Popen(self.command(input_file), stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL, text=True)
+        except OSError as e:
+            print(f"[PROBE] httpx could not be started: {e}")
+            open(live_file, 'w').close()
+            open(probe_file, 'w').close()
+            return stats
+        
+        seen = set()
+        with open(live_file, 'w') as live, open(probe_file, 'w') as records:
+            # Records are streamed to disk as httpx emits them
+            for line in process.stdout:
+                try:
+                    record = normalize(json.loads(line))
+                except (json.JSONDecodeError, AttributeError):
+                    continue
+                url = record['url']
+                if not url or url in seen:
+                    continue
+                seen.add(url)
+                if scope is not None and not scope.allows(url):
+                    stats['out_of_scope'] += 1
+                    continue
+                live.write(f"{url}\n")
+                records.write(json.dumps(record) + "\n")
+                stats['live'] += 1
+        process.wait()
+        
+        print(f"[PROBE] {stats['live']} live hosts fingerprinted")
+        return stats
+
+
+def main():
+    """Main entry point."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Probe and fingerprint hosts in one httpx pass")
+    parser.add_argument('input_file', help='Hosts or URLs, one per line')
+    parser.add_argument('live_file', help='Live URLs output')
+    parser.add_argument('probe_file', help='Structured JSON-lines results')
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--rate-limit', type=int, help='Requests per second')
+    parser.add_argument('--timeout', type=int, default=10)
+    args = parser.parse_args()
+    
+    HostProber(args.threads, args.rate_limit, args.timeout).run(args.input_file, args.live_file, args.probe_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Vauban - Async DNS Resolver
+===========================
+Resolve subdomains against a pool of upstream resolvers without external
+binaries.
+
+Each resolver is health-checked before use, rate-limited on its own, and
+benched after repeated failures. Timeouts and SERVFAIL answers are retried
+on a different resolver. Names are streamed from the input and results are
+streamed out as they complete: resolved hostnames to the text output and
+A/AAAA/CNAME data as JSON lines next to it.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import struct
+import asyncio
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from lib.utils import iter_file_lines, load_config
+
+
+TYPE_A = 1
+TYPE_CNAME = 5
+TYPE_AAAA = 28
+TYPE_NAMES = {TYPE_A: 'a', TYPE_CNAME: 'cname', TYPE_AAAA: 'aaaa'}
+
+RCODE_NAMES = {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+
+
+class QueryError(Exception):
+    """A resolver gave no usable answer: no reply in time, or a malformed one."""
+
+
+def build_query(name: str, qtype: int, query_id: int) -> bytes:
+    """DNS query packet with recursion desired. Raises ValueError for a name DNS cannot carry."""
+    header = struct.pack('>HHHHHH', query_id, 0x0100, 1, 0, 0, 0)
+    try:
+        labels = [part.encode('idna') for part in name.rstrip('.').split('.') if part]
+    except UnicodeError as e:  # a label over 63 characters, or one IDNA cannot encode
+        raise ValueError(f"invalid name {name!r}: {e}")
+    if not labels or any(len(label) > 63 for label in labels):
+        raise ValueError(f"invalid name {name!r}")
+    qname = b''.join(bytes([len(label)]) + label for label in labels) + b'\x00'
+    if len(qname) > 255:
+        raise ValueError(f"invalid name {name!r}: longer than 255 bytes")
+    return header + qname + struct.pack('>HH', qtype, 1)
+
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Decode a (possibly compressed) domain name. Returns (name, offset after it)."""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 20:
+                raise ValueError("compression loop")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode('ascii', 'replace'))
+        offset += length
+    return '.'.join(labels).lower(), end if end is not None else offset
+
+
+def parse_response(data: bytes) -> Tuple[int, int, List[Tuple[str, int, int, str]]]:
+    """Parse a response into (id, rcode, [(name, type, ttl, value)]) for A/AAAA/CNAME answers."""
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack('>HHHHHH', data[:12])
+    offset = 12
+    for _ in range(qdcount):
+        _, offset = _read_name(data, offset)
+        offset += 4
+    
+    records = []
+    for _ in range(ancount):
+        name, offset = _read_name(data, offset)
+        rtype, _, ttl, length = struct.unpack('>HHIH', data[offset:offset + 10])
+        offset += 10
+        rdata = data[offset:offset + length]
+        if rtype == TYPE_A and length == 4:
+            records.append((name, rtype, ttl, socket.inet_ntop(socket.AF_INET, rdata)))
+        elif rtype == TYPE_AAAA and length == 16:
+            records.append((name, rtype, ttl, socket.inet_ntop(socket.AF_INET6, rdata)))
+        elif rtype == TYPE_CNAME:
+            records.append((name, rtype, ttl, _read_name(data, offset)[0]))
+        offset += length
+    return query_id, flags & 0x000F, records
+
+
+class _UDPClient(asyncio.DatagramProtocol):
+    """One UDP socket to one resolver, matching responses to queries by id."""
+    
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, asyncio.Future] = {}
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    def datagram_received(self, data, addr):
+        try:
+            query_id = struct.unpack('>H', data[:2])[0]
+        except struct.error:
+            return
+        future = self.pending.pop(query_id, None)
+        if future and not future.done():
+            future.set_result(data)
+    
+    def error_received(self, exc):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self.pending.clear()
+
+
+class Resolver:
+    """One upstream resolver with its own rate limit and health record."""
+    
+    BENCH_AFTER = 5        # consecutive failures before the resolver is benched
+    BENCH_SECONDS = 30.0
+    
+    def __init__(self, address: str, rate: float = 50.0):
+        host, _, port = address.rpartition(':') if address.count(':') == 1 else (address, '', '')
+        self.address = address
+        self.host = host
+        self.port = int(port) if port else 53
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.client: Optional[_UDPClient] = None
+        self.healthy = True
+        self.benched_until = 0.0
+        self.failures = 0
+        self.stats = {'queries': 0, 'answers': 0, 'timeouts': 0, 'servfail': 0, 'malformed': 0}
+        self.latency = 0.0
+    
+    async def connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        _, self.client = await loop.create_datagram_endpoint(_UDPClient, remote_addr=(self.host, self.port))
+    
+    def close(self) -> None:
+        if self.client and self.client.transport:
+            self.client.transport.close()
+    
+    @property
+    def available(self) -> bool:
+        return self.healthy and time.monotonic() >= self.benched_until
+    
+    async def _throttle(self) -> None:
+        now = time.monotonic()
+        start = max(now, self.next_slot)
+        self.next_slot = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+    
+    def _record(self, ok: bool) -> None:
+        if ok:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= self.BENCH_AFTER:
+            self.benched_until = time.monotonic() + self.BENCH_SECONDS
+            self.failures = 0
+    
+    async def query(self, name: str, qtype: int, timeout: float) -> Tuple[int, List]:
+        """
+        Send one query. Raises QueryError on no answer or an unparseable one,
+        and ValueError (before anything is sent) for a name DNS cannot carry.
+        """
+        await self._throttle()
+        query_id = random.randrange(65536)
+        while query_id in self.client.pending:
+            query_id = random.randrange(65536)
+        packet = build_query(name, qtype, query_id)
+        
+        future = asyncio.get_running_loop().create_future()
+        self.client.pending[query_id] = future
+        self.stats['queries'] += 1
+        started = time.monotonic()
+        try:
+            self.client.transport.sendto(packet)
+            data = await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, OSError):
+            self.client.pending.pop(query_id, None)
+            self.stats['timeouts'] += 1
+            self._record(False)
+            raise QueryError(f"{self.address}: timeout")
+        
+        try:
+            _, rcode, records = parse_response(data)
+        except (struct.error, IndexError, ValueError):
+            # Truncated or garbled reply: as useless as none, try another resolver
+            self.stats['malformed'] += 1
+            self._record(False)
+            raise QueryError(f"{self.address}: malformed response")
+        elapsed = time.monotonic() - started
+        self.latency = elapsed if not self.latency else 0.8 * self.latency + 0.2 * elapsed
+        if rcode == RCODE_SERVFAIL:
+            self.stats['servfail'] += 1
+            self._record(False)
+        else:
+            self.stats['answers'] += 1
+            self._record(True)
+        return rcode, records
+
+
+class ResolverPool:
+    """Health-checked pool that rotates queries across resolvers."""
+    
+    def __init__(self, addresses: Iterable[str], rate: float = 50.0, retries: int = 2, timeout: float = 2.0):
+        self.resolvers = [Resolver(a.strip(), rate) for a in addresses if a.strip()]
+        self.retries = retries
+        self.timeout = timeout
+        self._next = 0
+    
+    async def start(self, probe: str = 'example.com') -> int:
+        """Open sockets and drop resolvers that do not answer a probe. Returns healthy count."""
+        for resolver in self.resolvers:
+            await resolver.connect()
+        
+        async def check(resolver: Resolver):
+            try:
+                rcode, _ = await resolver.query(probe, TYPE_A, self.timeout * 2)
+                resolver.healthy = rcode != RCODE_SERVFAIL
+            except QueryError:
+                resolver.healthy = False
+            resolver.failures = 0
+        
+        await asyncio.gather(*(check(r) for r in self.resolvers))
+        return sum(r.healthy for r in self.resolvers)
+    
+    def close(self) -> None:
+        for resolver in self.resolvers:
+            resolver.close()
+    
+    def _pick(self, tried: List[Resolver]) -> Optional[Resolver]:
+        """Next available resolver in rotation, preferring ones not yet tried for this query."""
+        candidates = [r for r in self.resolvers if r.available] or [r for r in self.resolvers if r.healthy]
+        if not candidates:
+            return None
+        fresh = [r for r in candidates if r not in tried] or candidates
+        self._next = (self._next + 1) % len(fresh)
+        return fresh[self._next]
+    
+    async def query(self, name: str, qtype: int) -> Tuple[str, List, Optional[str]]:
+        """Query with retries on other resolvers. Returns (status, records, resolver used)."""
+        tried: List[Resolver] = []
+        status = 'TIMEOUT'
+        for _ in range(self.retries + 1):
+            resolver = self._pick(tried)
+            if resolver is None:
+                return 'NORESOLVER', [], None
+            tried.append(resolver)
+            try:
+                rcode, records = await resolver.query(name, qtype, self.timeout)
+            except QueryError:
+                continue
+            except ValueError:
+                return 'INVALID', [], None  # garbage input line: no resolver could answer it
+            status = RCODE_NAMES.get(rcode, str(rcode))
+            if rcode != RCODE_SERVFAIL:
+                return status, records, resolver.address
+        return status, [], None
+    
+    async def resolve(self, name: str) -> Dict:
+        """A and AAAA lookups for a name, folded into one structured record."""
+        (status_a, records_a, used), (status_aaaa, records_aaaa, _) = await asyncio.gather(
+            self.query(name, TYPE_A), self.query(name, TYPE_AAAA)
+        )
+        result = {'host': name, 'status': status_a, 'a': [], 'aaaa': [], 'cname': [], 'ttl': None,
+                  'resolver': used}
+        for record_name, rtype, ttl, value in records_a + records_aaaa:
+            values = result[TYPE_NAMES[rtype]]
+            if value not in values:
+                values.append(value)
+            if rtype != TYPE_CNAME:
+                result['ttl'] = ttl if result['ttl'] is None else min(result['ttl'], ttl)
+        if status_a != 'NOERROR' and status_aaaa == 'NOERROR':
+            result['status'] = status_aaaa
+        return result
+    
+    def report(self) -> List[Dict]:
+        return [{'resolver': r.address, 'healthy': r.healthy, 'latency_ms': round(r.latency * 1000, 1),
+                 **r.stats} for r in self.resolvers]
+
+
+class WildcardDetector:
+    """Per-zone wildcard fingerprints, probed once per parent zone and cached across runs."""
+    
+    LABEL_CHARS = 'abcdefghijklmnopqrstuvwxyz0123456789'
+    
+    def __init__(self, pool: ResolverPool, cache_file: str = './state/dns/wildcards.json',
+                 ttl: int = 24 * 3600, probes: int = 3):
+        self.pool = pool
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.probes = probes
+        self.zones: Dict[str, frozenset] = {}
+        self.checked: Dict[str, float] = {}
+        self.pending: Dict[str, asyncio.Task] = {}
+        self.loaded = set()
+        self.stats = {'probed_zones': 0, 'cached_zones': 0, 'wildcard_zones': 0}
+        self._load()
+    
+    def _load(self) -> None:
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for zone, entry in data.items():
+            if now - entry.get('checked', 0) <= self.ttl:
+                self.zones[zone] = frozenset(entry.get('answers', []))
+                self.checked[zone] = entry['checked']
+        self.loaded = set(self.zones)
+    
+    def save(self) -> None:
+        """Write fingerprints back, staged then renamed so a killed run never truncates the cache."""
+        directory = os.path.dirname(self.cache_file) or '.'
+        os.makedirs(directory, exist_ok=True)
+        data = {zone: {'answers': sorted(answers), 'checked': self.checked[zone]}
+                for zone, answers in self.zones.items()}
+        staged = f"{self.cache_file}.tmp"
+        with open(staged, 'w') as f:
+            json.dump(data, f)
+        os.replace(staged, self.cache_file)
+    
+    async def _probe(self, zone: str) -> frozenset:
+        """Answers for a few random labels under the zone; empty when the zone has no wildcard."""
+        labels = [''.join(random.choices(self.LABEL_CHARS, k=12)) for _ in range(self.probes)]
+        results = await asyncio.gather(*(self.pool.resolve(f"{label}.{zone}") for label in labels))
+        answers = set()
+        for result in results:
+            answers.update(result['a'], result['aaaa'], result['cname'])
+        self.stats['probed_zones'] += 1
+        # Only definitive answers are cached; a zone whose probes all timed out is asked again next run
+        if any(r['status'] in ('NOERROR', 'NXDOMAIN') for r in results):
+            self.checked[zone] = time.time()
+        return frozenset(answers)
+    
+    async def fingerprint(self, zone: str) -> frozenset:
+        """Wildcard answer set of a zone, probing it at most once."""
+        answers = self.zones.get(zone)
+        if answers is None:
+            task = self.pending.get(zone)
+            if task is None:
+                task = self.pending[zone] = asyncio.ensure_future(self._probe(zone))
+            answers = await task
+            if zone in self.checked and zone not in self.zones:
+                self.zones[zone] = answers
+                self.stats['wildcard_zones'] += bool(answers)
+        elif zone in self.loaded:
+            self.loaded.discard(zone)
+            self.stats['cached_zones'] += 1
+            self.stats['wildcard_zones'] += bool(answers)
+        return answers
+    
+    async def is_wildcard(self, result: Dict) -> bool:
+        """True when every address of a resolved name comes from its parent zone's wildcard."""
+        zone = result['host'].partition('.')[2]
+        if zone.count('.') < 1:
+            return False
+        wildcard = await self.fingerprint(zone)
+        if not wildcard:
+            return False
+        addresses = result['a'] + result['aaaa']
+        return all(address in wildcard for address in addresses) or \
+            any(target in wildcard for target in result['cname'])
+
+
+class DNSResolver:
+    """Streaming resolution stage: names in, resolved hosts and records out."""
+    
+    CONFIG_FILE = Path(__file__).parent.parent.parent / 'config' / 'settings.yaml'
+    
+    def __init__(self, resolvers: List[str], rate: float = 50.0, retries: int = 2, timeout: float = 2.0,
+                 concurrency: int = 100, wildcard_detection: bool = True,
+                 wildcard_cache: str = './state/dns/wildcards.json', wildcard_ttl: int = 24 * 3600):
+        self.pool = ResolverPool(resolvers, rate, retries, timeout)
+        self.concurrency = concurrency
+        self.wildcards = WildcardDetector(self.pool, wildcard_cache, wildcard_ttl) if wildcard_detection else None
+        self.stats = {'input': 0, 'resolved': 0, 'wildcard': 0, 'nxdomain': 0, 'failed': 0}
+    
+    @classmethod
+    def from_config(cls, config_file: Optional[str] = None, **overrides) -> 'DNSResolver':
+        """Pool settings from recon.dns in settings.yaml."""
+        path = config_file or str(cls.CONFIG_FILE)
+        config = load_config(path) if os.path.exists(path) else {}
+        dns = (config or {}).get('recon', {}).get('dns', {})
+        resolvers = dns.get('resolver', '8.8.8.8,1.1.1.1')
+        if isinstance(resolvers, str):
+            resolvers = resolvers.split(',')
+        settings = {
+            'resolvers': resolvers,
+            'rate': dns.get('rate_per_resolver', 50),
+            'retries': dns.get('retry', 2),
+            'timeout': dns.get('timeout', 2.0),
+            'concurrency': dns.get('threads', 100),
+            'wildcard_detection': dns.get('wildcard_detection', True),
+            'wildcard_cache': dns.get('wildcard_cache', './state/dns/wildcards.json'),
+            'wildcard_ttl': int(dns.get('wildcard_ttl_hours', 24)) * 3600
+        }
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**settings)
+    
+    async def resolve_stream(self, names: Iterable[str], on_result) -> None:
+        """Resolve names with bounded concurrency, calling on_result(record) as each completes."""
+        healthy = await self.pool.start()
+        if not healthy:
+            raise RuntimeError("no resolver answered the health check")
+        print(f"[DNS] {healthy}/{len(self.pool.resolvers)} resolvers healthy")
+        
+        names = iter(names)
+        seen = set()
+        
+        async def worker():
+            for name in names:
+                name = name.strip().lower().rstrip('.')
+                if not name or name in seen:
+                    continue
+                seen.add(name)
+                self.stats['input'] += 1
+                result = await self.pool.resolve(name)
+                if self.wildcards and (result['a'] or result['aaaa']):
+                    result['wildcard'] = await self.wildcards.is_wildcard(result)
+                on_result(result)
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            self.pool.close()
+            if self.wildcards:
+                self.wildcards.save()
+    
+    def run(self, input_file: str, output_file: str, records_file: Optional[str] = None) -> Dict:
+        records_file = records_file or f"{output_file.rsplit('.txt', 1)[0]}.jsonl"
+        print(f"[DNS] Resolving names from {input_file} with {len(self.pool.resolvers)} resolvers...")
+        
+        with open(output_file, 'w') as out, open(records_file, 'w') as records:
+            def on_result(result: Dict):
+                if result.get('wildcard'):
+                    self.stats['wildcard'] += 1
+                elif result['a'] or result['aaaa']:
+                    self.stats['resolved'] += 1
+                    out.write(f"{result['host']}\n")
+                    records.write(json.dumps(result) + "\n")
+                elif result['status'] == 'NXDOMAIN':
+                    self.stats['nxdomain'] += 1
+                else:
+                    self.stats['failed'] += 1
+            
+            asyncio.run(self.resolve_stream(iter_file_lines(input_file), on_result))
+        
+        for entry in self.pool.report():
+            print(f"[DNS]   {entry['resolver']}: {entry['queries']} queries, {entry['timeouts']} timeouts, "
+                  f"{entry['malformed']} malformed, {entry['servfail']} SERVFAIL, {entry['latency_ms']} ms")
+        if self.wildcards:
+            print(f"[DNS] Wildcards: {self.wildcards.stats['probed_zones']} zones probed, "
+                  f"{self.wildcards.stats['cached_zones']} from cache, {self.wildcards.stats['wildcard_zones']} wildcard")
+        print(f"[DNS] Resolved {self.stats['resolved']}/{self.stats['input']} "
+              f"({self.stats['wildcard']} wildcard, {self.stats['nxdomain']} NXDOMAIN, {self.stats['failed']} failed)")
+        return self.stats
+
+
+def main():
+    """Main entry point."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Resolve subdomains with a health-checked resolver pool")
+    parser.add_argument('input_file', help='File with one hostname per line')
+    parser.add_argument('output_file', help='Resolved hostnames (records go to <output>.jsonl)')
+    parser.add_argument('--records', help='JSON-lines file for A/AAAA/CNAME records')
+    parser.add_argument('--resolvers', help='Comma-separated resolvers (ip or ip:port); default from settings.yaml')
+    parser.add_argument('--rate', type=float, help='Queries per second per resolver')
+    parser.add_argument('--retries', type=int, help='Retries on other resolvers after a timeout or SERVFAIL')
+    parser.add_argument('--timeout', type=float, help='Seconds to wait for one answer')
+    parser.add_argument('--concurrency', type=int, help='Names in flight')
+    parser.add_argument('--wildcard-cache', help='Per-zone wildcard fingerprint cache file')
+    parser.add_argument('--no-wildcard', action='store_true', help='Keep names that only match a wildcard')
+    args = parser.parse_args()
+    
+    resolver = DNSResolver.from_config(
+        resolvers=args.resolvers.split(',') if args.resolvers else None,
+        rate=args.rate, retries=args.retries, timeout=args.timeout, concurrency=args.concurrency,
+        wildcard_cache=args.wildcard_cache, wildcard_detection=False if args.no_wildcard else None
+    )
+    try:
+        resolver.run(args.input_file, args.output_file, args.records)
+    except RuntimeError as e:
+        print(f"[DNS] {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
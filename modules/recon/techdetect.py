@@ -9,59 +9,60 @@ import subprocess
 import json
 import re
 import sys
-from typing import Dict, List, Optional
+import uuid
+import hashlib
+from typing import Dict, Iterable, List, Optional
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from lib.utils import iter_batches, iter_file_lines
+from lib.scope import guard_session, scoped
+from lib.fingerprint import DEFAULT_RULES, SignatureEngine
+
 
 class TechDetector:
     """Detect technologies and frameworks on web targets."""
     
-    # Common technology signatures
-    TECH_SIGNATURES = {
-        'frameworks': {
-            'express': ['x-powered-by: express', 'express'],
-            'django': ['csrftoken', 'django', 'x-frame-options: deny'],
-            'flask': ['werkzeug', 'flask'],
-            'rails': ['x-runtime', 'x-request-id', 'ruby'],
-            'laravel': ['laravel_session', 'xsrf-token'],
-            'spring': ['x-application-context', 'spring'],
-            'fastapi': ['fastapi', 'starlette'],
-            'nextjs': ['x-nextjs', '__next'],
-            'nuxt': ['nuxt', '__nuxt'],
-        },
-        'servers': {
-            'nginx': ['nginx', 'server: nginx'],
-            'apache': ['apache', 'server: apache'],
-            'iis': ['server: microsoft-iis', 'x-aspnet'],
-            'cloudflare': ['cf-ray', 'cf-cache-status'],
-            'aws': ['x-amz-', 'amazons3', 'awselb'],
-        },
-        'cms': {
-            'wordpress': ['wp-content', 'wp-includes', 'wordpress'],
-            'drupal': ['drupal', 'x-drupal-cache'],
-            'joomla': ['joomla', '/administrator'],
-        },
-        'api': {
-            'graphql': ['/graphql', 'graphiql', 'apollo'],
-            'swagger': ['swagger', 'openapi', '/api-docs'],
-            'rest': ['/api/v', '/rest/', 'application/json'],
-        },
-        'waf': {
-            'cloudflare': ['cf-ray', '__cfduid'],
-            'akamai': ['akamai', 'x-akamai'],
-            'aws_waf': ['x-amzn-waf'],
-            'imperva': ['incap_ses', 'visid_incap'],
-            'sucuri': ['sucuri', 'x-sucuri'],
-            'modsecurity': ['mod_security', 'modsecurity'],
-        }
-    }
+    # Wappalyzer-style rule database, compiled once into multi-pattern matchers
+    TECH_SIGNATURES = DEFAULT_RULES
+    
+    # API documentation paths, most telling first
+    API_DOC_PATHS = [
+        '/swagger.json',
+        '/openapi.json',
+        '/v2/swagger.json',
+        '/v3/api-docs',
+        '/api-docs',
+        '/swagger.yaml',
+        '/openapi.yaml',
+        '/api-docs.json',
+        '/v1/swagger.json',
+        '/v3/swagger.json',
+        '/.well-known/openapi.json',
+        '/swagger-ui.html',
+        '/swagger-ui/',
+        '/docs',
+        '/redoc',
+        '/graphql',
+        '/graphiql',
+        '/playground',
+    ]
+    
+    # Bytes read per doc response: enough to tell a document from the host's catch-all page
+    DOC_BODY_LIMIT = 64 * 1024
+    # Doc paths in flight per host
+    PATH_CONCURRENCY = 4
     
     def __init__(self, output_dir: str = "."):
         self.output_dir = output_dir
         self.results = {}
+        self.engine = SignatureEngine(self.TECH_SIGNATURES)
+        self.timeout = 10
     
     def detect_with_httpx(self, targets_file: str) -> Dict:
         """Use httpx for technology detection."""
@@ -72,93 +73,110 @@ class TechDetector:
             subprocess.run(cmd, shell=True, capture_output=True, timeout=600)
             
             results = []
-            if Path(output_file).exists():
-                with open(output_file, 'r') as f:
-                    for line in f:
-                        try:
-                            results.append(json.loads(line.strip()))
-                        except json.JSONDecodeError:
-                            continue
+            for line in iter_file_lines(output_file):
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
             
             return {'httpx': results}
         except Exception as e:
             print(f"[TECH] httpx detection failed: {e}")
             return {}
     
-    def analyze_headers(self, url: str, headers: Dict) -> Dict:
-        """Analyze HTTP headers for technology signatures."""
-        detected = {
-            'frameworks': [],
-            'servers': [],
-            'cms': [],
-            'api': [],
-            'waf': []
-        }
+    def load_probe(self, probe_file: str) -> Dict:
+        """Reuse the records of the recon probe instead of contacting every host again."""
+        results = []
+        for line in iter_file_lines(probe_file):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results.append({
+                'url': record.get('url', ''),
+                'status_code': record.get('status', 0),
+                'title': record.get('title', ''),
+                'webserver': record.get('server', ''),
+                'tech': record.get('tech', []),
+                'header': record.get('headers', {}),
+                'body': record.get('body', '')
+            })
+        return {'httpx': results}
+    
+    def analyze_headers(self, url: str, headers: Dict, body: str = '') -> Dict:
+        """Match headers (and the body prefix, when captured) against the signature engine."""
+        return self.engine.match(headers, body)
+    
+    def _probe_docs(self, session, target: str, executor: ThreadPoolExecutor) -> List[Dict]:
+        """Walk the doc paths of one host a few at a time, giving up early on dead hosts and catch-all servers."""
+        target = target.rstrip('/')
+        if '://' not in target:
+            target = f"https://{target}"
         
-        headers_lower = {k.lower(): v.lower() for k, v in headers.items()}
-        headers_str = json.dumps(headers_lower)
+        def fetch(url):
+            with session.get(url, timeout=self.timeout, allow_redirects=False, stream=True) as response:
+                body = response.raw.read(self.DOC_BODY_LIMIT, decode_content=True) or b''
+                return response.status_code, hashlib.blake2b(body, digest_size=8).digest()
         
-        for category, signatures in self.TECH_SIGNATURES.items():
-            for tech, patterns in signatures.items():
-                for pattern in patterns:
-                    if pattern.lower() in headers_str:
-                        if tech not in detected[category]:
-                            detected[category].append(tech)
-                        break
+        # A random path tells us what "not found" looks like on this host
+        try:
+            status, shell = fetch(f"{target}/vauban-{uuid.uuid4().hex[:12]}")
+        except Exception:
+            return []  # unreachable: skip every doc path
         
-        return detected
+        # Bodies already accounted for: the catch-all page and every document found so far
+        digests = {shell} if status == 200 else set()
+        found, failures, types = [], 0, set()
+        pending = list(self.API_DOC_PATHS)
+        while pending:
+            wave = []
+            while pending and len(wave) < self.PATH_CONCURRENCY:
+                path = pending.pop(0)
+                doc_type = self._identify_doc_type(path)
+                if doc_type in types and doc_type != 'unknown':
+                    continue  # one hit per documentation type is enough
+                wave.append((f"{target}{path}", doc_type, executor.submit(fetch, f"{target}{path}")))
+            
+            throttled = False
+            for url, doc_type, future in wave:
+                try:
+                    status, digest = future.result()
+                except Exception:
+                    failures += 1
+                    continue
+                if status == 429:
+                    throttled = True
+                elif status == 200 and digest not in digests:
+                    if doc_type in types and doc_type != 'unknown':
+                        continue
+                    found.append({'target': target, 'url': url, 'type': doc_type})
+                    types.add(doc_type)
+                    digests.add(digest)
+            if throttled or failures >= 3:
+                break  # throttled or failing: do not keep hammering this host
+        return found
     
-    def detect_api_docs(self, targets: List[str]) -> List[Dict]:
-        """Check for exposed API documentation endpoints."""
-        api_doc_paths = [
-            '/swagger.json',
-            '/swagger.yaml',
-            '/swagger-ui.html',
-            '/swagger-ui/',
-            '/openapi.json',
-            '/openapi.yaml',
-            '/api-docs',
-            '/api-docs.json',
-            '/v1/swagger.json',
-            '/v2/swagger.json',
-            '/v3/swagger.json',
-            '/docs',
-            '/redoc',
-            '/graphql',
-            '/graphiql',
-            '/playground',
-            '/.well-known/openapi.json',
-        ]
+    def detect_api_docs(self, targets: Iterable[str], workers: int = 20) -> List[Dict]:
+        """Check every host for exposed API documentation over one shared connection pool."""
+        session = guard_session(requests.Session())
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=self.PATH_CONCURRENCY, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.verify = False
+        session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         
         found_docs = []
-        
-        for target in targets:
-            target = target.rstrip('/')
-            urls_to_check = [f"{target}{path}" for path in api_doc_paths]
-            
-            # Create temp file with URLs
-            temp_file = f"{self.output_dir}/api_doc_urls.txt"
-            with open(temp_file, 'w') as f:
-                for url in urls_to_check:
-                    f.write(f"{url}\n")
-            
-            try:
-                cmd = f"httpx -l {temp_file} -silent -mc 200 -o {self.output_dir}/found_api_docs.txt"
-                subprocess.run(cmd, shell=True, capture_output=True, timeout=120)
-                
-                if Path(f"{self.output_dir}/found_api_docs.txt").exists():
-                    with open(f"{self.output_dir}/found_api_docs.txt", 'r') as f:
-                        for line in f:
-                            url = line.strip()
-                            if url:
-                                found_docs.append({
-                                    'target': target,
-                                    'url': url,
-                                    'type': self._identify_doc_type(url)
-                                })
-            except Exception as e:
-                print(f"[TECH] API doc detection failed for {target}: {e}")
-        
+        seen = set()
+        # Hosts and their doc paths use separate pools, so a host waiting on its paths never starves them
+        with ThreadPoolExecutor(max_workers=workers) as executor, \
+                ThreadPoolExecutor(max_workers=workers * self.PATH_CONCURRENCY) as path_executor:
+            for batch in iter_batches(targets):
+                for docs in executor.map(lambda target: self._probe_docs(session, target, path_executor), batch):
+                    for doc in docs:
+                        if doc['url'] not in seen:
+                            seen.add(doc['url'])
+                            found_docs.append(doc)
+        session.close()
         return found_docs
     
     def _identify_doc_type(self, url: str) -> str:
@@ -176,8 +194,8 @@ class TechDetector:
         else:
             return 'unknown'
     
-    def run(self, targets_file: str) -> Dict:
-        """Run full technology detection."""
+    def run(self, targets_file: str, probe_file: Optional[str] = None) -> Dict:
+        """Run full technology detection, from the probe records when available."""
         print("[TECH] Starting technology detection...")
         
         results = {
@@ -186,43 +204,51 @@ class TechDetector:
             'summary': {
                 'frameworks': {},
                 'servers': {},
+                'cms': {},
                 'waf_detected': []
             }
         }
         
-        # Run httpx tech detection
-        httpx_results = self.detect_with_httpx(targets_file)
-        
-        if 'httpx' in httpx_results:
-            for item in httpx_results['httpx']:
-                tech_item = {
-                    'url': item.get('url', ''),
-                    'status': item.get('status_code', 0),
-                    'title': item.get('title', ''),
-                    'server': item.get('webserver', ''),
-                    'technologies': item.get('tech', []),
-                }
-                results['technologies'].append(tech_item)
-                
-                # Update summary
-                for tech in item.get('tech', []):
-                    tech_lower = tech.lower()
-                    for category in ['frameworks', 'servers']:
-                        for tech_name in self.TECH_SIGNATURES.get(category, {}).keys():
-                            if tech_name in tech_lower:
-                                if tech_name not in results['summary'][category]:
-                                    results['summary'][category][tech_name] = 0
-                                results['summary'][category][tech_name] += 1
+        # Fingerprints captured by the probe stage; httpx only runs when there are none
+        if probe_file and Path(probe_file).exists():
+            httpx_results = self.load_probe(probe_file)
+        else:
+            httpx_results = self.detect_with_httpx(targets_file)
         
-        # Check for API documentation
-        targets = []
-        with open(targets_file, 'r') as f:
-            targets = [line.strip() for line in f if line.strip()]
+        summary = results['summary']
+        for item in httpx_results.get('httpx', []):
+            url = item.get('url', '')
+            detected = self.analyze_headers(url, item.get('header') or {}, item.get('body') or '')
+            
+            # httpx's own tech names count too, mapped onto our technology names
+            for tech in item.get('tech', []):
+                tech_lower = tech.lower()
+                for category in ('frameworks', 'servers', 'cms'):
+                    for tech_name in self.TECH_SIGNATURES.get(category, {}):
+                        if tech_name in tech_lower and tech_name not in detected[category]:
+                            detected[category].append(tech_name)
+            
+            results['technologies'].append({
+                'url': url,
+                'status': item.get('status_code', 0),
+                'title': item.get('title', ''),
+                'server': item.get('webserver', ''),
+                'technologies': item.get('tech', []),
+                'detected': detected
+            })
+            
+            for category in ('frameworks', 'servers', 'cms'):
+                counts = summary.setdefault(category, {})
+                for tech_name in detected[category]:
+                    counts[tech_name] = counts.get(tech_name, 0) + 1
+            if detected['waf']:
+                summary['waf_detected'].append({'url': url, 'waf': detected['waf']})
         
-        if targets:
-            results['api_docs'] = self.detect_api_docs(targets[:50])  # Limit to 50 for speed
+        # Check every live host for API documentation
+        results['api_docs'] = self.detect_api_docs(scoped(iter_file_lines(targets_file)))
         
-        print(f"[TECH] Detected {len(results['technologies'])} hosts with technology info")
+        print(f"[TECH] Detected {len(results['technologies'])} hosts with technology info "
+              f"({len(results['summary']['waf_detected'])} behind a WAF)")
         print(f"[TECH] Found {len(results['api_docs'])} exposed API documentation endpoints")
         
         # Save results
@@ -236,14 +262,19 @@ class TechDetector:
 def main():
     """Main entry point."""
     if len(sys.argv) < 2:
-        print("Usage: techdetect.py <targets_file> [output_dir]")
+        print("Usage: techdetect.py <targets_file> [output_dir] [probe_file]")
         sys.exit(1)
     
     targets_file = sys.argv[1]
     output_dir = sys.argv[2] if len(sys.argv) > 2 else "."
+    probe_file = sys.argv[3] if len(sys.argv) > 3 else None
+    
+    # Disable SSL warnings
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     
     detector = TechDetector(output_dir)
-    results = detector.run(targets_file)
+    results = detector.run(targets_file, probe_file)
     
     print(f"\n[TECH] Results saved to: {output_dir}/tech_results.json")
 
@@ -11,18 +11,24 @@ import requests
 import re
 from pathlib import Path
 from typing import Dict, List
-from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs, urlencode
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from lib.utils import iter_file_lines
+from lib.sampling import sample_targets
+from lib.scope import guard_session, scoped
+from lib.lanes import LaneScheduler
+
 
 class CustomVulnChecker:
     """Custom vulnerability detection beyond Nuclei."""
     
-    def __init__(self, output_dir: str = "."):
+    def __init__(self, output_dir: str = ".", budget: int = 100, tech_results: str = None):
         self.output_dir = output_dir
-        self.session = requests.Session()
+        self.budget = budget
+        self.lanes = LaneScheduler.from_config(tech_results)
+        self.session = self.lanes.attach(guard_session(requests.Session()))
         self.session.headers['User-Agent'] = 'Mozilla/5.0'
         self.session.verify = False
         self.timeout = 10
@@ -208,8 +214,8 @@ class CustomVulnChecker:
     
     def run(self, urls_file: str) -> Dict:
         """Run all custom checks on URLs from file."""
-        with open(urls_file) as f:
-            urls = [l.strip() for l in f if l.strip()][:100]  # Limit
+        # Spend the budget across hosts and path templates; the plan lists what was skipped
+        urls = sample_targets(scoped(iter_file_lines(urls_file)), self.budget, f"{self.output_dir}/custom_plan.json")
         
         results = {
             'urls_checked': 0,
@@ -218,19 +224,22 @@ class CustomVulnChecker:
             'vulnerabilities': []
         }
         
-        print(f"[CUSTOM] Running custom checks on {len(urls)} URLs...")
+        print(f"[CUSTOM] Running custom checks on URLs from {urls_file}...")
         
-        with ThreadPoolExecutor(max_workers=5) as ex:
-            for findings in ex.map(self.scan_url, urls):
+        # URLs actually checked (the sample, less those over a host's budget), for the seen-set
+        with open(f"{self.output_dir}/custom_scanned.txt", 'w') as scanned:
+            for url, findings in self.lanes.map(self.scan_url, urls):
                 results['urls_checked'] += 1
-                for f in findings:
+                scanned.write(f"{url}\n")
+                for f in findings or []:
                     results['vulnerabilities'].append(f)
                     results['findings'] += 1
                     t = f['type']
                     results['by_type'][t] = results['by_type'].get(t, 0) + 1
+        results['lanes'] = self.lanes.stats
         
-        # Check GraphQL on unique hosts
-        hosts = list(set([urlparse(u).netloc for u in urls]))[:20]
+        # Check GraphQL on unique hosts, leaving out those that ended up behind a WAF
+        hosts = [h for h in self.lanes.queues if self.lanes.lane_of(h) != 'protected'][:20]
         for host in hosts:
             for finding in self.check_graphql_introspection(f"https://{host}"):
                 results['vulnerabilities'].append(finding)
@@ -239,13 +248,15 @@ class CustomVulnChecker:
         with open(f"{self.output_dir}/custom_results.json", 'w') as f:
             json.dump(results, f, indent=2)
         
-        print(f"[CUSTOM] Found {results['findings']} issues")
+        print(f"[CUSTOM] Found {results['findings']} issues ({self.lanes.summary()})")
         return results
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: custom.py <urls_file> [output_dir]")
+        print("Usage: custom.py <urls_file> [output_dir] [budget] [tech_results]")
         sys.exit(1)
     import urllib3; urllib3.disable_warnings()
-    CustomVulnChecker(sys.argv[2] if len(sys.argv) > 2 else ".").run(sys.argv[1])
+    CustomVulnChecker(sys.argv[2] if len(sys.argv) > 2 else ".",
+                      int(sys.argv[3]) if len(sys.argv) > 3 else 100,
+                      sys.argv[4] if len(sys.argv) > 4 else None).run(sys.argv[1])
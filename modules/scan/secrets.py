@@ -11,10 +11,13 @@ import json
 import requests
 from pathlib import Path
 from typing import Dict, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from lib.utils import iter_file_lines
+from lib.scope import guard_session, scoped
+from lib.lanes import LaneScheduler
+
 
 class SecretDetector:
     """Detect secrets in web responses."""
@@ -43,9 +46,10 @@ class SecretDetector:
         'internal_ip': (r'(?:10\.|172\.(?:1[6-9]|2[0-9]|3[01])\.|192\.168\.)[0-9.]+', 'low'),
     }
     
-    def __init__(self, output_dir: str = "."):
+    def __init__(self, output_dir: str = ".", tech_results: str = None):
         self.output_dir = output_dir
-        self.session = requests.Session()
+        self.lanes = LaneScheduler.from_config(tech_results)
+        self.session = self.lanes.attach(guard_session(requests.Session()))
         self.session.headers['User-Agent'] = 'Mozilla/5.0'
         self.session.verify = False
     
@@ -74,30 +78,32 @@ class SecretDetector:
         return v[:4] + '...' + v[-4:] if len(v) > 8 else '*' * len(v)
     
     def run(self, urls_file: str) -> Dict:
-        with open(urls_file) as f:
-            urls = [l.strip() for l in f if l.strip()]
-        
         results = {'urls_scanned': 0, 'secrets_found': 0, 'by_severity': {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}, 'secrets': []}
         
-        print(f"[SECRETS] Scanning {len(urls)} URLs...")
-        with ThreadPoolExecutor(max_workers=10) as ex:
-            for secrets in ex.map(self.scan_url, urls):
+        print(f"[SECRETS] Scanning URLs from {urls_file}...")
+        # URLs actually scanned (lanes drop those over a host's budget), for the seen-set
+        with open(f"{self.output_dir}/secrets_scanned.txt", 'w') as scanned:
+            for url, secrets in self.lanes.map(self.scan_url, scoped(iter_file_lines(urls_file))):
                 results['urls_scanned'] += 1
-                for s in secrets:
+                scanned.write(f"{url}\n")
+                for s in secrets or []:
                     results['secrets'].append(s)
                     results['secrets_found'] += 1
                     results['by_severity'][s['severity']] += 1
+        results['lanes'] = self.lanes.stats
         
         with open(f"{self.output_dir}/secrets_results.json", 'w') as f:
             json.dump(results, f, indent=2)
         
+        print(f"[SECRETS] Scanned {results['urls_scanned']} URLs ({self.lanes.summary()})")
         print(f"[SECRETS] Found {results['secrets_found']} secrets (Critical: {results['by_severity']['critical']})")
         return results
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: secrets.py <urls_file> [output_dir]")
+        print("Usage: secrets.py <urls_file> [output_dir] [tech_results]")
         sys.exit(1)
     import urllib3; urllib3.disable_warnings()
-    SecretDetector(sys.argv[2] if len(sys.argv) > 2 else ".").run(sys.argv[1])
+    SecretDetector(sys.argv[2] if len(sys.argv) > 2 else ".",
+                   sys.argv[3] if len(sys.argv) > 3 else None).run(sys.argv[1])
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Vauban - Archive Index (CDX) Collector
+======================================
+Collect historical URLs straight from CDX-style archive indexes
+(Wayback Machine, Common Crawl) without external tools.
+
+Each index is asked how many result pages a domain has, and the pages are
+then fetched concurrently with server-side filtering and collapsing.
+Every page is cached on disk per index and domain, so an interrupted run
+resumes where it stopped and repeat sieges within the TTL cost nothing.
+URLs are written to the output as each page arrives.
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from lib.utils import iter_file_lines, load_config
+from lib.scope import active_scope
+
+
+DEFAULT_INDEXES = [
+    {
+        'name': 'wayback',
+        'url': 'https://web.archive.org/cdx/search/cdx',
+        'pattern': '{domain}',
+        'params': {'matchType': 'domain', 'fl': 'original', 'collapse': 'urlkey'},
+        'filters': ['statuscode:[23]..', '!mimetype:image/.*', '!mimetype:font/.*', '!mimetype:text/css']
+    },
+    {
+        'name': 'commoncrawl',
+        # collinfo.json is resolved to the newest crawl's index
+        'url': 'https://index.commoncrawl.org/collinfo.json',
+        'pattern': '*.{domain}',
+        'params': {'output': 'json', 'fl': 'url'},
+        'filters': ['=status:200']
+    }
+]
+
+
+class CDXCollector:
+    """Concurrent, paginated and cached client for CDX archive indexes."""
+    
+    CONFIG_FILE = Path(__file__).parent.parent.parent / 'config' / 'settings.yaml'
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    
+    def __init__(self, indexes: Optional[List[Dict]] = None, cache_dir: str = './state/cdx',
+                 cache_ttl: int = 7 * 24 * 3600, workers: int = 8, retries: int = 4, timeout: int = 60):
+        self.indexes = indexes or DEFAULT_INDEXES
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.workers = workers
+        self.retries = retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (compatible; Vauban)'
+        self.stats = {'pages': 0, 'cached_pages': 0, 'failed_pages': 0, 'failed_queries': 0, 'urls': 0}
+    
+    @classmethod
+    def from_config(cls, config_file: Optional[str] = None) -> 'CDXCollector':
+        """Build a collector from the urls.passive.archive section of settings.yaml."""
+        path = config_file or str(cls.CONFIG_FILE)
+        config = load_config(path) if os.path.exists(path) else {}
+        archive = (config or {}).get('urls', {}).get('passive', {}).get('archive', {})
+        return cls(
+            indexes=archive.get('indexes'),
+            cache_dir=archive.get('cache_dir', './state/cdx'),
+            cache_ttl=int(archive.get('cache_ttl_hours', 168)) * 3600,
+            workers=archive.get('workers', 8),
+            retries=archive.get('retries', 4)
+        )
+    
+    def _get(self, url: str, params: List[Tuple[str, str]]) -> Optional[str]:
+        """GET with exponential backoff on throttling and server errors."""
+        delay = 2.0
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code == 200:
+                    return response.text
+                if response.status_code not in self.RETRY_STATUS:
+                    return None
+                retry_after = response.headers.get('Retry-After', '')
+                wait = float(retry_after) if retry_after.isdigit() else delay
+            except requests.RequestException:
+                wait = delay
+            if attempt < self.retries:
+                time.sleep(min(wait, 60))
+                delay *= 2
+        return None
+    
+    def _endpoint(self, index: Dict) -> Optional[str]:
+        """Index API URL; a Common Crawl collinfo.json resolves to its newest crawl."""
+        if not index['url'].endswith('collinfo.json'):
+            return index['url']
+        if 'resolved' not in index:
+            body = self._get(index['url'], [])
+            try:
+                index['resolved'] = json.loads(body)[0]['cdx-api'] if body else None
+            except (ValueError, LookupError, TypeError):
+                index['resolved'] = None
+        return index['resolved']
+    
+    def _query(self, index: Dict, domain: str) -> List[Tuple[str, str]]:
+        """Query parameters with server-side filters ('filter' may repeat)."""
+        params = [('url', index.get('pattern', '{domain}').format(domain=domain))]
+        params += [(k, str(v)) for k, v in index.get('params', {}).items()]
+        params += [('filter', f) for f in index.get('filters', [])]
+        return params
+    
+    def _cache_path(self, index: Dict, domain: str, endpoint: str) -> str:
+        query = json.dumps([endpoint, self._query(index, domain)])
+        digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+        return os.path.join(self.cache_dir, index['name'], f"{domain}-{digest}")
+    
+    def _open_cache(self, path: str) -> Optional[Dict]:
+        """Manifest of a cached query, or None if absent or expired (expired entries are wiped)."""
+        manifest = os.path.join(path, 'manifest.json')
+        try:
+            with open(manifest) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - data.get('created', 0) > self.cache_ttl:
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        return data
+    
+    def _num_pages(self, index: Dict, domain: str, endpoint: str, cache_path: str) -> int:
+        manifest = self._open_cache(cache_path)
+        if manifest is not None:
+            return manifest['pages']
+        
+        body = self._get(endpoint, self._query(index, domain) + [('showNumPages', 'true')])
+        if body is None:
+            self.stats['failed_queries'] += 1
+            return 0
+        try:
+            value = json.loads(body)
+            pages = int(value['pages'] if isinstance(value, dict) else value)
+        except (ValueError, KeyError, TypeError):
+            pages = 1  # index without pagination support: a single page
+        
+        os.makedirs(cache_path, exist_ok=True)
+        with open(os.path.join(cache_path, 'manifest.json'), 'w') as f:
+            json.dump({'index': index['name'], 'domain': domain, 'pages': pages, 'created': time.time()}, f)
+        return pages
+    
+    @staticmethod
+    def _parse(body: str) -> Iterator[str]:
+        """URLs from a page in text (one field per line) or JSON-lines output."""
+        for line in body.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                url = record.get('url') or record.get('original')
+            else:
+                url = line.split(' ', 1)[0]
+            if url and url.startswith(('http://', 'https://')):
+                yield url
+    
+    def _fetch_page(self, index: Dict, domain: str, endpoint: str, cache_path: str,
+                    page: int) -> Optional[List[str]]:
+        """One result page, from cache if present. None if the page could not be fetched."""
+        page_file = os.path.join(cache_path, f"page-{page:05d}.txt.gz")
+        if os.path.exists(page_file):
+            with gzip.open(page_file, 'rt') as f:
+                self.stats['cached_pages'] += 1
+                return f.read().splitlines()
+        
+        body = self._get(endpoint, self._query(index, domain) + [('page', str(page))])
+        if body is None:
+            self.stats['failed_pages'] += 1
+            return None
+        
+        urls = list(self._parse(body))
+        # Staged then renamed, so a killed run never leaves a truncated page behind
+        fd, staged = tempfile.mkstemp(prefix='.page_', dir=cache_path)
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt') as f:
+            f.write('\n'.join(urls))
+        os.replace(staged, page_file)
+        self.stats['pages'] += 1
+        return urls
+    
+    def collect(self, domains: Iterable[str]) -> Iterator[str]:
+        """Yield unique, in-scope URLs for the domains as pages arrive."""
+        scope = active_scope()
+        seen = set()
+        domains = [d.strip().lower() for d in domains if d.strip()]
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Page counts first (one request per index and domain), then every page
+            plans = {}
+            for index in self.indexes:
+                endpoint = self._endpoint(index)
+                if not endpoint:
+                    print(f"[ARCHIVE] {index['name']}: index unavailable, skipping", file=sys.stderr)
+                    self.stats['failed_queries'] += len(domains)
+                    continue
+                for domain in domains:
+                    cache_path = self._cache_path(index, domain, endpoint)
+                    future = executor.submit(self._num_pages, index, domain, endpoint, cache_path)
+                    plans[future] = (index, domain, endpoint, cache_path)
+            
+            pages = {}
+            for future in as_completed(plans):
+                index, domain, endpoint, cache_path = plans[future]
+                try:
+                    count = future.result()
+                except Exception:
+                    self.stats['failed_queries'] += 1
+                    count = 0
+                for page in range(count):
+                    pages[executor.submit(self._fetch_page, index, domain, endpoint, cache_path, page)] = index['name']
+            
+            for future in as_completed(pages):
+                try:
+                    urls = future.result() or []
+                except Exception:
+                    self.stats['failed_pages'] += 1
+                    continue
+                for url in urls:
+                    key = hashlib.blake2b(url.encode('utf-8', 'replace'), digest_size=8).digest()
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if scope is None or scope.allows(url):
+                        self.stats['urls'] += 1
+                        yield url
+    
+    def run(self, targets_file: str, output_file: str) -> Dict:
+        """Collect URLs for every target domain, appending them to output_file ('-' for stdout) as they arrive."""
+        domains = []
+        for target in iter_file_lines(targets_file):
+            domain = target.replace('https://', '').replace('http://', '').split('/')[0].split(':')[0]
+            if domain and domain not in domains:
+                domains.append(domain)
+        
+        log = sys.stderr if output_file == '-' else sys.stdout
+        print(f"[ARCHIVE] Querying {len(self.indexes)} indexes for {len(domains)} domains...", file=log)
+        out = sys.stdout if output_file == '-' else open(output_file, 'a')
+        try:
+            for url in self.collect(domains):
+                out.write(f"{url}\n")
+                out.flush()
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        
+        print(f"[ARCHIVE] {self.stats['urls']} URLs from {self.stats['pages']} pages "
+              f"({self.stats['cached_pages']} cached, {self.stats['failed_pages']} failed, "
+              f"{self.stats['failed_queries']} page counts failed)", file=log)
+        return self.stats
+    
+    def failed(self) -> bool:
+        """True if errors left the run with no page at all, so a fallback source should step in."""
+        fetched = self.stats['pages'] + self.stats['cached_pages']
+        return fetched == 0 and (self.stats['failed_pages'] + self.stats['failed_queries']) > 0
+
+
+def main():
+    """Main entry point."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Collect archived URLs from CDX indexes")
+    parser.add_argument('targets_file', help='File with one domain (or URL) per line')
+    parser.add_argument('output_file', help="File to append URLs to, or '-' to stream to stdout")
+    parser.add_argument('--index', action='append', metavar='NAME=URL',
+                        help='Query this CDX endpoint instead of the configured ones (repeatable)')
+    parser.add_argument('--cache-dir', help='Page cache directory')
+    parser.add_argument('--workers', type=int, help='Concurrent requests')
+    args = parser.parse_args()
+    
+    collector = CDXCollector.from_config()
+    if args.index:
+        collector.indexes = []
+        for spec in args.index:
+            name, _, url = spec.partition('=') if '=' in spec else ('index', '', spec)
+            collector.indexes.append({'name': name, 'url': url, 'pattern': '{domain}',
+                                      'params': {'matchType': 'domain', 'fl': 'original'}})
+    if args.cache_dir:
+        collector.cache_dir = args.cache_dir
+    if args.workers:
+        collector.workers = args.workers
+    
+    collector.run(args.targets_file, args.output_file)
+    if collector.failed():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Vauban - Native Async Crawler
+=============================
+Single-pass asyncio crawler, used when katana is not installed.
+
+Seeds come from the targets plus each host's robots.txt and sitemaps. Links
+are classified as they are extracted: pages are queued on a deduplicated
+frontier, JavaScript assets go to their own stream, static assets are
+dropped. Depth and page budgets bound the crawl, and every host gets its
+own concurrency slot count and minimum delay between requests, under an
+overall requests-per-second limit.
+"""
+
+import re
+import sys
+import time
+import zlib
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from lib.utils import canonicalize_url, iter_file_lines
+from lib.scope import active_scope
+
+
+LINK_PATTERN = re.compile(
+    rb'''(?:href|src|action|data-src|data-url|formaction)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''',
+    re.IGNORECASE
+)
+SITEMAP_LOC = re.compile(rb'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+
+JS_EXTENSIONS = ('.js', '.mjs')
+STATIC_EXTENSIONS = (
+    '.css', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.bmp', '.woff', '.woff2',
+    '.ttf', '.eot', '.otf', '.mp4', '.mp3', '.webm', '.avi', '.mov', '.pdf', '.zip', '.gz', '.tar',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.map'
+)
+SKIP_SCHEMES = ('mailto:', 'javascript:', 'tel:', 'data:', '#', 'about:', 'blob:')
+
+
+class HostPolicy:
+    """Per-host politeness: bounded concurrency, a minimum request interval and robots rules."""
+    
+    def __init__(self, concurrency: int, delay: float):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self.next_request = 0.0
+        self.disallow: List[str] = []
+    
+    async def wait_turn(self) -> None:
+        now = time.monotonic()
+        start = max(now, self.next_request)
+        self.next_request = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+    
+    def allowed(self, path: str) -> bool:
+        return not any(path.startswith(rule) for rule in self.disallow)
+
+
+class AsyncCrawler:
+    """Breadth-first asyncio crawler with a deduplicated frontier and a separate JS stream."""
+    
+    MAX_BODY = 2 * 1024 * 1024
+    # Decompressed size ceiling for gzipped sitemaps (gzip bombs)
+    MAX_SITEMAP_BYTES = 32 * 1024 * 1024
+    MAX_SITEMAP_URLS = 5000
+    
+    def __init__(self, output_file: str, js_output_file: str, max_depth: int = 3, max_pages: int = 2000,
+                 concurrency: int = 10, per_host: int = 2, delay: float = 0.2, timeout: int = 10,
+                 respect_robots: bool = True, rate_limit: Optional[float] = None):
+        self.output_file = output_file
+        self.js_output_file = js_output_file
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.timeout = timeout
+        self.respect_robots = respect_robots
+        self.interval = 1.0 / rate_limit if rate_limit else 0.0
+        self.next_request = 0.0
+        self.scope = active_scope()
+        
+        self.seen: Set[bytes] = set()
+        self.hosts: Dict[str, HostPolicy] = {}
+        self.seed_hosts: Set[str] = set()
+        self.queue: Optional[asyncio.Queue] = None
+        self.pages_fetched = 0
+        self.stats = {'pages': 0, 'urls': 0, 'js': 0, 'errors': 0, 'robots_blocked': 0}
+    
+    @staticmethod
+    def _key(url: str) -> bytes:
+        return hashlib.blake2b(canonicalize_url(url).encode('utf-8', 'replace'), digest_size=8).digest()
+    
+    def _in_scope(self, url: str) -> bool:
+        if self.scope is not None:
+            return self.scope.allows(url)
+        return (urlsplit(url).hostname or '') in self.seed_hosts
+    
+    def _policy(self, url: str) -> HostPolicy:
+        host = urlsplit(url).netloc
+        policy = self.hosts.get(host)
+        if policy is None:
+            policy = self.hosts[host] = HostPolicy(self.per_host, self.delay)
+        return policy
+    
+    @staticmethod
+    def classify(url: str) -> str:
+        """'js', 'static' or 'page' from the URL path."""
+        path = urlsplit(url).path.lower()
+        if path.endswith(JS_EXTENSIONS):
+            return 'js'
+        if path.endswith(STATIC_EXTENSIONS):
+            return 'static'
+        return 'page'
+    
+    def _emit(self, url: str, kind: str) -> None:
+        if kind == 'js':
+            self.js_out.write(f"{url}\n")
+            self.stats['js'] += 1
+        self.url_out.write(f"{url}\n")
+        self.stats['urls'] += 1
+    
+    def _discover(self, url: str, depth: int) -> None:
+        """Record a link once, stream it, and queue it if it is a page worth fetching."""
+        url = url.split('#', 1)[0]
+        if not url.startswith(('http://', 'https://')) or not self._in_scope(url):
+            return
+        key = self._key(url)
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        
+        kind = self.classify(url)
+        if kind == 'static':
+            return
+        self._emit(url, kind)
+        if kind == 'page' and depth < self.max_depth:
+            self.queue.put_nowait((url, depth))
+    
+    async def _rate_turn(self) -> None:
+        """Space requests across all hosts to the overall rate limit."""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        start = max(now, self.next_request)
+        self.next_request = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+    
+    def _gunzip(self, body: bytes) -> Optional[bytes]:
+        """Decompress a (possibly truncated) gzip body, capped at MAX_SITEMAP_BYTES; None if corrupt."""
+        try:
+            return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body, self.MAX_SITEMAP_BYTES)
+        except zlib.error:
+            return None
+    
+    async def _get(self, session, url: str, limit: int = MAX_BODY) -> Tuple[int, str, bytes, Optional[str]]:
+        """(status, content-type, body prefix, redirect location) for a URL, honoring host politeness."""
+        policy = self._policy(url)
+        async with policy.slots:
+            await policy.wait_turn()
+            await self._rate_turn()
+            async with session.get(url, allow_redirects=False) as response:
+                body = await response.content.read(limit)
+                return (response.status, response.headers.get('Content-Type', ''),
+                        body, response.headers.get('Location'))
+    
+    async def _seed_host(self, session, origin: str) -> None:
+        """Load robots.txt rules and queue sitemap URLs for one origin."""
+        policy = self._policy(origin)
+        sitemaps = []
+        try:
+            status, _, body, _ = await self._get(session, f"{origin}/robots.txt", 256 * 1024)
+            if status == 200:
+                applies = False
+                for raw in body.decode('utf-8', 'replace').splitlines():
+                    line = raw.split('#', 1)[0].strip()
+                    field, _, value = line.partition(':')
+                    field, value = field.strip().lower(), value.strip()
+                    if field == 'user-agent':
+                        applies = value == '*'
+                    elif field == 'disallow' and applies and value and self.respect_robots:
+                        policy.disallow.append(value.split('*', 1)[0])
+                    elif field == 'sitemap' and value:
+                        sitemaps.append(value)
+                    # Robots paths are still worth knowing about
+                    if field in ('allow', 'disallow') and value and '*' not in value:
+                        self._discover(urljoin(origin, value), 1)
+        except Exception:
+            self.stats['errors'] += 1
+        
+        found = 0
+        pending = sitemaps or [f"{origin}/sitemap.xml"]
+        for index, sitemap in enumerate(pending):
+            if index >= 10 or found >= self.MAX_SITEMAP_URLS:
+                break
+            if not self._in_scope(sitemap):
+                continue  # robots.txt or a sitemap index pointing at another host
+            try:
+                status, _, body, _ = await self._get(session, sitemap)
+            except Exception:
+                continue
+            if status != 200:
+                continue
+            if body[:2] == b'\x1f\x8b':
+                body = self._gunzip(body)
+                if body is None:
+                    self.stats['errors'] += 1
+                    continue
+            for match in SITEMAP_LOC.finditer(body):
+                loc = match.group(1).decode('utf-8', 'replace')
+                # Sitemap indexes point at further sitemaps
+                if loc.endswith(('.xml', '.xml.gz')):
+                    pending.append(loc)
+                else:
+                    self._discover(loc, 1)
+                    found += 1
+    
+    async def _worker(self, session) -> None:
+        while True:
+            url, depth = await self.queue.get()
+            try:
+                await self._crawl(session, url, depth)
+            except Exception:
+                self.stats['errors'] += 1
+            finally:
+                self.queue.task_done()
+    
+    async def _crawl(self, session, url: str, depth: int) -> None:
+        if self.pages_fetched >= self.max_pages:
+            return
+        policy = self._policy(url)
+        parts = urlsplit(url)
+        if not policy.allowed(parts.path or '/'):
+            self.stats['robots_blocked'] += 1
+            return
+        
+        self.pages_fetched += 1
+        status, content_type, body, location = await self._get(session, url)
+        self.stats['pages'] += 1
+        
+        if location and 300 <= status < 400:
+            self._discover(urljoin(url, location), depth)
+            return
+        if status >= 400 or 'html' not in content_type.lower():
+            return
+        
+        for match in LINK_PATTERN.finditer(body):
+            raw = (match.group(1) or match.group(2) or match.group(3) or b'').decode('utf-8', 'replace').strip()
+            if not raw or raw.lower().startswith(SKIP_SCHEMES):
+                continue
+            self._discover(urljoin(url, raw), depth + 1)
+    
+    async def crawl(self, targets: List[str]) -> Dict:
+        self.queue = asyncio.Queue()
+        origins = []
+        for target in targets:
+            url = target if '://' in target else f"https://{target}"
+            parts = urlsplit(url)
+            if not parts.hostname:
+                continue
+            self.seed_hosts.add(parts.hostname)
+            origin = f"{parts.scheme}://{parts.netloc}"
+            if origin not in origins:
+                origins.append(origin)
+        
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ssl=False)
+        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        
+        with open(self.output_file, 'a') as self.url_out, open(self.js_output_file, 'a') as self.js_out:
+            async with aiohttp.ClientSession(timeout=timeout, connector=connector, headers=headers) as session:
+                workers = [asyncio.create_task(self._worker(session)) for _ in range(self.concurrency)]
+                
+                # robots.txt rules are in place before any page of that host is fetched
+                await asyncio.gather(*(self._seed_host(session, origin) for origin in origins))
+                for target in targets:
+                    self._discover(target if '://' in target else f"https://{target}", 0)
+                
+                await self.queue.join()
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        
+        return self.stats
+    
+    def run(self, targets_file: str) -> Dict:
+        targets = list(iter_file_lines(targets_file))
+        print(f"[CRAWLER] Crawling {len(targets)} targets (depth {self.max_depth}, budget {self.max_pages} pages)...")
+        stats = asyncio.run(self.crawl(targets))
+        print(f"[CRAWLER] {stats['pages']} pages fetched, {stats['urls']} URLs, {stats['js']} JS files "
+              f"({stats['robots_blocked']} blocked by robots.txt, {stats['errors']} errors)")
+        return stats
+
+
+def main():
+    """Main entry point."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Native asyncio crawler (katana fallback)")
+    parser.add_argument('targets_file', help='File with one URL or host per line')
+    parser.add_argument('output_file', help='File to append discovered URLs to')
+    parser.add_argument('--js-output', help='File to append JavaScript URLs to (default: <output>_js.txt)')
+    parser.add_argument('--depth', type=int, default=3, help='Maximum link depth from the seeds')
+    parser.add_argument('--max-pages', type=int, default=2000, help='Budget of pages fetched')
+    parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight overall')
+    parser.add_argument('--per-host', type=int, default=2, help='Requests in flight per host')
+    parser.add_argument('--delay', type=float, default=0.2, help='Minimum seconds between requests to one host')
+    parser.add_argument('--rate-limit', type=float, help='Requests per second across all hosts')
+    parser.add_argument('--ignore-robots', action='store_true', help='Crawl paths disallowed by robots.txt')
+    args = parser.parse_args()
+    
+    if aiohttp is None:
+        print("[CRAWLER] aiohttp is not installed (pip install aiohttp)", file=sys.stderr)
+        sys.exit(1)
+    
+    js_output = args.js_output or f"{args.output_file.rsplit('.txt', 1)[0]}_js.txt"
+    AsyncCrawler(args.output_file, js_output, max_depth=args.depth, max_pages=args.max_pages,
+                 concurrency=args.concurrency, per_host=args.per_host, delay=args.delay,
+                 respect_robots=not args.ignore_robots, rate_limit=args.rate_limit).run(args.targets_file)
+
+
+if __name__ == "__main__":
+    main()
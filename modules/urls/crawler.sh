@@ -1,7 +1,8 @@
 #!/bin/bash
 # LostFuzzer v2.0 - Active Crawler Module
 # ========================================
-# Active crawling using katana and hakrawler.
+# Active crawling using katana (or the native crawler.py when katana is
+# missing), hakrawler and gospider.
 
 set -e
 
@@ -14,15 +15,16 @@ RESET='\033[0m'
 
 # Check arguments
 if [ -z "$1" ]; then
-    echo -e "${RED}[ERROR] Usage: $0 <targets_file> <output_file> [depth]${RESET}"
+    echo -e "${RED}[ERROR] Usage: $0 <targets_file> <output_file> [depth] [threads] [js_output] [rate_limit]${RESET}"
     exit 1
 fi
 
 INPUT="$1"
 OUTPUT="${2:-crawled_urls.txt}"
-JS_OUTPUT="${OUTPUT%.txt}_js.txt"
 DEPTH="${3:-3}"
 THREADS="${4:-10}"
+JS_OUTPUT="${5:-${OUTPUT%.txt}_js.txt}"
+RATE_LIMIT="${6:-150}"
 TEMP_DIR=$(mktemp -d)
 
 if [ ! -f "$INPUT" ]; then
@@ -43,33 +45,32 @@ check_tool() {
     return 0
 }
 
-# Katana - Next-gen web crawler
+# Katana - Next-gen web crawler (single pass; JS files are split out of its output below)
 run_katana() {
-    if check_tool "katana"; then
-        echo -e "${GREEN}[+] Running katana...${RESET}"
-        katana -list "$INPUT" \
-            -silent \
-            -depth "$DEPTH" \
-            -js-crawl \
-            -headless \
-            -no-incognito \
-            -concurrency "$THREADS" \
-            -parallelism 5 \
-            -rate-limit 150 \
-            -timeout 10 \
-            -retry 1 \
-            -o "$TEMP_DIR/katana.txt" 2>/dev/null || true
-        
-        # Also output JS files separately
-        katana -list "$INPUT" \
-            -silent \
-            -depth "$DEPTH" \
-            -js-crawl \
-            -ef css,png,jpg,jpeg,gif,svg,ico,woff,woff2,ttf,eot \
-            -f js \
-            -concurrency "$THREADS" \
-            -o "$TEMP_DIR/katana_js.txt" 2>/dev/null || true
-    fi
+    echo -e "${GREEN}[+] Running katana...${RESET}"
+    katana -list "$INPUT" \
+        -silent \
+        -depth "$DEPTH" \
+        -js-crawl \
+        -headless \
+        -no-incognito \
+        -ef css,png,jpg,jpeg,gif,svg,ico,woff,woff2,ttf,eot \
+        -concurrency "$THREADS" \
+        -parallelism 5 \
+        -rate-limit "$RATE_LIMIT" \
+        -timeout 10 \
+        -retry 1 \
+        -o "$TEMP_DIR/katana.txt" 2>/dev/null || true
+}
+
+# Native asyncio crawler - robots/sitemap seeding, per-host politeness, separate JS stream
+run_native() {
+    echo -e "${GREEN}[+] Running native crawler...${RESET}"
+    python3 "$(dirname "$0")/crawler.py" "$INPUT" "$TEMP_DIR/native.txt" \
+        --js-output "$TEMP_DIR/native_js.lst" \
+        --depth "$DEPTH" \
+        --concurrency "$THREADS" \
+        --rate-limit "$RATE_LIMIT" || true
 }
 
 # Hakrawler - Fast web crawler
@@ -97,9 +98,15 @@ run_gospider() {
 }
 
 # Run crawlers
-run_katana
-run_hakrawler
-run_gospider
+if command -v katana &> /dev/null; then
+    run_katana &
+else
+    echo -e "${YELLOW}[WARN] katana not found, using the native crawler${RESET}"
+    run_native &
+fi
+run_hakrawler &
+run_gospider &
+wait
 
 # Merge all results
 echo -e "${CYAN}[CRAWLER] Merging crawled URLs...${RESET}"
@@ -109,7 +116,8 @@ cat "$TEMP_DIR"/*.txt 2>/dev/null | \
 
 # Extract JS files
 echo -e "${CYAN}[CRAWLER] Extracting JavaScript files...${RESET}"
-grep -iE "\.js(\?|$)" "$OUTPUT" 2>/dev/null | sort -u > "$JS_OUTPUT" || true
+cat <(grep -iE "\.m?js(\?|$)" "$OUTPUT" 2>/dev/null) "$TEMP_DIR/native_js.lst" 2>/dev/null | \
+    sort -u > "$JS_OUTPUT" || true
 
 TOTAL_URLS=$(wc -l < "$OUTPUT" | tr -d ' ')
 JS_COUNT=$(wc -l < "$JS_OUTPUT" 2>/dev/null | tr -d ' ')
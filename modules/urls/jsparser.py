@@ -8,49 +8,275 @@ Extract endpoints, secrets, and sensitive data from JavaScript files.
 import re
 import sys
 import json
+import base64
+import codecs
+import heapq
+import hashlib
+import threading
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Set, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Set, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import requests
 from urllib.parse import urljoin, urlparse
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from lib.utils import iter_file_lines
+from lib.scope import active_scope, guard_session, scoped
+
+
+def _keyword_trie_pattern(keywords: List[str]) -> str:
+    """
+    Build a regex from a keyword trie, e.g. ['dev', 'debug'] -> 'de(?:bug|v)'.
+    
+    Shared prefixes are matched once, so the regex engine walks the keywords
+    as an automaton instead of retrying every alternative at each offset.
+    """
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def emit(node: Dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if '' in node:
+            body = f"(?:{body})?"
+        return body
+    
+    return emit(trie)
+
+
+class SourceMapReader:
+    """
+    Incremental reader for source map JSON.
+    
+    Walks the top-level object chunk by chunk and yields `sourcesContent`
+    entries one at a time, skipping everything else (notably the multi-MB
+    `mappings` string) without keeping it. Memory is bounded by the chunk
+    size plus the largest single source, which is capped at MAX_SOURCE_SIZE.
+    Names from `sources` are collected into `self.sources` as they are read;
+    since `sources` may follow `sourcesContent`, entries are yielded by index.
+    """
+    
+    MAX_SOURCE_SIZE = 16 * 1024 * 1024
+    
+    STRING_STOP = re.compile(r'["\\]')
+    CONTAINER_STOP = re.compile(r'["\[\]{}]')
+    SCALAR = re.compile(r'[^,\]}\s]*')
+    
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.sources: List[str] = []
+    
+    def _fill(self) -> bool:
+        """Drop consumed text and append the next chunk. False at end of input."""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        for chunk in self.chunks:
+            if chunk:
+                self.buffer += self.decoder.decode(chunk)
+                return True
+        self.buffer += self.decoder.decode(b'', final=True)
+        self.eof = True
+        return False
+    
+    def _peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+    
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Malformed source map: expected {char!r}")
+        self.pos += 1
+    
+    def _read_string(self, keep: bool = True, limit: int = 0) -> Optional[str]:
+        """
+        Read a JSON string (opening quote already consumed).
+        
+        Returns the decoded value, or None when `keep` is False or the string
+        grows past `limit`; in both cases the remaining text is discarded.
+        """
+        parts = []
+        size = 0
+        while True:
+            match = self.STRING_STOP.search(self.buffer, self.pos)
+            if not match:
+                if keep:
+                    parts.append(self.buffer[self.pos:])
+                    size += len(self.buffer) - self.pos
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    raise ValueError("Malformed source map: unterminated string")
+            elif match.group() == '"':
+                if keep:
+                    parts.append(self.buffer[self.pos:match.start()])
+                self.pos = match.end()
+                return json.loads(f'"{"".join(parts)}"') if keep else None
+            else:
+                # Make sure the escaped character is buffered too
+                while match.end() >= len(self.buffer) and self._fill():
+                    match = self.STRING_STOP.search(self.buffer, self.pos)
+                escape_end = min(match.end() + 1, len(self.buffer))
+                if keep:
+                    parts.append(self.buffer[self.pos:escape_end])
+                    size += escape_end - self.pos
+                self.pos = escape_end
+            if keep and limit and size > limit:
+                keep = False
+                parts = []
+    
+    def _skip_value(self) -> None:
+        """Skip one JSON value of any type."""
+        char = self._peek()
+        if char == '"':
+            self.pos += 1
+            self._read_string(keep=False)
+        elif char in ('{', '['):
+            depth = 0
+            while True:
+                match = self.CONTAINER_STOP.search(self.buffer, self.pos)
+                if not match:
+                    self.pos = len(self.buffer)
+                    if not self._fill():
+                        raise ValueError("Malformed source map: unterminated container")
+                    continue
+                self.pos = match.end()
+                token = match.group()
+                if token == '"':
+                    self._read_string(keep=False)
+                elif token in '{[':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        else:
+            while True:
+                match = self.SCALAR.match(self.buffer, self.pos)
+                self.pos = match.end()
+                if self.pos < len(self.buffer) or not self._fill():
+                    return
+    
+    def _iter_array(self) -> Iterator[int]:
+        """Yield element indexes of an array, leaving the cursor on each element."""
+        self._expect('[')
+        index = 0
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield index
+            index += 1
+            char = self._peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError("Malformed source map: expected ',' or ']'")
+    
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        # Skip an XSSI guard such as ")]}'" before the object
+        while True:
+            start = self.buffer.find('{', self.pos)
+            if start != -1:
+                self.pos = start
+                break
+            self.pos = len(self.buffer)
+            if not self._fill():
+                return
+        
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            self._expect('"')
+            key = self._read_string()
+            self._expect(':')
+            
+            if key == 'sources' and self._peek() == '[':
+                for _ in self._iter_array():
+                    if self._peek() == '"':
+                        self.pos += 1
+                        self.sources.append(self._read_string() or '')
+                    else:
+                        self._skip_value()
+                        self.sources.append('')
+            elif key == 'sourcesContent' and self._peek() == '[':
+                for index in self._iter_array():
+                    if self._peek() == '"':
+                        self.pos += 1
+                        source = self._read_string(limit=self.MAX_SOURCE_SIZE)
+                        if source:
+                            yield index, source
+                    else:
+                        self._skip_value()
+            else:
+                self._skip_value()
+            
+            char = self._peek()
+            self.pos += 1
+            if char != ',':
+                return
+
 
 class JSParser:
     """Parse JavaScript files to extract endpoints and secrets."""
     
-    # Regex patterns for endpoint extraction
-    ENDPOINT_PATTERNS = [
-        # API paths
-        r'["\'](/api/[^"\'>\s]+)["\']',
-        r'["\'](/v[0-9]+/[^"\'>\s]+)["\']',
-        r'["\'](/rest/[^"\'>\s]+)["\']',
-        r'["\'](/graphql[^"\'>\s]*)["\']',
-        
-        # Full URLs
-        r'["\'](https?://[^"\'>\s]+)["\']',
-        
-        # Relative paths
-        r'["\'](/[a-zA-Z0-9_\-]+/[^"\'>\s]*)["\']',
-        
-        # URL in template literals
-        r'`(/[^`]+)`',
-        r'`(https?://[^`]+)`',
-        
-        # fetch/axios calls
-        r'fetch\s*\(\s*["\']([^"\']+)["\']',
-        r'axios\.[a-z]+\s*\(\s*["\']([^"\']+)["\']',
-        r'\.get\s*\(\s*["\']([^"\']+)["\']',
-        r'\.post\s*\(\s*["\']([^"\']+)["\']',
-        r'\.put\s*\(\s*["\']([^"\']+)["\']',
-        r'\.delete\s*\(\s*["\']([^"\']+)["\']',
-        
-        # XMLHttpRequest
-        r'\.open\s*\(\s*["\'][A-Z]+["\']\s*,\s*["\']([^"\']+)["\']',
-    ]
+    # Single-pass JS lexer: comments, regex literals, strings and template literals.
+    # Comments and regex literals are matched only so their contents are skipped.
+    # Every branch starts with a literal character so the regex engine can skip
+    # ahead between tokens instead of trying each branch at every offset.
+    JS_TOKEN_PATTERN = re.compile(r'''
+        //[^\n]*
+      | /\*.*?\*/
+      | /(?:(?<=[(,=:\[!&|?{};]/)|(?<=[(,=:\[!&|?{};]\s/))(?![*/])(?:[^/\\\n\[]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*
+      | "(?P<dstring>[^"\\\n]*(?:\\.[^"\\\n]*)*)"
+      | '(?P<sstring>[^'\\\n]*(?:\\.[^'\\\n]*)*)'
+      | `(?P<template>[^`\\]*(?:\\.[^`\\]*)*)`
+    ''', re.VERBOSE | re.DOTALL)
+    
+    # Literals joined by "+" only (e.g. "/api/" + "users")
+    JS_CONCAT_GAP = re.compile(r'\s*\+\s*')
+    
+    # Quoted literals that look like endpoints on their own
+    ENDPOINT_LITERAL_PATTERN = re.compile(
+        r'(?:/api/|/v[0-9]+/|/rest/|https?://)[^"\'>\s]+'
+        r'|/graphql[^"\'>\s]*'
+        r'|/[a-zA-Z0-9_\-]+/[^"\'>\s]*',
+        re.IGNORECASE
+    )
+    
+    # Template literals are kept when they start like a path or URL
+    ENDPOINT_TEMPLATE_PATTERN = re.compile(r'(?:/|https?://).+', re.IGNORECASE | re.DOTALL)
+    
+    # Call sites whose first string argument is an endpoint (fetch/axios/XHR)
+    CALL_CONTEXT_PATTERN = re.compile(
+        r'(?:fetch|axios\.[a-z]+|\.get|\.post|\.put|\.delete)\s*\(\s*$'
+        r'|\.open\s*\(\s*["\'][A-Z]+["\']\s*,\s*$',
+        re.IGNORECASE
+    )
+    
+    # Characters of preceding code kept as call context for each literal
+    CONTEXT_WINDOW = 48
     
     # Secret patterns
     SECRET_PATTERNS = {
@@ -87,9 +313,53 @@ class JSParser:
         'config', 'setting', 'hidden', 'staging', 'dev', 'beta'
     ]
     
-    def __init__(self, output_dir: str = "."):
+    # All keywords compiled into one trie-shaped matcher. ASCII content is
+    # lowercased once and scanned case-sensitively, which is much faster than
+    # re.IGNORECASE; the case-insensitive variant keeps offsets exact otherwise.
+    KEYWORD_PATTERN = re.compile(_keyword_trie_pattern(INTERESTING_KEYWORDS))
+    KEYWORD_PATTERN_NOCASE = re.compile(KEYWORD_PATTERN.pattern, re.IGNORECASE)
+    
+    # Characters kept either side of a keyword hit, clipped to the enclosing line
+    KEYWORD_WINDOW = 80
+    
+    # Interesting hits reported per file
+    MAX_INTERESTING = 20
+    
+    # Known public library builds (sha256 of the body) that are never analyzed
+    VENDOR_HASHES_FILE = Path(__file__).parent.parent.parent / 'config' / 'js_vendor_hashes.txt'
+    
+    # Standalone library builds recognised by their leading license banner
+    VENDOR_BANNER_PATTERN = re.compile(
+        r'\s*/\*[*!]?\s*(?:@license\s+)?'
+        r'(jQuery|React|Lodash|Bootstrap|Vue\.js|Moment\.js|Underscore\.js|Modernizr)\b'
+    )
+    
+    # Bundler runtimes: a banner in such a file may sit in front of app code
+    BUNDLER_MARKERS = ('__webpack_require__', 'webpackChunk', '__vite__', 'parcelRequire')
+    
+    # A banner alone only vouches for files this small with no sign of app code;
+    # concatenated vendor+app bundles carry route strings libraries never have
+    VENDOR_BANNER_MAX_SIZE = 600 * 1024
+    APP_MARKER_PATTERN = re.compile(r'["\'`]/(?:api|v\d+|graphql|rest|internal|admin|auth)\b', re.IGNORECASE)
+    
+    # Lazy-loaded bundler chunks, followed first in recursive mode
+    CHUNK_PATTERN = re.compile(
+        r'\.chunk\.m?js$|/chunks?/|/static/js/|[._-][0-9a-f]{6,}\.m?js$|^\d+\.m?js$',
+        re.IGNORECASE
+    )
+    
+    # sourceMappingURL comment, normally the last line of a bundle
+    SOURCEMAP_PATTERN = re.compile(r'//[#@]\s*sourceMappingURL\s*=\s*(\S+)')
+    
+    def __init__(self, output_dir: str = ".", follow_sourcemaps: bool = True):
         self.output_dir = output_dir
-        self.session = requests.Session()
+        self.follow_sourcemaps = follow_sourcemaps
+        self.vendor_hashes = self.load_vendor_hashes()
+        
+        # sha256 of body -> analysis, shared by every URL serving that body
+        self._registry: Dict[str, Dict] = {}
+        self._registry_lock = threading.Lock()
+        self.session = guard_session(requests.Session())
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
@@ -104,21 +374,220 @@ class JSParser:
             pass
         return None
     
+    def load_vendor_hashes(self) -> Dict[str, str]:
+        """Load the vendor skiplist as {sha256: label}."""
+        hashes = {}
+        if not self.VENDOR_HASHES_FILE.exists():
+            return hashes
+        with open(self.VENDOR_HASHES_FILE, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                digest, _, label = line.partition(' ')
+                hashes[digest.lower()] = label.strip() or 'vendor'
+        return hashes
+    
+    def update_vendor_hashes(self, urls: List[str]) -> int:
+        """Fetch library builds and append their hashes to the skiplist."""
+        added = 0
+        for url in urls:
+            content = self.fetch_js(url)
+            if not content:
+                print(f"[JS] Could not fetch {url}")
+                continue
+            digest = self.content_hash(content)
+            if digest in self.vendor_hashes:
+                continue
+            label = url.rsplit('/', 1)[-1] if url.startswith('http') else url
+            with open(self.VENDOR_HASHES_FILE, 'a') as f:
+                f.write(f"{digest} {label}\n")
+            self.vendor_hashes[digest] = label
+            added += 1
+        return added
+    
+    @staticmethod
+    def content_hash(content: str) -> str:
+        """Hash a JS body, ignoring leading/trailing whitespace."""
+        return hashlib.sha256(content.strip().encode('utf-8', 'replace')).hexdigest()
+    
+    def identify_vendor(self, content: str, digest: str) -> Optional[str]:
+        """Return a label if the body is a known public library build."""
+        if digest in self.vendor_hashes:
+            return self.vendor_hashes[digest]
+        
+        if len(content) > self.VENDOR_BANNER_MAX_SIZE:
+            return None
+        match = self.VENDOR_BANNER_PATTERN.match(content, 0, 512)
+        if (match and not any(marker in content for marker in self.BUNDLER_MARKERS)
+                and not self.APP_MARKER_PATTERN.search(content)):
+            return match.group(1)
+        
+        return None
+    
+    def find_sourcemap(self, content: str, js_url: str) -> Optional[str]:
+        """Return the absolute source map URL referenced by a bundle, if any."""
+        # Search backwards from the end: an inline data: map can be megabytes long
+        match = None
+        pos = content.rfind('sourceMappingURL')
+        while pos != -1 and match is None:
+            match = self.SOURCEMAP_PATTERN.match(content, content.rfind('//', 0, pos))
+            pos = content.rfind('sourceMappingURL', 0, pos)
+        if not match:
+            return None
+        
+        ref = match.group(1)
+        if ref.startswith('data:'):
+            return ref
+        return urljoin(js_url, ref)
+    
+    def _iter_sourcemap_chunks(self, map_url: str, timeout: int = 30) -> Iterator[bytes]:
+        """Stream a source map's bytes, decoding inline data: URIs."""
+        if map_url.startswith('data:'):
+            header, _, data = map_url.partition(',')
+            payload = base64.b64decode(data) if header.endswith(';base64') else data.encode()
+            for i in range(0, len(payload), 65536):
+                yield payload[i:i + 65536]
+            return
+        
+        response = self.session.get(map_url, timeout=timeout, verify=False, stream=True)
+        try:
+            if response.status_code == 200:
+                yield from response.iter_content(chunk_size=65536)
+        finally:
+            response.close()
+    
+    def parse_sourcemap(self, map_url: str, base_url: str = "") -> Dict:
+        """
+        Run endpoint and secret extraction over each original source in a map.
+        
+        Sources are streamed one at a time, so memory stays bounded regardless
+        of map size. Findings are attributed to the original file name.
+        """
+        result = {
+            'url': map_url if not map_url.startswith('data:') else 'inline',
+            'sources_scanned': 0,
+            'sources': []
+        }
+        
+        reader = SourceMapReader(self._iter_sourcemap_chunks(map_url))
+        findings = []
+        try:
+            for index, source in reader:
+                result['sources_scanned'] += 1
+                endpoints = self.extract_endpoints(source, base_url)
+                secrets = self.extract_secrets(source)
+                if endpoints or secrets:
+                    findings.append((index, endpoints, secrets))
+        except Exception as e:
+            result['error'] = str(e)
+        
+        for index, endpoints, secrets in findings:
+            name = reader.sources[index] if index < len(reader.sources) else ''
+            name = name or f"source[{index}]"
+            for secret in secrets:
+                secret['source'] = name
+            result['sources'].append({
+                'source': name,
+                'endpoints': sorted(endpoints),
+                'secrets': secrets
+            })
+        
+        return result
+    
+    def iter_literals(self, content: str) -> Iterator[Dict]:
+        """
+        Lex string and template literals out of JavaScript in one pass.
+        
+        Yields dicts with the literal value, its kind ('string', 'template' or
+        'concat'), start/end offsets and up to CONTEXT_WINDOW characters of
+        preceding code. Adjacent literals joined with "+" are additionally
+        yielded as a single 'concat' literal.
+        """
+        chain = []
+        
+        for match in self.JS_TOKEN_PATTERN.finditer(content):
+            if match.group('dstring') is not None:
+                kind, value = 'string', match.group('dstring')
+            elif match.group('sstring') is not None:
+                kind, value = 'string', match.group('sstring')
+            elif match.group('template') is not None:
+                kind, value = 'template', match.group('template')
+            else:
+                continue
+            
+            start, end = match.span()
+            literal = {
+                'value': value,
+                'kind': kind,
+                'start': start,
+                'end': end,
+                'context': content[max(0, start - self.CONTEXT_WINDOW):start]
+            }
+            
+            if chain and self.JS_CONCAT_GAP.fullmatch(content, chain[-1]['end'], start):
+                chain.append(literal)
+            else:
+                if len(chain) > 1:
+                    yield self._join_literals(chain)
+                chain = [literal]
+            
+            yield literal
+        
+        if len(chain) > 1:
+            yield self._join_literals(chain)
+    
+    def _join_literals(self, chain: List[Dict]) -> Dict:
+        """Merge a run of concatenated literals into one."""
+        return {
+            'value': ''.join(part['value'] for part in chain),
+            'kind': 'concat',
+            'start': chain[0]['start'],
+            'end': chain[-1]['end'],
+            'context': chain[0]['context']
+        }
+    
+    def _classify_literal(self, literal: Dict) -> Optional[str]:
+        """Return the endpoint carried by a literal, or None."""
+        value = literal['value'].strip()
+        if not value:
+            return None
+        
+        looks_like_url = value[0] == '/' or value[:4].lower() == 'http'
+        
+        if literal['kind'] == 'template':
+            if looks_like_url and self.ENDPOINT_TEMPLATE_PATTERN.fullmatch(value):
+                return value
+            return None
+        
+        if looks_like_url and self.ENDPOINT_LITERAL_PATTERN.fullmatch(value):
+            return value
+        
+        # Only call arguments can promote an arbitrary string to an endpoint
+        context = literal['context'].rstrip()
+        if literal['kind'] == 'string' and context[-1:] in ('(', ','):
+            if self.CALL_CONTEXT_PATTERN.search(literal['context']):
+                return value
+        
+        return None
+    
     def extract_endpoints(self, content: str, base_url: str = "") -> Set[str]:
         """Extract potential endpoints from JavaScript content."""
         endpoints = set()
+        seen = set()
         
-        for pattern in self.ENDPOINT_PATTERNS:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            for match in matches:
-                endpoint = match.strip()
-                
-                # Skip obvious false positives
-                if self._is_valid_endpoint(endpoint):
-                    # Make absolute URL if base_url provided
-                    if base_url and endpoint.startswith('/'):
-                        endpoint = urljoin(base_url, endpoint)
-                    endpoints.add(endpoint)
+        for literal in self.iter_literals(content):
+            endpoint = self._classify_literal(literal)
+            if not endpoint or endpoint in seen:
+                continue
+            seen.add(endpoint)
+            
+            # Skip obvious false positives
+            if self._is_valid_endpoint(endpoint):
+                # Make absolute URL if base_url provided
+                if base_url and endpoint.startswith('/'):
+                    endpoint = urljoin(base_url, endpoint)
+                endpoints.add(endpoint)
         
         return endpoints
     
@@ -141,24 +610,61 @@ class JSParser:
         
         return secrets
     
-    def find_interesting_lines(self, content: str) -> List[Dict]:
-        """Find lines containing interesting keywords."""
+    def find_interesting_lines(self, content: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Find interesting keywords and the code around them.
+        
+        Each hit reports the keyword, line number, byte offset and a context
+        window of at most KEYWORD_WINDOW characters either side, so minified
+        single-line bundles still give useful snippets. At most one hit is
+        reported per window and scanning stops once `limit` hits are found.
+        """
+        limit = self.MAX_INTERESTING if limit is None else limit
         interesting = []
-        lines = content.split('\n')
-        
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
-            for keyword in self.INTERESTING_KEYWORDS:
-                if keyword in line_lower:
-                    # Extract context
-                    context = line.strip()[:200]
-                    if context:
-                        interesting.append({
-                            'keyword': keyword,
-                            'line': i + 1,
-                            'context': context
-                        })
-                    break
+        ascii_only = content.isascii()
+        
+        window_end = 0
+        line = 1
+        line_pos = 0
+        byte_offset = 0
+        byte_pos = 0
+        
+        if ascii_only:
+            matches = self.KEYWORD_PATTERN.finditer(content.lower())
+        else:
+            matches = self.KEYWORD_PATTERN_NOCASE.finditer(content)
+        
+        for match in matches:
+            if len(interesting) >= limit:
+                break
+            
+            start, end = match.span()
+            if start < window_end:
+                continue
+            
+            window_start = max(content.rfind('\n', max(0, start - self.KEYWORD_WINDOW), start) + 1,
+                               start - self.KEYWORD_WINDOW, 0)
+            newline = content.find('\n', end, end + self.KEYWORD_WINDOW)
+            window_end = newline if newline != -1 else min(len(content), end + self.KEYWORD_WINDOW)
+            
+            context = content[window_start:window_end].strip()[:200]
+            if not context:
+                continue
+            
+            line += content.count('\n', line_pos, start)
+            line_pos = start
+            if ascii_only:
+                byte_offset = start
+            else:
+                byte_offset += len(content[byte_pos:start].encode('utf-8'))
+                byte_pos = start
+            
+            interesting.append({
+                'keyword': match.group(0).lower(),
+                'line': line,
+                'offset': byte_offset,
+                'context': context
+            })
         
         return interesting
     
@@ -179,6 +685,51 @@ class JSParser:
         
         return True
     
+    def analyze_content(self, content: str, js_url: str) -> Dict:
+        """
+        Analyze a JS body independent of the host serving it.
+        
+        Endpoints are kept unresolved so the analysis can be shared by every
+        URL that serves an identical body.
+        """
+        analysis = {
+            'endpoints': self.extract_endpoints(content),
+            'secrets': self.extract_secrets(content),
+            'interesting': self.find_interesting_lines(content),
+            'sourcemap': None
+        }
+        
+        # Original sources from the bundle's source map
+        map_url = self.find_sourcemap(content, js_url) if self.follow_sourcemaps else None
+        if map_url:
+            analysis['sourcemap'] = self.parse_sourcemap(map_url)
+        
+        return analysis
+    
+    def _cached_analysis(self, digest: str, content: str, js_url: str) -> Tuple[Dict, bool]:
+        """Return (analysis, was_cached), analyzing each body only once."""
+        with self._registry_lock:
+            entry = self._registry.get(digest)
+            owner = entry is None
+            if owner:
+                entry = self._registry[digest] = {'ready': threading.Event(), 'analysis': None}
+        
+        if not owner:
+            entry['ready'].wait()
+            return entry['analysis'], True
+        
+        try:
+            entry['analysis'] = self.analyze_content(content, js_url)
+        finally:
+            if entry['analysis'] is None:
+                entry['analysis'] = {'endpoints': set(), 'secrets': [], 'interesting': [], 'sourcemap': None}
+            entry['ready'].set()
+        return entry['analysis'], False
+    
+    def _resolve_endpoints(self, endpoints: Iterable[str], base_url: str) -> List[str]:
+        """Make relative endpoints absolute against base_url."""
+        return [urljoin(base_url, e) if e.startswith('/') else e for e in endpoints]
+    
     def parse_file(self, js_url: str) -> Dict:
         """Parse a single JavaScript file."""
         result = {
@@ -192,23 +743,79 @@ class JSParser:
         if not content:
             return result
         
+        digest = self.content_hash(content)
+        result['sha256'] = digest
+        
+        vendor = self.identify_vendor(content, digest)
+        if vendor:
+            result['vendor'] = vendor
+            return result
+        
+        analysis, result['duplicate'] = self._cached_analysis(digest, content, js_url)
+        
         # Get base URL for resolving relative paths
         parsed = urlparse(js_url)
         base_url = f"{parsed.scheme}://{parsed.netloc}"
         
-        # Extract findings
-        result['endpoints'] = list(self.extract_endpoints(content, base_url))
-        result['secrets'] = self.extract_secrets(content)
-        result['interesting'] = self.find_interesting_lines(content)[:20]  # Limit
+        endpoints = set(self._resolve_endpoints(analysis['endpoints'], base_url))
+        result['secrets'] = list(analysis['secrets'])
+        result['interesting'] = analysis['interesting']
         
+        sourcemap = analysis['sourcemap']
+        if sourcemap:
+            sources = []
+            for source in sourcemap['sources']:
+                source_endpoints = self._resolve_endpoints(source['endpoints'], base_url)
+                sources.append(dict(source, endpoints=sorted(source_endpoints)))
+                endpoints.update(source_endpoints)
+                result['secrets'].extend(source['secrets'])
+            result['sourcemap'] = dict(sourcemap, sources=sources)
+        
+        result['endpoints'] = list(endpoints)
         return result
     
-    def parse_files(self, js_urls: List[str], max_workers: int = 10) -> Dict:
-        """Parse multiple JavaScript files in parallel."""
+    @staticmethod
+    def _url_key(url: str) -> bytes:
+        """Compact visited-set key: 8-byte digest of the URL without fragment."""
+        return hashlib.blake2b(url.split('#', 1)[0].encode('utf-8', 'replace'), digest_size=8).digest()
+    
+    def _frontier_priority(self, url: str, origins: Set[str], depth: int) -> Tuple[int, int, int]:
+        """Lower sorts first: same-origin, then chunk-named, then shallower."""
+        parsed = urlparse(url)
+        same_origin = parsed.netloc in origins
+        chunk = bool(self.CHUNK_PATTERN.search(parsed.path) or
+                     self.CHUNK_PATTERN.search(parsed.path.rsplit('/', 1)[-1]))
+        return (0 if same_origin else 1, 0 if chunk else 1, depth)
+    
+    def _discover_js(self, file_result: Dict) -> List[str]:
+        """JS files referenced by a parsed file's endpoints."""
+        found = []
+        scope = active_scope()
+        for endpoint in file_result['endpoints']:
+            url = urljoin(file_result['url'], endpoint)
+            parsed = urlparse(url)
+            if parsed.scheme in ('http', 'https') and parsed.path.lower().endswith(('.js', '.mjs')):
+                if scope is None or scope.allows(url):
+                    found.append(url)
+        return found
+    
+    def parse_files(self, js_urls: List[str], max_workers: int = 10, recursive: bool = False,
+                    max_depth: int = 2, max_files: int = 500) -> Dict:
+        """
+        Parse multiple JavaScript files in parallel.
+        
+        In recursive mode, .js files found among extracted endpoints (lazy
+        chunks, route bundles) are queued on a priority frontier and parsed
+        too, up to `max_depth` hops from the input list and `max_files`
+        discovered files. Seeds are always parsed in full.
+        """
         results = {
             'files_processed': 0,
+            'files_discovered': 0,
             'total_endpoints': 0,
             'total_secrets': 0,
+            'duplicate_files': 0,
+            'vendor_skipped': 0,
             'endpoints': [],
             'secrets': [],
             'files': []
@@ -216,20 +823,59 @@ class JSParser:
         
         print(f"[JS] Parsing {len(js_urls)} JavaScript files...")
         
+        visited: Set[bytes] = set()
+        origins = {urlparse(url).netloc for url in js_urls}
+        frontier: List[Tuple] = []
+        sequence = 0
+        
+        for url in js_urls:
+            key = self._url_key(url)
+            if key not in visited:
+                visited.add(key)
+                frontier.append(((-1, 0, 0), sequence, url, 0))
+                sequence += 1
+        heapq.heapify(frontier)
+        
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(self.parse_file, url): url for url in js_urls}
+            running = {}
             
-            for future in as_completed(futures):
-                try:
-                    file_result = future.result()
+            while frontier or running:
+                while frontier and len(running) < max_workers:
+                    _, _, url, depth = heapq.heappop(frontier)
+                    running[executor.submit(self.parse_file, url)] = depth
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = running.pop(future)
+                    try:
+                        file_result = future.result()
+                    except Exception:
+                        continue
+                    
                     results['files_processed'] += 1
+                    if file_result.get('duplicate'):
+                        results['duplicate_files'] += 1
+                    if file_result.get('vendor'):
+                        results['vendor_skipped'] += 1
                     
                     if file_result['endpoints'] or file_result['secrets']:
                         results['files'].append(file_result)
                         results['endpoints'].extend(file_result['endpoints'])
                         results['secrets'].extend(file_result['secrets'])
-                except Exception as e:
-                    pass
+                    
+                    if not recursive or depth >= max_depth:
+                        continue
+                    for url in self._discover_js(file_result):
+                        if results['files_discovered'] >= max_files:
+                            break
+                        key = self._url_key(url)
+                        if key in visited:
+                            continue
+                        visited.add(key)
+                        results['files_discovered'] += 1
+                        heapq.heappush(frontier, (self._frontier_priority(url, origins, depth + 1),
+                                                  sequence, url, depth + 1))
+                        sequence += 1
         
         # Deduplicate
         results['endpoints'] = list(set(results['endpoints']))
@@ -238,18 +884,21 @@ class JSParser:
         
         return results
     
-    def run(self, js_file_list: str) -> Dict:
+    def run(self, js_file_list: str, recursive: bool = False, max_depth: int = 2,
+            max_files: int = 500) -> Dict:
         """Main entry point - parse JS files from a list."""
-        js_urls = []
-        
-        with open(js_file_list, 'r') as f:
-            js_urls = [line.strip() for line in f if line.strip()]
+        js_urls = list(scoped(iter_file_lines(js_file_list)))
         
         if not js_urls:
             print("[JS] No JavaScript files to parse")
             return {}
         
-        results = self.parse_files(js_urls)
+        results = self.parse_files(js_urls, recursive=recursive, max_depth=max_depth, max_files=max_files)
+        
+        # Absolute URLs to third-party hosts (CDNs, analytics) are dropped
+        scope = active_scope()
+        if scope:
+            results['endpoints'] = [e for e in results['endpoints'] if '://' not in e or scope.allows(e)]
         
         # Save results
         output_file = f"{self.output_dir}/js_analysis.json"
@@ -268,7 +917,10 @@ class JSParser:
             with open(secrets_file, 'w') as f:
                 json.dump(results['secrets'], f, indent=2)
         
-        print(f"[JS] Processed: {results['files_processed']} files")
+        if recursive:
+            print(f"[JS] Discovered: {results['files_discovered']} additional JS files")
+        print(f"[JS] Processed: {results['files_processed']} files "
+              f"({results['duplicate_files']} duplicate, {results['vendor_skipped']} vendor skipped)")
         print(f"[JS] Endpoints found: {results['total_endpoints']}")
         print(f"[JS] Secrets found: {results['total_secrets']}")
         
@@ -277,21 +929,39 @@ class JSParser:
 
 def main():
     """Main entry point."""
-    if len(sys.argv) < 2:
-        print("Usage: jsparser.py <js_files_list> [output_dir]")
-        sys.exit(1)
+    import argparse
     
-    js_file_list = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else "."
+    parser = argparse.ArgumentParser(description="Extract endpoints and secrets from JavaScript files")
+    parser.add_argument('js_file_list', nargs='?', help='File with one JS URL per line')
+    parser.add_argument('output_dir', nargs='?', default='.', help='Output directory (default: .)')
+    parser.add_argument('--recursive', action='store_true',
+                        help='Follow .js files discovered inside parsed files')
+    parser.add_argument('--max-depth', type=int, default=2, help='Recursive hops from the input list')
+    parser.add_argument('--max-files', type=int, default=500, help='Budget of discovered files to parse')
+    parser.add_argument('--update-vendor-hashes', nargs='?', metavar='URLS_FILE',
+                        const=str(JSParser.VENDOR_HASHES_FILE.with_name('js_vendor_sources.txt')),
+                        help='Fetch library builds and append their hashes to the vendor skiplist')
+    args = parser.parse_args()
     
     # Disable SSL warnings
     import urllib3
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     
-    parser = JSParser(output_dir)
-    results = parser.run(js_file_list)
+    if args.update_vendor_hashes:
+        with open(args.update_vendor_hashes, 'r') as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        added = JSParser().update_vendor_hashes(urls)
+        print(f"[JS] Added {added} vendor hashes to {JSParser.VENDOR_HASHES_FILE}")
+        return
+    
+    if not args.js_file_list:
+        parser.error("js_file_list is required")
+    
+    js_parser = JSParser(args.output_dir)
+    results = js_parser.run(args.js_file_list, recursive=args.recursive,
+                            max_depth=args.max_depth, max_files=args.max_files)
     
-    print(f"\n[JS] Results saved to: {output_dir}/js_analysis.json")
+    print(f"\n[JS] Results saved to: {args.output_dir}/js_analysis.json")
 
 
 if __name__ == "__main__":
@@ -42,52 +42,41 @@ check_tool() {
     return 0
 }
 
+# Sources write URLs to stdout, one line per write so concurrent sources never
+# interleave mid-line; status messages go to stderr.
+
 # gau - GetAllUrls (Wayback, CommonCrawl, AlienVault, URLScan)
 run_gau() {
-    if check_tool "gau"; then
-        echo -e "${GREEN}[+] Running gau...${RESET}"
-        cat "$INPUT" | gau --threads "$THREADS" --subs >> "$TEMP_DIR/gau.txt" 2>/dev/null || true
-    fi
-}
-
-# waybackurls - Wayback Machine URLs
-run_waybackurls() {
-    if check_tool "waybackurls"; then
-        echo -e "${GREEN}[+] Running waybackurls...${RESET}"
-        cat "$INPUT" | waybackurls >> "$TEMP_DIR/waybackurls.txt" 2>/dev/null || true
+    if check_tool "gau" >&2; then
+        echo -e "${GREEN}[+] Running gau...${RESET}" >&2
+        cat "$INPUT" | gau --threads "$THREADS" --subs 2>/dev/null | grep --line-buffered -E "^https?://" || true
     fi
 }
 
-# gauplus - Extended gau with more sources
-run_gauplus() {
-    if check_tool "gauplus"; then
-        echo -e "${GREEN}[+] Running gauplus...${RESET}"
-        cat "$INPUT" | gauplus --threads "$THREADS" >> "$TEMP_DIR/gauplus.txt" 2>/dev/null || true
+# Archive indexes (Wayback CDX, Common Crawl) - paginated, cached, filtered server-side.
+# URLs are streamed as index pages arrive; a non-zero exit means every query failed.
+run_archive() {
+    echo -e "${GREEN}[+] Querying archive indexes...${RESET}" >&2
+    if ! python3 "$(dirname "$0")/archive.py" "$INPUT" - --workers "$THREADS"; then
+        run_waybackurls
     fi
 }
 
-# waymore - Enhanced wayback fetcher
-run_waymore() {
-    if check_tool "waymore"; then
-        echo -e "${GREEN}[+] Running waymore...${RESET}"
-        while read -r target; do
-            waymore -i "$target" -mode U -oU "$TEMP_DIR/waymore_${target//[^a-zA-Z0-9]/_}.txt" 2>/dev/null || true
-        done < "$INPUT"
+# waybackurls - Wayback Machine URLs (fallback when the archive collector fails)
+run_waybackurls() {
+    if check_tool "waybackurls" >&2; then
+        echo -e "${GREEN}[+] Running waybackurls...${RESET}" >&2
+        cat "$INPUT" | waybackurls 2>/dev/null | grep --line-buffered -E "^https?://" || true
     fi
 }
 
-# Run tools in parallel
-run_gau &
-run_waybackurls &
-
-# Wait for all background jobs
-wait
-
-# Merge results
-echo -e "${CYAN}[PASSIVE] Merging and deduplicating URLs...${RESET}"
-cat "$TEMP_DIR"/*.txt 2>/dev/null | \
-    grep -E "^https?://" | \
-    sort -u > "$OUTPUT"
+# Run sources in parallel, deduplicating their merged stream as it arrives
+echo -e "${CYAN}[PASSIVE] Streaming and deduplicating URLs...${RESET}"
+{
+    run_gau &
+    run_archive &
+    wait
+} | awk '!seen[$0]++' > "$OUTPUT"
 
 TOTAL_URLS=$(wc -l < "$OUTPUT" | tr -d ' ')
 echo -e "${GREEN}[PASSIVE] Collected ${TOTAL_URLS} unique URLs${RESET}"
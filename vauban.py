@@ -38,6 +38,7 @@ import sys
 import argparse
 import subprocess
 import shutil
+import tempfile
 from pathlib import Path
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -47,10 +48,17 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from lib.utils import (
     load_config, create_output_dir, read_file_lines, write_file_lines,
-    merge_files, check_tool_installed, get_missing_tools, count_file_lines
+    merge_files, check_tool_installed, get_missing_tools, count_file_lines,
+    sanitize_filename, iter_file_lines
 )
 from lib.logger import Logger, log
 from lib.notifier import Notifier
+from lib.seenset import SeenSet
+from lib.corpus import URLCorpus
+from lib.clustering import cluster_file
+from lib.scope import Scope, SCOPE_ENV
+from lib.toolcache import ToolCache
+from lib.hostcluster import cluster_probe_results, filter_representatives, propagate_findings
 
 
 class Vauban:
@@ -68,7 +76,15 @@ class Vauban:
         self.args = args
         self.config = load_config('config/settings.yaml') if os.path.exists('config/settings.yaml') else {}
         self.logger = Logger(verbose=args.verbose)
+        self.merge_memory = self.config.get('general', {}).get('merge_memory_mb', 512) * 1024 * 1024
         self.output_dir = None
+        self.seen = None
+        self.corpus = None
+        self.scope = None
+        self.tool_cache = None
+        self.clusters_file = None
+        self.refresh_pool = None
+        self.refreshes = []
         self.stats = {
             'target': args.input,
             'subdomains': 0,
@@ -103,6 +119,119 @@ class Vauban:
         self.logger.info(f"Siege output: {self.output_dir}")
         return self.output_dir
     
+    def setup_seen_set(self):
+        """Load the persistent seen-set of URLs for this target."""
+        state_config = self.config.get('state', {})
+        seen_config = state_config.get('seen_set', {})
+        if not seen_config.get('enabled', True):
+            return
+        
+        path = os.path.join(state_config.get('dir', './state'), f"{sanitize_filename(self.args.input)}.seen")
+        error_rate = seen_config.get('error_rate', 0.001)
+        exact_limit = seen_config.get('exact_limit', 200000)
+        
+        # --fresh skips the filtering (see filter_seen) but keeps adding to the history
+        self.seen = SeenSet.load(path, error_rate, exact_limit)
+        self.logger.debug(f"Seen-set: {len(self.seen)} known URLs ({path})")
+    
+    def setup_scope(self, targets_file: str):
+        """Compile the scope and publish it to module subprocesses."""
+        scope_config = self.config.get('scope', {})
+        if not scope_config.get('enabled', True):
+            return
+        
+        include = list(scope_config.get('include') or [])
+        exclude = list(scope_config.get('exclude') or [])
+        if scope_config.get('file') and os.path.exists(scope_config['file']):
+            for rule in read_file_lines(scope_config['file']):
+                if rule.startswith('!'):
+                    exclude.append(rule[1:])
+                else:
+                    include.append(rule)
+        
+        if include:
+            self.scope = Scope(include, exclude)
+        else:
+            self.scope = Scope.from_targets(read_file_lines(targets_file), exclude)
+        
+        scope_file = os.path.join(self.output_dir, 'scope.json')
+        self.scope.save(scope_file)
+        os.environ[SCOPE_ENV] = os.path.abspath(scope_file)
+        self.logger.debug(f"Scope: {', '.join(self.scope.include_rules)}"
+                          f"{' excluding ' + ', '.join(self.scope.exclude_rules) if self.scope.exclude_rules else ''}")
+    
+    def enforce_scope(self, filepath: str, stage: str):
+        """Drop out-of-scope lines from an artifact before anything consumes it."""
+        if not self.scope or not os.path.exists(filepath):
+            return
+        kept, dropped = self.scope.filter_file(filepath)
+        if dropped:
+            self.logger.info(f"{stage}: dropped {dropped} out-of-scope entries ({kept} kept)")
+    
+    def filter_seen(self, filepath: str, stage: str):
+        """Drop URLs already scanned by an earlier run; they are marked by mark_seen."""
+        if self.seen is None or self.args.fresh or not os.path.exists(filepath):
+            return
+        kept, skipped = self.seen.filter_file(filepath, record=False)
+        if skipped:
+            self.logger.info(f"{stage}: {kept} new URLs, {skipped} already scanned")
+    
+    def mark_seen(self, scanned_files: list):
+        """Record the URLs every scanner reported as processed and persist the seen-set."""
+        if self.seen is None:
+            return
+        if scanned_files and all(os.path.exists(f) for f in scanned_files):
+            # Narrow the smallest report down by the others, holding only that one in memory
+            scanned_files = sorted(scanned_files, key=os.path.getsize)
+            scanned = set(iter_file_lines(scanned_files[0]))
+            for filepath in scanned_files[1:]:
+                scanned = {url for url in iter_file_lines(filepath) if url in scanned}
+            added = sum(1 for url in scanned if self.seen.add(url))
+            self.logger.debug(f"Seen-set: {added} URLs marked as scanned")
+        self.seen.save()
+    
+    def setup_corpus(self):
+        """Open the indexed URL corpus for this siege."""
+        if not self.config.get('corpus', {}).get('enabled', True):
+            return
+        self.corpus = URLCorpus(os.path.join(self.output_dir, 'corpus.db'))
+    
+    def collect_urls(self, filepath: str, source: str):
+        """Load a stage's URL artifact into the corpus, tagged with its source."""
+        if not self.corpus or not os.path.exists(filepath):
+            return
+        added = self.corpus.import_file(filepath, source)
+        self.logger.debug(f"Corpus: {added} URLs from {source}")
+    
+    def export_urls(self, sources: list, input_files: list, output_file: str):
+        """
+        Write the legacy text artifact holding every URL from `sources`.
+        
+        Without a corpus the stage files in `input_files` are merged instead.
+        """
+        if self.corpus:
+            self.corpus.export(output_file, sources=sources)
+            return
+        input_files = [f for f in input_files if os.path.exists(f)]
+        if input_files:
+            merge_files(input_files, output_file, unique=True, memory_limit=self.merge_memory)
+    
+    def cluster_targets(self, urls_file: str) -> str:
+        """Collapse URLs to path/query templates and return the exemplar file to scan."""
+        cluster_config = self.config.get('urls', {}).get('clustering', {})
+        if not cluster_config.get('enabled', True) or count_file_lines(urls_file) == 0:
+            return urls_file
+        
+        exemplars_file = os.path.join(self.output_dir, 'scan_targets.txt')
+        total, kept = cluster_file(
+            urls_file, exemplars_file,
+            templates_file=os.path.join(self.output_dir, 'urls', 'url_templates.json'),
+            exemplars=cluster_config.get('exemplars', 3),
+            max_branch=cluster_config.get('max_branch', 50)
+        )
+        self.logger.info(f"Clustered {total} URLs into {kept} exemplars")
+        return exemplars_file
+    
     def run_module(self, script: str, *args, timeout: int = 600) -> tuple:
         """Run a shell module script."""
         script_path = os.path.join(os.path.dirname(__file__), script)
@@ -125,6 +254,88 @@ class Vauban:
         except Exception as e:
             return "", str(e), -1
     
+    def setup_tool_cache(self):
+        """Open the cache of passive recon tool output shared by every siege."""
+        state_config = self.config.get('state', {})
+        cache_config = state_config.get('tool_cache', {})
+        if not cache_config.get('enabled', True):
+            return
+        ttls = {source: int(hours * 3600) for source, hours in (cache_config.get('ttl_hours') or {}).items()}
+        self.tool_cache = ToolCache(cache_config.get('dir', os.path.join(state_config.get('dir', './state'), 'toolcache')),
+                                    ttls)
+        self.refresh_pool = ThreadPoolExecutor(max_workers=cache_config.get('refresh_workers', 2))
+    
+    def _run_module_to_file(self, script: str, target: str, *args, timeout: int = 600) -> tuple:
+        """Run a module writing to a scratch file. Returns (scratch path, return code)."""
+        fd, scratch = tempfile.mkstemp(prefix='module_', suffix='.txt', dir=self.output_dir)
+        os.close(fd)
+        _, _, returncode = self.run_module(script, target, scratch, *args, timeout=timeout)
+        return scratch, returncode
+    
+    def _refresh_cached(self, source: str, key: str, script: str, target: str, args: tuple,
+                        timeout: int, meta: dict) -> list:
+        """Background re-run of a stale module; returns the lines the cache did not have."""
+        scratch, returncode = self._run_module_to_file(script, target, *args, timeout=timeout)
+        try:
+            if returncode != 0:
+                return []
+            return self.tool_cache.merge_file(source, key, scratch, meta)
+        finally:
+            os.remove(scratch)
+    
+    def run_cached_module(self, source: str, script: str, target: str, output_file: str, *args,
+                          deps: tuple = (), timeout: int = 600):
+        """
+        Run a passive recon module through the tool cache, appending its output to output_file.
+        
+        A fresh entry is replayed without running the module. A stale entry is
+        replayed at once and refreshed in the background; the refreshed entry
+        serves the next siege, so this siege's artifacts stay consistent.
+        """
+        script_path = os.path.join(os.path.dirname(__file__), script)
+        key = entry = None
+        meta = {'script': script, 'target': target if not os.path.isfile(target) else os.path.basename(target)}
+        if self.tool_cache and os.path.exists(script_path):
+            deps = [os.path.join(os.path.dirname(__file__), dep) for dep in deps]
+            key = self.tool_cache.key(source, script_path, target, args, deps)
+            entry = None if self.args.fresh else self.tool_cache.lookup(source, key)
+        
+        if entry is None:
+            scratch, returncode = self._run_module_to_file(script, target, *args, timeout=timeout)
+            if key and returncode == 0:
+                self.tool_cache.store_file(source, key, scratch, meta)
+            lines = read_file_lines(scratch)
+            os.remove(scratch)
+        else:
+            lines = self.tool_cache.lines(source, key)
+            age = entry['age'] / 3600
+            if entry['fresh']:
+                self.logger.info(f"{source}: {len(lines)} cached results for {meta['target']} ({age:.1f}h old)")
+            else:
+                self.logger.info(f"{source}: {len(lines)} cached results for {meta['target']} "
+                                 f"({age:.1f}h old, refreshing in background for the next run)")
+                future = self.refresh_pool.submit(self._refresh_cached, source, key, script, target, args,
+                                                  timeout, meta)
+                self.refreshes.append((future, source))
+        
+        write_file_lines(output_file, lines, mode='a')
+    
+    def finish_refreshes(self):
+        """Wait for background cache refreshes so their entries are complete for the next run."""
+        if not self.refresh_pool:
+            return
+        for future, source in self.refreshes:
+            try:
+                delta = future.result()
+            except Exception as e:
+                self.logger.warning(f"{source}: background refresh failed: {e}")
+                continue
+            if delta:
+                # Stages of this siege already consumed the artifact; the cache carries them forward
+                self.logger.info(f"{source}: background refresh cached {len(delta)} new entries for the next run")
+        self.refreshes = []
+        self.refresh_pool.shutdown(wait=True)
+    
     def run_python_module(self, script: str, *args) -> bool:
         """Run a Python module."""
         script_path = os.path.join(os.path.dirname(__file__), script)
@@ -162,6 +373,7 @@ class Vauban:
         subdomains_file = os.path.join(self.output_dir, 'recon', 'subdomains.txt')
         resolved_file = os.path.join(self.output_dir, 'recon', 'resolved.txt')
         live_file = os.path.join(self.output_dir, 'recon', 'live_hosts.txt')
+        probe_file = os.path.join(self.output_dir, 'recon', 'probe_results.jsonl')
         
         targets = read_file_lines(targets_file)
         
@@ -169,14 +381,19 @@ class Vauban:
             self.logger.info("Enumerating subdomains (outer fortifications)...")
             for target in targets:
                 domain = target.replace('https://', '').replace('http://', '').split('/')[0]
-                self.run_module('modules/recon/subdomain.sh', domain, subdomains_file)
+                self.run_cached_module('subdomains', 'modules/recon/subdomain.sh', domain, subdomains_file)
+            self.enforce_scope(subdomains_file, "Subdomains")
             
             self.stats['subdomains'] = count_file_lines(subdomains_file)
             self.logger.success(f"Mapped {self.stats['subdomains']} subdomains")
             
             if count_file_lines(subdomains_file) > 0:
                 self.logger.info("Resolving DNS (identifying active bastions)...")
-                self.run_module('modules/recon/dns.sh', subdomains_file, resolved_file)
+                dns_config = self.config.get('recon', {}).get('dns', {})
+                self.run_module('modules/recon/dns.sh', subdomains_file, resolved_file,
+                                dns_config.get('threads', 100), dns_config.get('resolver', '8.8.8.8,1.1.1.1'),
+                                dns_config.get('engine', 'native'))
+                self.enforce_scope(resolved_file, "DNS")
         else:
             shutil.copy(targets_file, subdomains_file)
         
@@ -185,18 +402,49 @@ class Vauban:
         if not os.path.exists(input_for_probe):
             input_for_probe = targets_file
         
-        cmd = f"httpx -l {input_for_probe} -silent -t 50 -o {live_file}"
-        subprocess.run(cmd, shell=True, capture_output=True)
+        # One httpx pass: live hosts plus the fingerprint records TechDetector reads
+        probe_config = self.config.get('recon', {}).get('probe', {})
+        self.run_python_module('modules/recon/probe.py', input_for_probe, live_file, probe_file,
+                               '--threads', probe_config.get('threads', 50),
+                               '--rate-limit', self.config.get('general', {}).get('rate_limit', 150),
+                               '--timeout', probe_config.get('timeout', 10))
+        self.enforce_scope(live_file, "Live hosts")
         
         self.stats['live_hosts'] = count_file_lines(live_file)
         self.logger.success(f"Identified {self.stats['live_hosts']} live hosts")
         
         if self.args.mode == 'full' and count_file_lines(live_file) > 0:
             self.logger.info("Fingerprinting technologies (analyzing defenses)...")
-            self.run_python_module('modules/recon/techdetect.py', live_file, os.path.join(self.output_dir, 'recon'))
+            self.run_python_module('modules/recon/techdetect.py', live_file, os.path.join(self.output_dir, 'recon'),
+                                   probe_file)
+        
+        self.cluster_hosts(probe_file)
         
         return live_file
     
+    def cluster_hosts(self, probe_file: str):
+        """Group live hosts serving the same application so only one of each is fully scanned."""
+        cluster_config = self.config.get('recon', {}).get('host_clustering', {})
+        if not cluster_config.get('enabled', True) or not os.path.exists(probe_file):
+            return
+        
+        self.clusters_file = os.path.join(self.output_dir, 'recon', 'host_clusters.json')
+        hosts, clusters = cluster_probe_results(probe_file, self.clusters_file,
+                                                cluster_config.get('max_distance', 3))
+        if hosts > clusters:
+            self.logger.info(f"Clustered {hosts} live hosts into {clusters} distinct applications")
+    
+    def representative_targets(self, urls_file: str) -> str:
+        """Drop member URLs whose path the cluster representative is already scanned for."""
+        if not self.clusters_file or not os.path.exists(urls_file):
+            return urls_file
+        
+        representative_file = os.path.join(self.output_dir, 'scan_targets_representative.txt')
+        kept, dropped = filter_representatives(urls_file, representative_file, self.clusters_file)
+        if dropped:
+            self.logger.info(f"Skipping {dropped} URLs duplicated across cluster members ({kept} kept)")
+        return representative_file
+    
     def phase_url_discovery(self, live_file: str) -> str:
         """Phase 2: URL Discovery - Digging the parallels."""
         self.logger.section("PHASE 2: URL DISCOVERY ◈ Digging the Parallels")
@@ -211,22 +459,41 @@ class Vauban:
             return all_urls_file
         
         self.logger.info("Collecting passive URLs (historical intelligence)...")
-        self.run_module('modules/urls/passive.sh', live_file, passive_file, timeout=900)
+        self.run_cached_module('passive', 'modules/urls/passive.sh', live_file, passive_file,
+                               deps=('modules/urls/archive.py',), timeout=900)
+        self.enforce_scope(passive_file, "Passive")
+        self.filter_seen(passive_file, "Passive")
+        self.collect_urls(passive_file, 'passive')
         
         if self.args.mode == 'full':
             self.logger.info("Active crawling (scouting the perimeter)...")
-            self.run_module('modules/urls/crawler.sh', live_file, crawled_file, '3', timeout=900)
+            crawler_config = self.config.get('urls', {}).get('crawler', {})
+            self.run_module('modules/urls/crawler.sh', live_file, crawled_file,
+                            crawler_config.get('depth', 3), self.config.get('general', {}).get('threads', 10),
+                            js_file, self.config.get('general', {}).get('rate_limit', 150), timeout=900)
+            self.enforce_scope(crawled_file, "Crawler")
+            self.filter_seen(crawled_file, "Crawler")
+            self.collect_urls(crawled_file, 'crawler')
         
-        input_files = [f for f in [passive_file, crawled_file] if os.path.exists(f)]
-        if input_files:
-            merge_files(input_files, all_urls_file, unique=True)
+        self.export_urls(['passive', 'crawler'], [passive_file, crawled_file], all_urls_file)
         
         self.stats['urls'] = count_file_lines(all_urls_file)
         self.logger.success(f"Collected {self.stats['urls']} unique URLs")
         
+        self.enforce_scope(js_file, "JS files")
         if os.path.exists(js_file) and count_file_lines(js_file) > 0:
             self.logger.info("Analyzing JavaScript (decrypting communications)...")
-            self.run_python_module('modules/urls/jsparser.py', js_file, os.path.join(self.output_dir, 'urls'))
+            js_config = self.config.get('urls', {}).get('js_analysis', {})
+            js_args = [js_file, os.path.join(self.output_dir, 'urls')]
+            if js_config.get('recursive'):
+                js_args += ['--recursive',
+                            '--max-depth', js_config.get('max_depth', 2),
+                            '--max-files', js_config.get('max_files', 500)]
+            self.run_python_module('modules/urls/jsparser.py', *js_args)
+            js_endpoints_file = os.path.join(self.output_dir, 'urls', 'js_endpoints.txt')
+            self.enforce_scope(js_endpoints_file, "JS endpoints")
+            self.filter_seen(js_endpoints_file, "JS endpoints")
+            self.collect_urls(js_endpoints_file, 'js')
         
         return all_urls_file
     
@@ -240,40 +507,83 @@ class Vauban:
             if count_file_lines(live_file) > 0:
                 self.logger.info("Brute-forcing API endpoints (probing the walls)...")
                 self.run_module('modules/api/endpoints.sh', live_file, api_endpoints_file, timeout=600)
+                self.enforce_scope(api_endpoints_file, "API brute force")
+                self.filter_seen(api_endpoints_file, "API brute force")
+                self.collect_urls(api_endpoints_file, 'api')
             
             self.logger.info("Detecting OpenAPI/Swagger (finding blueprints)...")
-            self.run_python_module('modules/api/openapi.py', live_file, os.path.join(self.output_dir, 'api'))
+            openapi_config = self.config.get('api', {}).get('openapi', {})
+            self.run_python_module('modules/api/openapi.py', live_file, os.path.join(self.output_dir, 'api'),
+                                   openapi_config.get('path_stats', './state/openapi_paths.json'))
+            openapi_endpoints_file = os.path.join(self.output_dir, 'api', 'openapi_endpoints.txt')
+            if os.path.exists(openapi_endpoints_file):
+                # "METHOD url" lines; the URLs join the API targets
+                openapi_urls_file = os.path.join(self.output_dir, 'api', 'openapi_urls.txt')
+                write_file_lines(openapi_urls_file, dict.fromkeys(
+                    line.partition(' ')[2] for line in iter_file_lines(openapi_endpoints_file) if ' ' in line))
+                self.enforce_scope(openapi_urls_file, "OpenAPI endpoints")
+                self.filter_seen(openapi_urls_file, "OpenAPI endpoints")
+                self.collect_urls(openapi_urls_file, 'api')
+                write_file_lines(api_endpoints_file, iter_file_lines(openapi_urls_file), mode='a')
             
             if count_file_lines(urls_file) > 0:
                 self.logger.info("Discovering hidden parameters (secret passages)...")
-                self.run_module('modules/api/params.sh', urls_file, os.path.join(self.output_dir, 'api'), timeout=300)
+                params_config = self.config.get('api', {}).get('params', {})
+                self.run_module('modules/api/params.sh', urls_file, os.path.join(self.output_dir, 'api'),
+                                params_config.get('threads', 5), params_config.get('budget', 50), timeout=300)
         
         self.stats['api_endpoints'] = count_file_lines(api_endpoints_file)
         self.logger.success(f"Discovered {self.stats['api_endpoints']} API endpoints")
         
         return api_endpoints_file
     
-    def phase_scanning(self, urls_file: str):
-        """Phase 4: Vulnerability Scanning - The calculated breach."""
+    def phase_scanning(self, urls_file: str) -> list:
+        """
+        Phase 4: Vulnerability Scanning - The calculated breach.
+        
+        Returns the files listing the URLs each scanner processed (the
+        secrets and custom modules report theirs; nuclei covers urls_file),
+        or an empty list when nuclei did not complete.
+        """
         self.logger.section("PHASE 4: VULNERABILITY SCANNING ◈ The Calculated Breach")
         
         scan_dir = os.path.join(self.output_dir, 'scan')
         
         if count_file_lines(urls_file) == 0:
             self.logger.warning("No targets for breach - fortress impenetrable")
-            return
+            return []
+        
+        scanned_files = [urls_file, os.path.join(scan_dir, 'secrets_scanned.txt'),
+                         os.path.join(scan_dir, 'custom_scanned.txt')]
+        for filepath in scanned_files[1:]:
+            if os.path.exists(filepath):
+                os.remove(filepath)  # left over from an earlier siege in this output directory
         
         self.logger.info("Running Nuclei DAST (siege artillery)...")
         scan_mode = 'api' if self.args.mode == 'api' else 'full'
-        self.run_module('modules/scan/nuclei.sh', urls_file, scan_dir, scan_mode, timeout=1800)
+        _, _, nuclei_status = self.run_module('modules/scan/nuclei.sh', urls_file, scan_dir, scan_mode, timeout=1800)
+        
+        # Hosts tech detection saw behind a WAF start in the protected lane
+        tech_results = os.path.join(self.output_dir, 'recon', 'tech_results.json')
         
         self.logger.info("Scanning for exposed secrets (intercepting couriers)...")
-        self.run_python_module('modules/scan/secrets.py', urls_file, scan_dir)
+        self.run_python_module('modules/scan/secrets.py', urls_file, scan_dir, tech_results)
         
         self.logger.info("Running custom checks (specialized sappers)...")
-        self.run_python_module('modules/scan/custom.py', urls_file, scan_dir)
+        custom_budget = self.config.get('scan', {}).get('custom', {}).get('budget', 100)
+        self.run_python_module('modules/scan/custom.py', urls_file, scan_dir, custom_budget, tech_results)
+        
+        if self.clusters_file:
+            inferred = propagate_findings(scan_dir, self.clusters_file)
+            if inferred:
+                self.logger.info(f"Propagated {inferred} findings to cluster members (marked inferred)")
         
         self._load_scan_results(scan_dir)
+        
+        if nuclei_status != 0:
+            self.logger.warning("Nuclei did not complete; no URL is marked as scanned for later sieges")
+            return []
+        return scanned_files
     
     def _load_scan_results(self, scan_dir: str):
         """Load scan results and update stats."""
@@ -335,7 +645,11 @@ class Vauban:
             sys.exit(1)
         
         self.setup_output()
+        self.setup_seen_set()
+        self.setup_corpus()
+        self.setup_tool_cache()
         targets_file = self.prepare_input()
+        self.setup_scope(targets_file)
         
         try:
             # Phase 1: Reconnaissance
@@ -349,17 +663,19 @@ class Vauban:
             
             # Merge all discovered URLs
             all_targets = os.path.join(self.output_dir, 'all_targets.txt')
-            merge_files([urls_file, api_file], all_targets, unique=True)
+            self.export_urls(['passive', 'crawler', 'api'], [urls_file, api_file], all_targets)
             
-            # Phase 4: Scanning
-            self.phase_scanning(all_targets)
+            # Phase 4: Scanning (one exemplar set per URL template, one host per cluster)
+            scanned_files = self.phase_scanning(self.representative_targets(self.cluster_targets(all_targets)))
+            # Only URLs every scanner processed are known to later runs
+            self.mark_seen(scanned_files)
             
             # Phase 5: Reporting
             self.phase_reporting()
             
             # Final summary
             self.logger.summary(self.stats)
-            
+        
         except KeyboardInterrupt:
             self.logger.warning("Siege aborted by commander")
             sys.exit(1)
@@ -369,6 +685,10 @@ class Vauban:
                 import traceback
                 traceback.print_exc()
             sys.exit(1)
+        finally:
+            self.finish_refreshes()
+            if self.corpus:
+                self.corpus.close()
 
 
 def check_tools():
@@ -495,6 +815,8 @@ Examples:
                         help='Output directory (default: ./output)')
     parser.add_argument('-t', '--threads', type=int, default=10,
                         help='Number of threads (default: 10)')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Ignore URLs remembered from previous sieges of this target and bypass the tool cache')
     parser.add_argument('--notify', action='store_true',
                         help='Send notifications on completion')
     parser.add_argument('-v', '--verbose', action='store_true',